@@ -0,0 +1,20 @@
+neg_risk_adapter_abi = [
+    {
+      "inputs": [
+        {
+          "internalType": "bytes32",
+          "name": "_conditionId",
+          "type": "bytes32"
+        },
+        {
+          "internalType": "uint256[]",
+          "name": "_amounts",
+          "type": "uint256[]"
+        }
+      ],
+      "name": "redeemPositions",
+      "outputs": [],
+      "stateMutability": "nonpayable",
+      "type": "function"
+    }
+]
@@ -0,0 +1,120 @@
+import json
+import random
+import threading
+import time
+import itertools
+import utils.clob_client as clob_client
+
+
+UP_TOKEN_ID = "1" * 77
+DOWN_TOKEN_ID = "2" * 77
+MARKET_SLUG = "btc-updown-15m-0"
+
+
+class FakeClobClient:
+    """Local stand-in for ``py_clob_client.ClobClient``.
+
+    Signing is free and ``post_order`` sleeps for a configurable exchange
+    latency, so benchmarks exercise our code paths without touching the CLOB.
+    """
+
+    def __init__(self, latency=0.002, jitter=0.0005, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.orders_posted = 0
+
+    def create_order(self, order_args):
+        return {
+            "token_id": order_args.token_id,
+            "price": order_args.price,
+            "size": order_args.size,
+            "side": order_args.side,
+        }
+
+    def post_order(self, signed_order):
+        with self._lock:
+            delay = max(0.0, self._rng.gauss(self.latency, self.jitter))
+            order_id = next(self._ids)
+            self.orders_posted += 1
+        time.sleep(delay)
+        return {"orderID": f"0x{order_id:064x}", "success": True}
+
+    def get_tick_size(self, token_id):
+        return "0.01"
+
+    def get_neg_risk(self, token_id):
+        return False
+
+    def get_fee_rate_bps(self, token_id):
+        return 0
+
+
+def install_fake_client(client=None):
+    """Make ``utils.clob_client.get_client()`` return a fake client."""
+    client = client or FakeClobClient()
+    clob_client._client = client
+    clob_client._client_creds = object()
+    return client
+
+
+def _level(price, size):
+    return {"price": f"{price:.2f}", "size": f"{size:.2f}"}
+
+
+def scripted_feed(count, up_token_id=UP_TOKEN_ID, seed=0, recenter_every=500):
+    """Build ``count`` WebSocket messages for the UP token.
+
+    The feed starts from a snapshot and then replays top-of-book size changes
+    that push ``micro_vs_mid_bps`` across the signal thresholds, inside the
+    entry price bands used by the trading loop. Every ``recenter_every``
+    messages a fresh snapshot moves the book to a new mid price.
+    """
+    rng = random.Random(seed)
+    messages = []
+    best_bid = 0.28
+
+    def snapshot(bid):
+        ask = round(bid + 0.02, 2)
+        bids = [_level(bid - 0.01 * i, rng.uniform(50, 300)) for i in range(5, -1, -1)]
+        asks = [_level(ask + 0.01 * i, rng.uniform(50, 300)) for i in range(5, -1, -1)]
+        return json.dumps(
+            {
+                "event_type": "book",
+                "asset_id": up_token_id,
+                "bids": bids,
+                "asks": asks,
+            }
+        )
+
+    for i in range(count):
+        if i % recenter_every == 0:
+            best_bid = round(rng.choice([0.22, 0.25, 0.28, 0.30, 0.66, 0.70, 0.74]), 2)
+            messages.append(snapshot(best_bid))
+            continue
+
+        best_ask = round(best_bid + 0.02, 2)
+        if rng.random() < 0.5:
+            side, price = "BUY", best_bid
+        else:
+            side, price = "SELL", best_ask
+        messages.append(
+            json.dumps(
+                {
+                    "event_type": "price_change",
+                    "price_changes": [
+                        {
+                            "asset_id": up_token_id,
+                            "price": f"{price:.2f}",
+                            "side": side,
+                            "size": f"{rng.uniform(10, 400):.2f}",
+                            "best_bid": f"{best_bid:.2f}",
+                            "best_ask": f"{best_ask:.2f}",
+                        }
+                    ],
+                }
+            )
+        )
+    return messages
@@ -0,0 +1,161 @@
+"""Feed-to-strategy tail latency with and without GIL contention.
+
+Runs the same producer (JSON decode + top-of-book extraction), consumer and
+CPU-bound "order signing" load either as threads of one process or as three
+processes pinned to separate cores, connected by the ShmRing used by
+pipeline.py, and reports snapshot delivery latency percentiles.
+
+Usage:
+    python -m bench.pipeline_latency --rate 5000 --duration 5
+"""
+
+import os
+import json
+import time
+import random
+import struct
+import argparse
+import threading
+import multiprocessing as mp
+from bench.stats import format_ms, percentiles
+from utils.shm_ring import ShmRing
+
+RING_NAME = "pm_hft_bench_ring"
+# ts_ns, best_bid, best_ask
+RECORD = struct.Struct("<Qdd")
+
+# Stand-in for secp256k1 signing: big-int modular exponentiation holds the GIL
+_SIGN_MODULUS = (1 << 255) - 19
+
+
+def _messages(count, seed=0):
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        bid = round(rng.uniform(0.2, 0.78), 2)
+        messages.append(
+            json.dumps(
+                {
+                    "event_type": "book",
+                    "bids": [{"price": f"{bid - 0.01 * i:.2f}", "size": "100"} for i in range(5, -1, -1)],
+                    "asks": [{"price": f"{bid + 0.02 + 0.01 * i:.2f}", "size": "100"} for i in range(5, -1, -1)],
+                }
+            )
+        )
+    return messages
+
+
+def _pin(core):
+    if core is not None:
+        try:
+            os.sched_setaffinity(0, {core % os.cpu_count()})
+        except (AttributeError, OSError):
+            pass
+
+
+def producer(rate, messages, core=None, ring=None):
+    _pin(core)
+    ring = ring or ShmRing.attach(RING_NAME, RECORD)
+    start = time.perf_counter()
+    for i, message in enumerate(messages):
+        scheduled = start + i / rate
+        # Sleep rather than spin: in threads mode a spinning producer holds
+        # the GIL the consumer needs, which would be measured as ring latency
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        data = json.loads(message)
+        best_bid = float(data["bids"][-1]["price"])
+        best_ask = float(data["asks"][-1]["price"])
+        while not ring.push(time.time_ns(), best_bid, best_ask):
+            time.sleep(0)
+
+
+def consumer(count, results, core=None, ring=None):
+    _pin(core)
+    ring = ring or ShmRing.attach(RING_NAME, RECORD)
+    latencies = []
+    while len(latencies) < count:
+        record = ring.pop()
+        if record is None:
+            time.sleep(0)
+            continue
+        latencies.append((time.time_ns() - record[0]) / 1e9)
+    results.put(latencies)
+
+
+def signing_load(stop, core=None):
+    _pin(core)
+    value = 7
+    while not stop.is_set():
+        value = pow(value, 65537, _SIGN_MODULUS)
+
+
+def run_threads(rate, messages):
+    ring = ShmRing.create(RING_NAME, RECORD, 4096)
+    results = mp.Queue()
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=signing_load, args=(stop,), daemon=True),
+        threading.Thread(target=consumer, args=(len(messages), results, None, ring)),
+        threading.Thread(target=producer, args=(rate, messages, None, ring)),
+    ]
+    try:
+        for thread in threads:
+            thread.start()
+        latencies = results.get()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        ring.close()
+    return latencies
+
+
+def run_processes(rate, messages, cores):
+    ring = ShmRing.create(RING_NAME, RECORD, 4096)
+    results = mp.Queue()
+    stop = mp.Event()
+    processes = [
+        mp.Process(target=signing_load, args=(stop, cores[2]), daemon=True),
+        mp.Process(target=consumer, args=(len(messages), results, cores[1])),
+        mp.Process(target=producer, args=(rate, messages, cores[0])),
+    ]
+    try:
+        for process in processes:
+            process.start()
+        latencies = results.get()
+    finally:
+        stop.set()
+        for process in processes:
+            process.join()
+        ring.close()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=5000)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--cores", default=None, help="producer,consumer,load cores")
+    args = parser.parse_args()
+
+    cpu_count = os.cpu_count()
+    cores = (
+        [int(c) for c in args.cores.split(",")]
+        if args.cores
+        else [(cpu_count - offset) % cpu_count for offset in (1, 2, 3)]
+    )
+    messages = _messages(int(args.rate * args.duration))
+
+    for label, run in (
+        ("threads (shared GIL)", lambda: run_threads(args.rate, messages)),
+        ("processes (pinned)", lambda: run_processes(args.rate, messages, cores)),
+    ):
+        latencies = run()
+        stats = percentiles(latencies, (50, 99, 99.9, 100))
+        print(f"{label:<22} {format_ms(stats)}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def percentiles(values, points=PERCENTILES):
+    if not values:
+        return {p: float("nan") for p in points}
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    return {p: ordered[min(last, int(round(p / 100 * last)))] for p in points}
+
+
+def format_ms(stats):
+    return " ".join(f"p{p:g}={v * 1000:.3f}ms" for p, v in stats.items())
@@ -0,0 +1,248 @@
+"""End-to-end throughput and latency benchmark for the trading loop.
+
+Replays a scripted market feed through ``OrderBook``, the signal monitor, the
+strategy runtime used by ``main.py`` and ``place_anchor_and_hedge`` against a
+local fake exchange, at increasing message rates, and reports where book staleness
+starts to grow.
+
+Usage:
+    python -m bench.trading_loop --rates 1000,5000,20000 --duration 5
+    python -m bench.trading_loop --wait-mode spin_yield
+"""
+
+import argparse
+import logging
+import threading
+import time
+import utils.strategy as strategy_module
+from bench.stats import format_ms, percentiles
+from bench.fake_exchange import (
+    DOWN_TOKEN_ID,
+    MARKET_SLUG,
+    UP_TOKEN_ID,
+    FakeClobClient,
+    install_fake_client,
+    scripted_feed,
+)
+from utils.alloc_stats import METERS, enable_allocation_tracking
+from utils.orderbook import OrderBook
+from utils.live_config import LIVE_CONFIG
+from utils.strategy import AnchorHedgeStrategy, DirectOrderGateway, StrategyRuntime
+from utils.wait_strategy import WAIT_STRATEGIES, get_wait_strategy
+
+logger = logging.getLogger(__name__)
+
+
+def _cpu_sampler():
+    try:
+        import psutil
+    except ImportError:
+        return None
+    psutil.cpu_percent(percpu=True)
+    return psutil
+
+
+class _TimedGateway(DirectOrderGateway):
+    """Records the round-trip time of each anchor/hedge pair."""
+
+    def __init__(self):
+        self.round_trips = []
+
+    def submit(self, book, anchor_side, price, hedge_price=None):
+        start = time.perf_counter()
+        order_ids = super().submit(book, anchor_side, price, hedge_price)
+        self.round_trips.append(time.perf_counter() - start)
+        return order_ids
+
+
+class _MeasuredStrategy(AnchorHedgeStrategy):
+    """Records the delay between a book update and the strategy seeing it."""
+
+    def __init__(self, gateway, min_delay):
+        super().__init__(gateway=gateway, min_delay=min_delay)
+        self.decision_latencies = []
+        self._seen = None
+
+    def on_event(self, events, book):
+        last_update = book.orderbook["last_update"]
+        if last_update is not None and last_update != self._seen:
+            self.decision_latencies.append(time.time() - last_update)
+            self._seen = last_update
+        if book.risk.trades >= LIVE_CONFIG.params.max_trades:
+            book.risk.reset()
+        return super().on_event(events, book)
+
+
+def run_rate(
+    rate,
+    duration,
+    exchange_latency=0.002,
+    trade_delay=0.0,
+    seed=0,
+    track_allocations=False,
+    wait_mode=None,
+):
+    """Replay ``rate * duration`` messages at ``rate`` msg/s and collect stats."""
+    install_fake_client(FakeClobClient(latency=exchange_latency, seed=seed))
+
+    messages = scripted_feed(int(rate * duration), UP_TOKEN_ID, seed=seed)
+    book = OrderBook(UP_TOKEN_ID, DOWN_TOKEN_ID, MARKET_SLUG)
+    book.create_signed_orders_cache()
+    if wait_mode:
+        book.events.wait_strategy = get_wait_strategy(wait_mode)
+        book.book_updates.wait_strategy = get_wait_strategy(wait_mode)
+    gateway = _TimedGateway()
+    strategy = _MeasuredStrategy(gateway, trade_delay)
+    runtime = StrategyRuntime(book, strategy)
+    # Scripted clock: always early enough in the session to trade
+    elapsed_seconds = strategy_module.get_period_elapsed_seconds
+    strategy_module.get_period_elapsed_seconds = lambda: 0
+
+    lags = [0.0] * len(messages)
+    done = threading.Event()
+
+    def feed():
+        start = time.perf_counter()
+        for i, message in enumerate(messages):
+            scheduled = start + i / rate
+            # Sleep rather than spin: spinning holds the GIL, so the strategy
+            # and monitor threads would only run at switch-interval ticks and
+            # every latency below would measure that instead of the code
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            book._on_message(None, message)
+            lags[i] = time.perf_counter() - scheduled
+        done.set()
+        runtime.stop()
+
+    if track_allocations:
+        enable_allocation_tracking(trace_bytes=True)
+    psutil = _cpu_sampler()
+    book.monitoring_running = True
+    threads = [
+        threading.Thread(target=book._continuous_trading_monitor, daemon=True),
+        threading.Thread(
+            target=runtime.run, kwargs={"until": time.time() + 3600}, daemon=True
+        ),
+        threading.Thread(target=feed, daemon=True),
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    done.wait()
+    wall = time.perf_counter() - started
+    book.monitoring_running = False
+    for thread in threads:
+        thread.join(timeout=2)
+    cpu = psutil.cpu_percent(percpu=True) if psutil else []
+
+    strategy_module.get_period_elapsed_seconds = elapsed_seconds
+
+    window = max(1, len(lags) // 10)
+    head = percentiles(lags[:window], (50,))[50]
+    tail = percentiles(lags[-window:], (50,))[50]
+    return {
+        "rate": rate,
+        "sustained": len(messages) / wall,
+        "lag_head": head,
+        "lag_tail": tail,
+        "lag": percentiles(lags),
+        "decision": percentiles(strategy.decision_latencies),
+        "wake": percentiles([ns / 1e9 for ns in book.events.wake_latency.samples]),
+        "monitor_wake": percentiles(
+            [ns / 1e9 for ns in book.book_updates.wake_latency.samples]
+        ),
+        "round_trip": percentiles(gateway.round_trips),
+        "orders": len(gateway.round_trips),
+        "cpu": cpu,
+        "allocations": [meter.report() for meter in METERS if meter.enabled],
+    }
+
+
+def is_saturated(result, growth_threshold=0.005):
+    """Book staleness grows when the tail of the run lags more than the head."""
+    return (
+        result["lag_tail"] - result["lag_head"] > growth_threshold
+        or result["sustained"] < 0.95 * result["rate"]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rates", default="500,1000,2000,5000,10000,20000")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--exchange-latency", type=float, default=0.002)
+    parser.add_argument("--trade-delay", type=float, default=0.0)
+    parser.add_argument(
+        "--market-rate",
+        type=float,
+        default=50.0,
+        help="Typical messages/sec of a single market, used for capacity estimate",
+    )
+    parser.add_argument(
+        "--track-allocations",
+        action="store_true",
+        help="Report net blocks/bytes allocated per message, decision and order",
+    )
+    parser.add_argument(
+        "--wait-mode",
+        choices=sorted(WAIT_STRATEGIES),
+        default=None,
+        help="Wait strategy for the strategy runtime and signal monitor (default: config)",
+    )
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    saturation = None
+    last_ok = None
+    for rate in (float(r) for r in args.rates.split(",")):
+        result = run_rate(
+            rate,
+            args.duration,
+            args.exchange_latency,
+            args.trade_delay,
+            track_allocations=args.track_allocations,
+            wait_mode=args.wait_mode,
+        )
+        saturated = is_saturated(result)
+        print(
+            f"rate={rate:>8.0f}/s sustained={result['sustained']:>9.0f}/s "
+            f"staleness head/tail={result['lag_head'] * 1000:.3f}/{result['lag_tail'] * 1000:.3f}ms "
+            f"{'SATURATED' if saturated else 'ok'}",
+            flush=True,
+        )
+        print(f"    book lag     {format_ms(result['lag'])}")
+        print(f"    decision     {format_ms(result['decision'])}")
+        print(f"    wake         {format_ms(result['wake'])}")
+        print(f"    monitor wake {format_ms(result['monitor_wake'])}")
+        print(f"    order rtt    {format_ms(result['round_trip'])} ({result['orders']} pairs)")
+        if result["cpu"]:
+            print(f"    cpu/core     {' '.join(f'{c:.0f}%' for c in result['cpu'])}")
+        for stats in result["allocations"]:
+            print(
+                f"    alloc/{stats['name']:<8} net {stats['blocks_per_op']:.2f} blocks "
+                f"{stats['bytes_per_op']:.0f} bytes over {stats['operations']} ops"
+                f"{' OVER BUDGET' if stats['over_budget'] else ''}"
+            )
+        if saturated:
+            saturation = rate
+            break
+        last_ok = result
+
+    if saturation is None:
+        print("No saturation within the tested rates")
+    else:
+        print(f"Saturation point: {saturation:.0f} msg/s")
+    if last_ok:
+        markets = int(last_ok["sustained"] // args.market_rate)
+        print(
+            f"Max sustained rate {last_ok['sustained']:.0f} msg/s "
+            f"~ {markets} markets at {args.market_rate:.0f} msg/s each"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 LOG_FOLDER = "logs/"
+LOG_QUEUE = True  # Hand log records to a background writer thread instead of writing inline
+LOG_QUEUE_SIZE = 10000  # Records buffered for the writer; further records are dropped
 GAMMA_API_URL = "https://gamma-api.polymarket.com"
 POLYMARKET_HOST = "https://clob.polymarket.com"
 POLYMARKET_WS_MARKET_URL = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
@@ -12,5 +14,61 @@ MARKET_SESSION_SECONDS = 900
 TIMEZONE = "US/Eastern"
 MAX_TRADES = 30
 MAX_INVENTORY = 1
+MAX_SESSION_NOTIONAL = None  # USDC committed per session (anchor + hedge), None for no cap
+MAX_ONE_LEGGED = None  # Stop entering after this many pairs with only one leg placed
+RISK_SESSION_HISTORY = 96  # Finished sessions' risk stats kept in memory
 MIN_DELAY_BETWEEN_TRADES_SECONDS = 1
+ENTRY_ASK_BAND = (0.2, 0.35)  # Enter while the UP ask is strictly inside this band...
+ENTRY_BID_BAND = (0.65, 0.8)  # ...or the UP bid is strictly inside this one
+MAX_ENTRY_ELAPSED_SECONDS = 500  # No new entries later in the session than this
+LIVE_CONFIG_PATH = None  # e.g. "live_config.json" with overrides like {"PROFIT_MARGIN": 0.05}, applied without a restart
+LIVE_CONFIG_POLL_SECONDS = 1
 PLACE_OPPOSITE_ORDER = True  # Hedge orders
+PIPELINE_RING_CAPACITY = 1024  # Records per shared-memory ring in pipeline mode
+BOOK_SHM_NAME = None  # e.g. "pm_hft_book_up" to publish the book to shared memory
+BOOK_SHM_DEPTH = 10  # Levels per side in the shared-memory book
+THREAD_PINNING = False  # Pin feed, strategy and background threads to separate cores (Linux)
+THREAD_LAYOUT = None  # e.g. {"feed": [3], "strategy": [2], "background": [0, 1]}; None: from topology
+THREAD_SCHED_FIFO = False  # Run pinned feed/strategy threads SCHED_FIFO (needs CAP_SYS_NICE)
+THREAD_FIFO_PRIORITIES = {"feed": 30, "strategy": 20}  # Below kernel IRQ threads (50)
+STRATEGY_WAIT_MODE = "condition"  # spin, spin_yield, condition or sleep; spin needs its own core
+MONITOR_WAIT_MODE = "condition"  # How the signal monitor waits for book updates
+WAIT_SPIN_ITERATIONS = 1000  # spin_yield: polls before yielding the core
+WAIT_SLEEP_SECONDS = 0.005  # sleep: poll interval
+WAKE_LATENCY_SAMPLES = 10000  # Wake-ups kept for the per-session latency report
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9464  # Prometheus scrape endpoint of main.py (None to disable)
+MERGER_METRICS_PORT = 9465  # Scrape endpoint of a standalone merger.py
+PROFILER_INTERVAL_SECONDS = 0.005  # Sampling period (kill -USR2 or GET /profile?seconds=N)
+PROFILER_MAX_OVERHEAD = 0.02  # Max share of wall time the sampler may spend walking stacks
+PROFILER_MAX_DEPTH = 64  # Frames kept per stack
+PROFILER_MAX_STACKS = 20000  # Distinct stacks kept; further ones are lumped together
+JOURNAL_PATH = None  # e.g. "data/journal.bin" to record decisions and orders (python -m utils.journal)
+JOURNAL_BUFFER_RECORDS = 4096  # Records per in-memory buffer before the writer flushes
+JOURNAL_FLUSH_SECONDS = 1
+MARKET_STORE_PATH = None  # e.g. "data/market" to keep per-session top-of-book columns (utils.market_store)
+MARKET_STORE_FLUSH_SECONDS = 1
+ALLOC_TRACKING = False  # Log net allocations per message/decision/order at rollover
+ALLOC_TRACE_BYTES = False  # Also trace bytes with tracemalloc (slow)
+CLIENT_READY_TIMEOUT_SECONDS = 30  # Max wait for CLOB API creds at startup
+BOOK_READY_TIMEOUT_SECONDS = 10  # Warn if no book snapshot arrives within this
+MERGE_INTAKE_HOST = "127.0.0.1"  # Trader notifies the merger of filled pairs here
+MERGE_INTAKE_PORT = 47601
+MERGE_NOTIFY = True  # Send filled anchor/hedge pairs to the merger's intake
+MERGER_EMBEDDED = False  # Run the merger on a background thread of main.py instead of merger.py
+POSITION_INDEX = False  # Track Safe positions from CTF transfer logs instead of data-api
+POSITION_INDEX_PATH = "data/positions.sqlite"
+POSITION_INDEX_POLL_SECONDS = 2
+POSITION_INDEX_CONFIRMATIONS = 3  # Blocks behind head, to stay clear of reorgs
+POSITION_INDEX_BLOCK_CHUNK = 2000  # Max blocks per eth_getLogs request
+POSITION_INDEX_START_BLOCK = None  # None: read balances on chain at the head and follow from there
+POSITION_INDEX_BOOTSTRAP_BLOCKS = 1800  # Recent blocks scanned for tokens data-api has not indexed yet
+GAS_HISTORY_BLOCKS = 10  # Blocks sampled per eth_feeHistory call
+GAS_PRIORITY_PERCENTILE = 50  # Reward percentile used as the priority fee
+GAS_REFRESH_SECONDS = 4  # Background fee refresh interval
+GAS_MAX_AGE_SECONDS = 30  # Refresh inline if the cached fees are older than this
+GAS_MIN_PRIORITY_FEE_GWEI = 30  # Polygon rejects tips below this
+GAS_BASE_FEE_MULTIPLIER = 2  # maxFeePerGas = base fee * this + priority fee
+GAS_SPEED_UP_MULTIPLIER = 1.125  # Min fee bump for a replacement to be accepted
+GAS_LIMIT_BUFFER = 1.2  # Headroom over estimate_gas
+GAS_SPEED_UP_AFTER_SECONDS = 30  # Replace a merge transaction still pending after this
@@ -1,23 +1,36 @@
-import os
-import gc
 import time
-from utils.logger import setup_logging
+
+_PROCESS_START = time.perf_counter()
+
+import gc
+from utils.logger import setup_logging, get_logging_stats
 from utils.tokens import fetch_tokens
-from utils.orderbook import OrderBook, SIGNALES
-from utils.clob_client import init_global_client, is_client_ready
-from utils.market_time import is_in_trading_window, get_period_elapsed_seconds
-from utils.trade_counter import reset_trades, get_trades_count, increment_trades
-from utils.clob_orders import (
-    place_anchor_and_hedge,
-    cache_token_trading_infos,
+from utils.orderbook import OrderBook
+from utils.clob_client import init_global_client_async, wait_for_client
+from utils.journal import RECORD, record_event
+from utils.clob_orders import cache_token_trading_infos
+from utils.strategy import AnchorHedgeStrategy, StrategyRuntime
+from utils.cpu_affinity import (
+    set_cpu_affinity,
+    apply_thread_layout,
+    pin_current_thread,
+    log_thread_layout,
 )
-from utils.cpu_affinity import set_cpu_affinity
+from utils.startup import StartupTimeline
+from utils.metrics import start_metrics_server
+from utils.profiler import install_profiler_signal
+from utils.live_config import LIVE_CONFIG
+from utils.alloc_stats import enable_allocation_tracking, log_allocation_report
 from config import (
-    MAX_TRADES,
-    MAX_TRADING_BPS_THRESHOLD,
-    MIN_DELAY_BETWEEN_TRADES_SECONDS,
-    MAX_INVENTORY,
-    PROFIT_MARGIN,
+    ALLOC_TRACKING,
+    ALLOC_TRACE_BYTES,
+    CLIENT_READY_TIMEOUT_SECONDS,
+    BOOK_READY_TIMEOUT_SECONDS,
+    MERGER_EMBEDDED,
+    THREAD_PINNING,
+    THREAD_LAYOUT,
+    METRICS_HOST,
+    METRICS_PORT,
 )
 
 
@@ -26,19 +39,45 @@ gc.disable()
 
 def main():
 
+    timeline = StartupTimeline(_PROCESS_START)
+    timeline.mark("imports done")
     logger = setup_logging()
-    set_cpu_affinity()
+    if THREAD_PINNING:
+        apply_thread_layout(THREAD_LAYOUT)
+    else:
+        set_cpu_affinity()
     logger.info("Polymarket HFT Market Maker started")
-    init_global_client()
-    time.sleep(2)
-    if not is_client_ready():
-        logger.error("ClobClient is not ready. Exiting.")
-        return
+    if METRICS_PORT:
+        try:
+            start_metrics_server(METRICS_HOST, METRICS_PORT)
+        except OSError as e:
+            # e.g. the port is taken; trading does not depend on the endpoint
+            logger.error(f"Metrics disabled, cannot serve on {METRICS_HOST}:{METRICS_PORT}: {e}")
+    install_profiler_signal()
+    LIVE_CONFIG.start()
+
+    # Credential derivation, market lookup and the WebSocket handshake are
+    # all network-bound, so run them concurrently and wait on readiness
+    init_global_client_async()
+    if MERGER_EMBEDDED:
+        # Imported here so web3 is only loaded when the merger runs in-process
+        from merger import MergerService
+
+        MergerService().start_background()
     up_token, down_token, market_slug = fetch_tokens()
-    book = OrderBook(up_token, down_token, market_slug)
+    timeline.mark("market tokens fetched")
+    book = OrderBook(up_token, down_token, market_slug, publish=True)
     book.start()
+    timeline.mark("book started")
 
-    time.sleep(5)  # Allow some time for initial order book data
+    if not wait_for_client(CLIENT_READY_TIMEOUT_SECONDS):
+        logger.error("ClobClient is not ready. Exiting.")
+        return
+    timeline.mark("client creds derived")
+
+    while not book.wait_until_ready(BOOK_READY_TIMEOUT_SECONDS):
+        logger.warning("Still waiting for the first order book snapshot")
+    timeline.mark("first book snapshot")
 
     market_data = book.get_current_market_data()
 
@@ -48,82 +87,53 @@ def main():
     down_bid_price = 1 - up_ask_price
 
     print(
-        f"Initial Prices - UP: {up_bid_price:.2f}/{up_ask_price:.2f} | DOWN: {down_bid_price:.2f}/{down_ask_price:.2f} | Inventory: {book.inventory} / {MAX_INVENTORY}",
+        f"Initial Prices - UP: {up_bid_price:.2f}/{up_ask_price:.2f} | DOWN: {down_bid_price:.2f}/{down_ask_price:.2f} | Inventory: {book.inventory} / {LIVE_CONFIG.params.max_inventory}",
         flush=True,
     )
 
+    strategy = AnchorHedgeStrategy()
+    # Threads started from here on inherit the strategy cores unless they pin
+    # themselves (book threads and order workers do)
+    pin_current_thread("strategy")
+    timeline.mark("trading")
+    timeline.log(logger)
+    log_thread_layout()
+
+    # Everything allocated during startup lives for the whole run; move it out
+    # of the collector's view so rollover collections only scan session garbage
+    gc.collect()
+    gc.freeze()
+    if ALLOC_TRACKING:
+        enable_allocation_tracking(ALLOC_TRACE_BYTES)
+
     while True:
-        if not is_in_trading_window():
-
-            book.stop()
-            logger.info("Trading session ended. Starting new session.")
-            gc.collect()
-            time.sleep(10)
-            reset_trades()
-            up_token, down_token, market_slug = fetch_tokens()
-            book = OrderBook(up_token, down_token, market_slug)
-            cache_token_trading_infos(book)
-            book.start()
-
-        market_data = book.get_current_market_data()
-        if not market_data:
-            continue
-
-        up_bid_price = market_data["best_bid_price"]
-        up_ask_price = market_data["best_ask_price"]
-
-        if not ((0.2 < up_ask_price < 0.35) or (0.65 < up_bid_price < 0.8)) or (
-            abs(market_data["micro_vs_mid_bps"]) > MAX_TRADING_BPS_THRESHOLD
-        ):
-            continue
-
-        down_ask_price = 1 - up_bid_price
-        down_bid_price = 1 - up_ask_price
-
-        if (
-            (get_trades_count() < MAX_TRADES)
-            and (get_period_elapsed_seconds() < 500)
-            and (book.inventory < MAX_INVENTORY)
-        ):
-            trading_side = book.last_signal
-
-            if trading_side == SIGNALES.UP:
-                order_ids = place_anchor_and_hedge(
-                    up_token,
-                    down_token,
-                    "UP",
-                    round(up_bid_price, 2),
-                    size=5,
-                    signed_orders_cache=book.signed_orders_cache,
-                )
-                current_trades = increment_trades()
-                book.update_signed_orders_cache(
-                    [round(up_bid_price, 2), round(1 - up_bid_price - PROFIT_MARGIN, 2)]
-                )
-                logger.info(
-                    f"Placed UP anchor and hedge orders. Total trades: {current_trades}, Order IDs: {order_ids}"
-                )
-                time.sleep(MIN_DELAY_BETWEEN_TRADES_SECONDS)
-
-            elif trading_side == SIGNALES.DOWN:
-                order_ids = place_anchor_and_hedge(
-                    up_token,
-                    down_token,
-                    "DOWN",
-                    round(down_bid_price, 2),
-                    size=5,
-                    signed_orders_cache=book.signed_orders_cache,
-                )
-                current_trades = increment_trades()
-                book.update_signed_orders_cache(
-                    [round(down_bid_price, 2), round(1 - down_bid_price - PROFIT_MARGIN, 2)]
-                )
-                logger.info(
-                    f"Placed DOWN anchor and hedge orders. Total trades: {current_trades}, Order IDs: {order_ids}"
-                )
-                time.sleep(MIN_DELAY_BETWEEN_TRADES_SECONDS)
-
-        time.sleep(0.01)
+        # Blocks on book/signal/fill events until the trading window closes
+        StrategyRuntime(book, strategy).run()
+
+        book.stop()
+        session_stats = book.risk.close()
+        record_event(
+            RECORD.ROLLOVER, book.session_start, session_stats["trades"], book.inventory
+        )
+        logger.info("Trading session ended. Starting new session.")
+        if ALLOC_TRACKING:
+            log_allocation_report()
+        log_stats = get_logging_stats()
+        if log_stats:
+            logger.info(
+                f"Log queue: {log_stats['depth']}/{log_stats['capacity']} queued, "
+                f"{log_stats['dropped']} records dropped"
+            )
+        collect_start = time.perf_counter()
+        gc.collect()
+        logger.info(
+            f"Rollover gc.collect() took {(time.perf_counter() - collect_start) * 1000:.1f} ms"
+        )
+        time.sleep(10)
+        up_token, down_token, market_slug = fetch_tokens()
+        book = OrderBook(up_token, down_token, market_slug, publish=True)
+        cache_token_trading_infos(book)
+        book.start()
 
 
 if __name__ == "__main__":
@@ -1,123 +1,280 @@
 import os
 import time
-import requests
 import asyncio
-from web3 import Web3
+import logging
+import threading
+from collections import Counter, deque
+import aiohttp
+from web3 import AsyncWeb3, AsyncHTTPProvider, Web3
+from web3.exceptions import TransactionNotFound
 from eth_account import Account
 from dotenv import load_dotenv
 from web3.middleware import ExtraDataToPOAMiddleware
 from abi.ctfAbi import ctf_abi
 from abi.safeAbi import safe_abi
+from abi.multiSendAbi import multisend_abi
+from abi.negRiskAdapterAbi import neg_risk_adapter_abi
+from utils.ctf import get_position_ids
+from utils.merge_intake import parse_merge_request
+from utils.position_index import get_position_index
+from utils.gas_oracle import GasOracle
+from utils.cpu_affinity import pin_current_thread
+from utils.metrics import counter, gauge, histogram, start_metrics_server
+from config import (
+    CHAIN_ID,
+    MERGE_INTAKE_HOST,
+    MERGE_INTAKE_PORT,
+    POSITION_INDEX,
+    GAS_LIMIT_BUFFER,
+    GAS_SPEED_UP_AFTER_SECONDS,
+    METRICS_HOST,
+    MERGER_METRICS_PORT,
+)
+
+logger = logging.getLogger(__name__)
 
 # Constants
 CONDITIONAL_TOKENS_FRAMEWORK_ADDRESS = "0x4D97DCd97eC945f40cF65F87097ACe5EA0476045"
 NEG_RISK_ADAPTER_ADDRESS = "0xd91E80cF2E7be2e162c6513ceD06f1dD0dA35296"
 USDC_ADDRESS = "0x2791bca1f2de4661ed88a30c99a7a9449aa84174"
+# Safe MultiSendCallOnly v1.3.0 (canonical deployment on Polygon)
+MULTISEND_CALL_ONLY_ADDRESS = "0x40A2aCCbd92BCA938b02010E17A5b8929b49130D"
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+PARENT_COLLECTION_ID = bytes(32)
+BINARY_PARTITION = [1, 2]
+POSITIONS_URL = "https://data-api.polymarket.com/positions"
 USDCE_DIGITS = 6
-load_dotenv()
-
-
-def merge_tokens(condition_id, amount=None, neg_risk=False):
-    """
-    Merge conditional tokens back to USDC.
-
-    Args:
-        condition_id: The condition ID (bytes32 hex string)
-        amount: Amount to merge in USDC (e.g., "1.5"). If None, merges all available tokens
-        neg_risk: Whether to use NEG_RISK_ADAPTER (default: False)
-
-    Returns:
-        bool: True if merge successful, False otherwise
+BALANCE_BATCH_SIZE = 200  # Position IDs per balanceOfBatch call
+SAFE_TX_GAS_OVERHEAD = 300000  # Safe + MultiSend overhead per batched transaction
+MERGE_GAS = 200000  # Upper bound for one mergePositions inside a batch
+REDEEM_GAS = 200000  # Upper bound for one redeemPositions inside a batch
+MULTISEND_GAS_BUDGET = 5000000  # Max gas limit of one batched merge transaction
+RECEIPT_TIMEOUT_SECONDS = 300  # After this, also check whether the signer nonce moved on
+RECEIPT_POLL_SECONDS = 1
+SCAN_INTERVAL_SECONDS = 120  # Safety-net REST scan; fills arrive via the intake
+MERGE_COALESCE_SECONDS = 0.5  # Gather notifications arriving together into one batch
+MERGE_RETRY_SECONDS = 5  # Pause before retrying a notified batch that failed
+OPERATION_CALL = 0
+OPERATION_DELEGATECALL = 1
+STATS_WINDOW = 1000  # Latency samples kept for the periodic merger report
+
+RPC_CALLS = counter("pm_merger_rpc_calls_total", "JSON-RPC requests sent by the merger")
+SETTLED_CONDITIONS = counter(
+    "pm_merger_settled_conditions_total", "Conditions merged or redeemed on chain"
+)
+FAILED_BATCHES = counter("pm_merger_failed_batches_total", "Batched transactions that failed")
+IN_FLIGHT = gauge("pm_merger_in_flight_conditions", "Conditions with a transaction pending")
+CONFIRM_SECONDS = histogram(
+    "pm_merger_confirm_seconds", "Submit to confirmation of a batched transaction"
+)
+DETECT_TO_CONFIRM_SECONDS = histogram(
+    "pm_merger_detect_to_confirm_seconds", "Merge request to confirmation, per condition"
+)
+
+
+class CountingHTTPProvider(AsyncHTTPProvider):
+    """AsyncHTTPProvider that counts JSON-RPC requests per method."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rpc_counts = Counter()
+
+    async def make_request(self, method, params):
+        self.rpc_counts[method] += 1
+        RPC_CALLS.inc()
+        return await super().make_request(method, params)
+
+
+class NonceManager:
+    """Hands out Safe and signer nonces locally so merges can be pipelined.
+
+    Nonces are read from the chain once and then advanced on every successful
+    send, so several Safe transactions can be in flight at once. A send error
+    or a reverted transaction (which leaves the Safe nonce untouched) triggers
+    a resync from the chain before the next send.
     """
-    try:
-        # Connect to provider
-        rpc_url = os.getenv("RPC_URL")
-        w3 = Web3(Web3.HTTPProvider(rpc_url))
-
-        # Inject POA middleware for Polygon
-        from web3.middleware import ExtraDataToPOAMiddleware
 
-        w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
-
-        # Load wallet and safe
-        private_key = os.getenv("PRIVATE_KEY")
-        account = Account.from_key(private_key)
-        safe_address = Web3.to_checksum_address(os.getenv("POLYMARKET_PROXY_ADDRESS"))
-
-        safe = w3.eth.contract(address=safe_address, abi=safe_abi)
-
-        # Determine merge amount
-        if amount is None:
-            # Get minimum balance of both positions
-            ctf_contract = w3.eth.contract(
-                address=Web3.to_checksum_address(CONDITIONAL_TOKENS_FRAMEWORK_ADDRESS),
-                abi=ctf_abi,
+    def __init__(self, merger):
+        self.merger = merger
+        self.lock = asyncio.Lock()
+        self.safe_nonce = None
+        self.signer_nonce = None
+        self.pending = 0
+        self.needs_sync = True
+
+    async def sync(self):
+        merger = self.merger
+        address = merger.account.address
+        # Every signer transaction not yet mined is a Safe execTransaction that
+        # will consume one Safe nonce. Count them from the chain (pending minus
+        # mined signer nonce) rather than from ``pending``, which still counts
+        # transactions that were mined but whose confirmation task has not run.
+        # Read the Safe nonce and mined count at the same block so they agree.
+        block = await merger.w3.eth.block_number
+        safe_nonce = await merger.safe.functions.nonce().call(block_identifier=block)
+        mined = await merger.w3.eth.get_transaction_count(address, block)
+        self.signer_nonce = await merger.w3.eth.get_transaction_count(address, "pending")
+        self.safe_nonce = safe_nonce + max(0, self.signer_nonce - mined)
+        self.needs_sync = False
+
+    async def send(self, to, data, operation, gas):
+        """Sign and send one Safe transaction with the next nonces; caller holds ``lock``.
+
+        Returns the sent transaction and its hash.
+        """
+        if self.needs_sync:
+            await self.sync()
+        try:
+            # execTransaction can only be simulated against the current Safe
+            # nonce, so pipelined transactions keep the budget-based limit
+            tx, tx_hash = await self.merger.send_safe_transaction(
+                to,
+                data,
+                operation,
+                self.safe_nonce,
+                self.signer_nonce,
+                gas,
+                estimate=self.pending == 0,
             )
+        except Exception:
+            self.needs_sync = True
+            raise
+        self.safe_nonce += 1
+        self.signer_nonce += 1
+        self.pending += 1
+        return tx, tx_hash
+
+    def confirmed(self, success):
+        self.pending -= 1
+        if not success:
+            self.needs_sync = True
+
+
+class MergeIntake(asyncio.DatagramProtocol):
+    """Receives condition IDs from the trader (see utils.merge_intake)."""
+
+    def __init__(self):
+        self.pending = set()
+        self.event = asyncio.Event()
+
+    def datagram_received(self, data, addr):
+        condition_id = parse_merge_request(data)
+        if condition_id is None:
+            logger.warning(f"Ignoring malformed merge request from {addr}")
+            return
+        self.pending.add(condition_id)
+        self.event.set()
+
+
+class MergerService:
+    """Merges filled pairs and redeems resolved positions held by the Safe.
+
+    The provider, contracts and gas oracle are built once here and shared by
+    every merge; nothing touches the network until ``run()``. Run it
+    standalone (``python merger.py``) or inside the trading process with
+    ``start_background()``, which gives it an event loop on its own thread.
+    """
 
-            parent_collection_id = bytes(32)
-            collection_id_0 = ctf_contract.functions.getCollectionId(
-                parent_collection_id, bytes.fromhex(condition_id[2:]), 1
-            ).call()
-            collection_id_1 = ctf_contract.functions.getCollectionId(
-                parent_collection_id, bytes.fromhex(condition_id[2:]), 2
-            ).call()
-
-            position_id_0 = ctf_contract.functions.getPositionId(
-                Web3.to_checksum_address(USDC_ADDRESS), collection_id_0
-            ).call()
-            position_id_1 = ctf_contract.functions.getPositionId(
-                Web3.to_checksum_address(USDC_ADDRESS), collection_id_1
-            ).call()
-
-            balance_0 = ctf_contract.functions.balanceOf(
-                safe_address, position_id_0
-            ).call()
-            balance_1 = ctf_contract.functions.balanceOf(
-                safe_address, position_id_1
-            ).call()
-
-            amount_wei = min(balance_0, balance_1)
-
-            if amount_wei == 0:
-                print("Merge failed: No tokens to merge")
-                return False
-        else:
-            amount_wei = int(float(amount) * (10**USDCE_DIGITS))
-
-        # Encode merge transaction
-        ctf_contract = w3.eth.contract(abi=ctf_abi)
-        parent_collection_id = (
-            "0x0000000000000000000000000000000000000000000000000000000000000000"
+    def __init__(self, private_key=None, safe_address=None, rpc_url=None):
+        load_dotenv()
+        self.account = Account.from_key(private_key or os.getenv("PRIVATE_KEY"))
+        self.safe_address = Web3.to_checksum_address(
+            safe_address or os.getenv("POLYMARKET_PROXY_ADDRESS")
         )
-        partition = [1, 2]
-
-        data = ctf_contract.functions.mergePositions(
-            Web3.to_checksum_address(USDC_ADDRESS),
-            bytes.fromhex(parent_collection_id[2:]),
+        self.provider = CountingHTTPProvider(rpc_url or os.getenv("RPC_URL"))
+        self.w3 = AsyncWeb3(self.provider)
+        self.w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
+        self.safe = self.w3.eth.contract(address=self.safe_address, abi=safe_abi)
+        self.ctf = self.w3.eth.contract(
+            address=Web3.to_checksum_address(CONDITIONAL_TOKENS_FRAMEWORK_ADDRESS),
+            abi=ctf_abi,
+        )
+        self.multisend = self.w3.eth.contract(abi=multisend_abi)
+        self.neg_risk_adapter = self.w3.eth.contract(abi=neg_risk_adapter_abi)
+        self.collateral = Web3.to_checksum_address(USDC_ADDRESS)
+        self.gas_oracle = GasOracle(self.w3)
+        self.nonces = NonceManager(self)
+        # Conditions with a merge or redemption submitted but not yet confirmed
+        self.in_flight = set()
+        # Strong references to confirmation tasks so they are not collected mid-wait
+        self._confirmation_tasks = set()
+        # When each condition was first asked to merge, for detect->confirm latency
+        self.detected_at = {}
+        self.submit_latencies = deque(maxlen=STATS_WINDOW)
+        self.detect_latencies = deque(maxlen=STATS_WINDOW)
+        self.settled = 0
+        self._reported = (0, 0)
+        self._loop = None
+        self._task = None
+        self._thread = None
+
+    def encode_merge(self, condition_id, amount_wei):
+        """Calldata for mergePositions of a binary condition back into USDC."""
+        data = self.ctf.functions.mergePositions(
+            self.collateral,
+            PARENT_COLLECTION_ID,
             bytes.fromhex(condition_id[2:]),
-            partition,
+            BINARY_PARTITION,
             amount_wei,
         )._encode_transaction_data()
+        return bytes.fromhex(data[2:])
 
-        # Sign and execute Safe transaction
-        nonce = safe.functions.nonce().call()
-        to = (
-            NEG_RISK_ADAPTER_ADDRESS
-            if neg_risk
-            else CONDITIONAL_TOKENS_FRAMEWORK_ADDRESS
-        )
+    def encode_redeem(self, condition_id):
+        """Calldata for CTF redeemPositions of both outcomes of a resolved condition."""
+        data = self.ctf.functions.redeemPositions(
+            self.collateral,
+            PARENT_COLLECTION_ID,
+            bytes.fromhex(condition_id[2:]),
+            BINARY_PARTITION,
+        )._encode_transaction_data()
+        return bytes.fromhex(data[2:])
 
-        tx_hash = safe.functions.getTransactionHash(
-            Web3.to_checksum_address(to),
+    def encode_neg_risk_redeem(self, condition_id, amounts):
+        """Calldata for NegRiskAdapter.redeemPositions with per-outcome amounts."""
+        data = self.neg_risk_adapter.functions.redeemPositions(
+            bytes.fromhex(condition_id[2:]), list(amounts)
+        )._encode_transaction_data()
+        return bytes.fromhex(data[2:])
+
+    def encode_multisend(self, calls):
+        """Calldata for MultiSend.multiSend over ``(to, data)`` calls.
+
+        Each call is packed as operation (uint8), to (address), value (uint256),
+        data length (uint256) and data, with no padding between entries.
+        """
+        transactions = b"".join(
+            OPERATION_CALL.to_bytes(1, "big")
+            + Web3.to_bytes(hexstr=to)
+            + (0).to_bytes(32, "big")
+            + len(data).to_bytes(32, "big")
+            + data
+            for to, data in calls
+        )
+        data = self.multisend.functions.multiSend(transactions)._encode_transaction_data()
+        return bytes.fromhex(data[2:])
+
+    async def send_safe_transaction(
+        self, to, data, operation, safe_nonce, signer_nonce, gas, estimate=True
+    ):
+        """Sign ``data`` as the Safe owner and submit execTransaction.
+
+        Uses cached EIP-1559 fees and, if ``estimate``, an estimated gas limit
+        with GAS_LIMIT_BUFFER headroom (``gas`` is the fallback). Returns the
+        sent transaction and its hash.
+        """
+        account = self.account
+        to = Web3.to_checksum_address(to)
+        tx_hash = await self.safe.functions.getTransactionHash(
+            to,
             0,
-            bytes.fromhex(data[2:]),
-            0,  # operation: Call
+            data,
+            operation,
             0,
             0,
             0,  # safeTxGas, baseGas, gasPrice
-            "0x0000000000000000000000000000000000000000",  # gasToken
-            "0x0000000000000000000000000000000000000000",  # refundReceiver
-            nonce,
+            ZERO_ADDRESS,  # gasToken
+            ZERO_ADDRESS,  # refundReceiver
+            safe_nonce,
         ).call()
 
         # Sign the hash
@@ -132,84 +289,554 @@ def merge_tokens(condition_id, amount=None, neg_risk=False):
         signature = r + s + v
 
         # Build and send transaction
-        tx = safe.functions.execTransaction(
-            Web3.to_checksum_address(to),
-            0,
-            bytes.fromhex(data[2:]),
+        exec_transaction = self.safe.functions.execTransaction(
+            to,
             0,
+            data,
+            operation,
             0,
             0,
             0,
-            "0x0000000000000000000000000000000000000000",
-            "0x0000000000000000000000000000000000000000",
+            ZERO_ADDRESS,
+            ZERO_ADDRESS,
             signature,
-        ).build_transaction(
+        )
+        if estimate:
+            try:
+                gas = int(
+                    await exec_transaction.estimate_gas({"from": account.address})
+                    * GAS_LIMIT_BUFFER
+                )
+            except Exception as e:
+                logger.warning(f"Gas estimate failed, using {gas}: {str(e)}")
+        tx = await exec_transaction.build_transaction(
             {
                 "from": account.address,
-                "nonce": w3.eth.get_transaction_count(account.address),
-                "gas": 500000,
-                "gasPrice": w3.eth.gas_price,
+                "nonce": signer_nonce,
+                "gas": gas,
+                "chainId": CHAIN_ID,
+                **await self.gas_oracle.fees(),
             }
         )
 
         signed_tx = account.sign_transaction(tx)
-        tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+        return tx, await self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+
+    async def _find_receipt(self, hashes):
+        for sent_hash in hashes:
+            try:
+                return await self.w3.eth.get_transaction_receipt(sent_hash)
+            except TransactionNotFound:
+                pass
+        return None
+
+    async def wait_for_receipt(self, tx, tx_hash):
+        """Poll for the receipt of ``tx``, replacing it with higher fees while it is stuck.
+
+        Replacements reuse the signer nonce, so whichever version gets mined
+        first wins; all of their hashes are polled. The caller keeps the
+        batch's conditions in flight until this returns, so it never gives up
+        while any version could still be mined: past RECEIPT_TIMEOUT_SECONDS
+        it keeps polling and returns None only once the signer's mined nonce
+        has moved past ``tx`` with no receipt for any of our hashes.
+        """
+        hashes = [tx_hash]
+        started = last_sent = time.time()
+        warned = False
+        while True:
+            try:
+                receipt = await self._find_receipt(hashes)
+                if receipt is not None:
+                    return receipt
+                if time.time() - started >= RECEIPT_TIMEOUT_SECONDS:
+                    if not warned:
+                        logger.warning(
+                            f"No receipt after {RECEIPT_TIMEOUT_SECONDS}s for nonce "
+                            f"{tx['nonce']}, still waiting"
+                        )
+                        warned = True
+                    mined = await self.w3.eth.get_transaction_count(
+                        self.account.address, "latest"
+                    )
+                    if mined > tx["nonce"]:
+                        # The nonce is used up; look once more in case our
+                        # version was mined after the poll above
+                        return await self._find_receipt(hashes)
+            except Exception as e:
+                # An RPC hiccup says nothing about the transaction; releasing
+                # its conditions here could resubmit them while it is mined
+                logger.warning(f"Error polling nonce {tx['nonce']}: {str(e)}")
+                await asyncio.sleep(RECEIPT_POLL_SECONDS)
+                continue
+            if time.time() - last_sent > GAS_SPEED_UP_AFTER_SECONDS:
+                # ``tx`` keeps the fees of the last copy the node accepted, so a
+                # failed send is retried from (not compounded on) those fees
+                try:
+                    replacement = {**tx, **await self.gas_oracle.speed_up_fees(tx)}
+                    signed_tx = self.account.sign_transaction(replacement)
+                    hashes.append(
+                        await self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+                    )
+                    tx = replacement
+                    logger.info(
+                        f"Sped up transaction nonce {tx['nonce']}: "
+                        f"max fee {tx['maxFeePerGas'] / 10**9:.1f} gwei"
+                    )
+                except Exception as e:
+                    # Typically "nonce too low": an earlier version was just mined
+                    logger.warning(f"Speed-up failed: {str(e)}")
+                last_sent = time.time()
+            await asyncio.sleep(RECEIPT_POLL_SECONDS)
+
+    async def confirm_batch(self, tx, tx_hash, chunk, action, submitted_at):
+        """Wait for one batched transaction and release its conditions for later cycles."""
+        success = False
+        try:
+            receipt = await self.wait_for_receipt(tx, tx_hash)
+            success = receipt is not None and receipt["status"] == 1
+            if receipt is None:
+                # Another transaction took the nonce, so none of ours can be
+                # mined any more and the conditions are safe to resubmit
+                FAILED_BATCHES.inc()
+                logger.error(
+                    f"Batch {action} dropped: nonce {tx['nonce']} was used by another "
+                    f"transaction ({len(chunk)} conditions)"
+                )
+            elif success:
+                self.record_settled(chunk, submitted_at)
+                total = sum(amount for _, _, _, amount in chunk)
+                logger.info(
+                    f"Batch {action} successful! {len(chunk)} conditions, "
+                    f"Amount: {total / 10**USDCE_DIGITS} USDC, "
+                    f"confirmed in {time.time() - submitted_at:.1f}s"
+                )
+            else:
+                FAILED_BATCHES.inc()
+                logger.error(
+                    f"Batch {action} failed: Transaction reverted ({len(chunk)} conditions)"
+                )
+        except Exception as e:
+            FAILED_BATCHES.inc()
+            logger.error(f"Batch {action} failed: {str(e)}")
+        finally:
+            self.nonces.confirmed(success)
+            for condition_id, _, _, _ in chunk:
+                self.in_flight.discard(condition_id)
+                self.detected_at.pop(condition_id, None)
+            IN_FLIGHT.set(len(self.in_flight))
+        return success
+
+    async def submit_batch(self, calls, gas_per_call, action):
+        """
+        Submit ``(condition_id, to, data, amount)`` calls, one Safe transaction per gas-budget chunk.
+
+        The Safe delegatecalls MultiSendCallOnly, which runs every call as a call
+        from the Safe. Chunks are sent back to back with locally tracked nonces
+        and confirmed concurrently in background tasks. Conditions that already
+        have a transaction in flight are skipped.
+
+        Returns:
+            list: confirmation tasks, each resolving to True if its chunk succeeded
+        """
+        confirmations = []
+        async with self.nonces.lock:
+            calls = [call for call in calls if call[0] not in self.in_flight]
+            for chunk in chunk_by_gas(calls, gas_per_call):
+                data = self.encode_multisend(
+                    [(to, call_data) for _, to, call_data, _ in chunk]
+                )
+                submitted_at = time.time()
+                try:
+                    tx, tx_hash = await self.nonces.send(
+                        MULTISEND_CALL_ONLY_ADDRESS,
+                        data,
+                        OPERATION_DELEGATECALL,
+                        SAFE_TX_GAS_OVERHEAD + gas_per_call * len(chunk),
+                    )
+                except Exception as e:
+                    FAILED_BATCHES.inc()
+                    logger.error(f"Batch {action} failed: {str(e)}")
+                    break
+                self.in_flight.update(condition_id for condition_id, _, _, _ in chunk)
+                IN_FLIGHT.set(len(self.in_flight))
+                task = asyncio.create_task(
+                    self.confirm_batch(tx, tx_hash, chunk, action, submitted_at)
+                )
+                self._confirmation_tasks.add(task)
+                task.add_done_callback(self._confirmation_tasks.discard)
+                confirmations.append(task)
+        return confirmations
+
+    async def merge_tokens_batch(self, amounts, neg_risk=False):
+        """
+        Submit merges for many conditions in as few Safe transactions as possible.
+
+        Args:
+            amounts: Mapping of condition ID to amount in base units
+            neg_risk: Whether to use NEG_RISK_ADAPTER (default: False)
+
+        Returns:
+            list: confirmation tasks, each resolving to True if its chunk merged
+        """
+        to = NEG_RISK_ADAPTER_ADDRESS if neg_risk else CONDITIONAL_TOKENS_FRAMEWORK_ADDRESS
+        calls = [
+            (condition_id, to, self.encode_merge(condition_id, amount), amount)
+            for condition_id, amount in amounts.items()
+            if amount > 0
+        ]
+        return await self.submit_batch(calls, MERGE_GAS, "merge")
+
+    async def redeem_positions_batch(self, positions):
+        """
+        Submit redemptions of resolved conditions in as few Safe transactions as possible.
+
+        Args:
+            positions: Mapping of condition ID to (neg_risk, per-outcome balances)
+
+        Returns:
+            list: confirmation tasks, each resolving to True if its chunk redeemed
+        """
+        calls = []
+        for condition_id, (neg_risk, balances) in positions.items():
+            if not any(balances):
+                continue
+            if neg_risk:
+                to = NEG_RISK_ADAPTER_ADDRESS
+                data = self.encode_neg_risk_redeem(condition_id, balances)
+            else:
+                to = CONDITIONAL_TOKENS_FRAMEWORK_ADDRESS
+                data = self.encode_redeem(condition_id)
+            calls.append((condition_id, to, data, sum(balances)))
+        return await self.submit_batch(calls, REDEEM_GAS, "redeem")
+
+    async def merge_tokens(self, condition_id, amount=None, neg_risk=False, amount_wei=None):
+        """
+        Merge conditional tokens back to USDC.
+
+        Args:
+            condition_id: The condition ID (bytes32 hex string)
+            amount: Amount to merge in USDC (e.g., "1.5"). If None, merges all available tokens
+            neg_risk: Whether to use NEG_RISK_ADAPTER (default: False)
+            amount_wei: Amount to merge in base units, e.g. from get_mergeable_amounts().
+                Takes precedence over amount
+
+        Returns:
+            bool: True if merge successful, False otherwise
+        """
+        try:
+            # Determine merge amount
+            if amount_wei is None:
+                if amount is None:
+                    # Get minimum balance of both positions
+                    amounts = await self.get_mergeable_amounts([condition_id])
+                    amount_wei = amounts[condition_id]
+                else:
+                    amount_wei = int(float(amount) * (10**USDCE_DIGITS))
 
-        # Wait for receipt
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-
-        # Check if transaction succeeded
-        if receipt["status"] == 1:
-            print(f"Merge successful! Amount: {amount_wei / 10**USDCE_DIGITS} USDC")
-            return True
-        else:
-            print("Merge failed: Transaction reverted")
-            return False
-
-    except Exception as e:
-        print(f"Merge failed: {str(e)}")
-        return False
-
-
-private_key = os.getenv("PRIVATE_KEY")
-account = Account.from_key(private_key)
-safe_address = Web3.to_checksum_address(os.getenv("POLYMARKET_PROXY_ADDRESS"))
-w3 = Web3(Web3.HTTPProvider(os.getenv("RPC_URL")))
-w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
-matic_balance = w3.eth.get_balance(account.address)
-proxy_balance = w3.eth.get_balance(safe_address)
+            if amount_wei == 0:
+                logger.error("Merge failed: No tokens to merge")
+                return False
 
-print(f"--- Wallet Check ---")
-print(f"Signer Address (from Private Key): {account.address}")
-print(f"Signer POL Balance: {w3.from_wei(matic_balance, 'ether')} POL")
-print(f"Proxy Address (Safe): {safe_address}")
-print(f"Proxy POL Balance: {w3.from_wei(proxy_balance, 'ether')} POL")
-print(f"--------------------")
+            confirmations = await self.merge_tokens_batch({condition_id: amount_wei}, neg_risk)
+            return bool(confirmations) and await confirmations[0]
 
-if matic_balance == 0:
-    raise Exception(f"STOP: Your Signer address {account.address} has NO gas!")
+        except Exception as e:
+            logger.error(f"Merge failed: {str(e)}")
+            return False
 
+    async def check_wallet(self):
+        w3, account = self.w3, self.account
+        matic_balance = await w3.eth.get_balance(account.address)
+        proxy_balance = await w3.eth.get_balance(self.safe_address)
 
-async def do_it():
+        logger.info(
+            f"Signer {account.address}: {w3.from_wei(matic_balance, 'ether')} POL, "
+            f"proxy (Safe) {self.safe_address}: {w3.from_wei(proxy_balance, 'ether')} POL"
+        )
 
-    url = f"https://data-api.polymarket.com/positions?sizeThreshold=1&limit=100&sortBy=TOKENS&sortDirection=DESC&user={os.getenv('POLYMARKET_PROXY_ADDRESS')}&mergeable=true"
+        if matic_balance == 0:
+            raise Exception(f"STOP: Your Signer address {account.address} has NO gas!")
+
+    async def get_mergeable_amounts(self, condition_ids):
+        """Mergeable amount in base units (the smaller outcome balance) per condition.
+
+        All balances are read with balanceOfBatch, one eth_call per
+        BALANCE_BATCH_SIZE positions (issued concurrently), instead of two
+        balanceOf calls per condition.
+        """
+        condition_ids = list(condition_ids)
+        position_ids = [
+            position_id
+            for condition_id in condition_ids
+            for position_id in get_position_ids(condition_id, USDC_ADDRESS)
+        ]
+        balances = await self.get_balances(position_ids)
+        return {
+            condition_id: min(balances[2 * i], balances[2 * i + 1])
+            for i, condition_id in enumerate(condition_ids)
+        }
+
+    async def get_balances(self, position_ids):
+        """Safe balances for ``position_ids``, BALANCE_BATCH_SIZE per balanceOfBatch call."""
+        chunks = [
+            position_ids[start : start + BALANCE_BATCH_SIZE]
+            for start in range(0, len(position_ids), BALANCE_BATCH_SIZE)
+        ]
+        results = await asyncio.gather(
+            *(
+                self.ctf.functions.balanceOfBatch(
+                    [self.safe_address] * len(chunk), chunk
+                ).call()
+                for chunk in chunks
+            )
+        )
+        return [balance for result in results for balance in result]
+
+    async def fetch_mergeable_condition_ids(self, session):
+        params = {
+            "sizeThreshold": 1,
+            "limit": 100,
+            "sortBy": "TOKENS",
+            "sortDirection": "DESC",
+            "user": self.safe_address,
+            "mergeable": "true",
+        }
+        async with session.get(POSITIONS_URL, params=params) as response:
+            positions = await response.json()
+        return {position["conditionId"] for position in positions or ()}
+
+    async def fetch_redeemable_positions(self, session):
+        """Outcome token IDs held in resolved markets, per condition ID.
+
+        Returns a mapping of condition ID to (neg_risk, {outcome index: token ID}).
+        """
+        params = {
+            "sizeThreshold": 0,
+            "limit": 500,
+            "user": self.safe_address,
+            "redeemable": "true",
+        }
+        async with session.get(POSITIONS_URL, params=params) as response:
+            positions = await response.json()
+        redeemable = {}
+        for position in positions or ():
+            neg_risk, assets = redeemable.setdefault(
+                position["conditionId"], (bool(position.get("negativeRisk")), {})
+            )
+            assets[int(position.get("outcomeIndex", len(assets)))] = int(position["asset"])
+        return redeemable
+
+    async def get_redeemable_balances(self, redeemable):
+        """Confirm resolution on chain and read the Safe's balances to redeem.
+
+        Returns a mapping of condition ID to (neg_risk, [outcome 0, outcome 1] balances)
+        for conditions whose payouts have been reported.
+        """
+        condition_ids = [c for c in redeemable if c not in self.in_flight]
+        denominators = await asyncio.gather(
+            *(
+                self.ctf.functions.payoutDenominator(bytes.fromhex(c[2:])).call()
+                for c in condition_ids
+            )
+        )
+        resolved = [c for c, d in zip(condition_ids, denominators) if d > 0]
+        position_ids = []
+        for condition_id in resolved:
+            assets = redeemable[condition_id][1]
+            # Outcomes not in the API response are looked up as token ID 0 (balance 0)
+            position_ids.extend(assets.get(index, 0) for index in (0, 1))
+        balances = await self.get_balances(position_ids) if position_ids else []
+        return {
+            condition_id: (redeemable[condition_id][0], balances[2 * i : 2 * i + 2])
+            for i, condition_id in enumerate(resolved)
+        }
+
+    async def redeem_resolved(self, session):
+        redeemable = await self.fetch_redeemable_positions(session)
+        if not redeemable:
+            return
+        positions = await self.get_redeemable_balances(redeemable)
+        confirmations = await self.redeem_positions_batch(positions)
+        if confirmations:
+            logger.info(
+                f"Submitted {len(confirmations)} redeem transactions, "
+                f"{len(self.in_flight)} conditions in flight"
+            )
 
-    response = requests.get(url).json()
-    if not response:
-        print("No mergeable positions found.")
-        return
-    condition_ids = set([token["conditionId"] for token in response])
-    condition_ids
-    for condition_id in condition_ids:
-        print("Merging tokens for condition ID:", condition_id)
-        merge_tokens(condition_id)
+    async def merge_conditions(self, condition_ids):
+        now = time.time()
+        for condition_id in condition_ids:
+            self.detected_at.setdefault(condition_id, now)
+        condition_ids = set(condition_ids) - self.in_flight
+        if not condition_ids:
+            return
+        amounts = await self.get_mergeable_amounts(condition_ids)
+        for condition_id, amount in amounts.items():
+            if amount == 0:
+                self.detected_at.pop(condition_id, None)
+        confirmations = await self.merge_tokens_batch(amounts)
+        if confirmations:
+            logger.info(
+                f"Submitted {len(confirmations)} merge transactions, "
+                f"{len(self.in_flight)} conditions in flight"
+            )
 
+    async def do_it(self, session):
+        if POSITION_INDEX:
+            # Local candidates; amounts are still read on chain before merging.
+            # Off the loop: the first call opens SQLite and may bootstrap
+            condition_ids = set(
+                await asyncio.to_thread(lambda: get_position_index().mergeable_conditions())
+            )
+        else:
+            condition_ids = await self.fetch_mergeable_condition_ids(session)
+        if not condition_ids:
+            logger.info("No mergeable positions found.")
+            return
+        await self.merge_conditions(condition_ids)
+
+    async def merge_notified(self, intake):
+        """Merge conditions as soon as the trader reports their pairs filled."""
+        while True:
+            if not intake.pending:
+                await intake.event.wait()
+            await asyncio.sleep(MERGE_COALESCE_SECONDS)
+            intake.event.clear()
+            # Conditions with a merge in flight stay pending until it confirms,
+            # so a pair filled meanwhile is merged right after
+            condition_ids = intake.pending - self.in_flight
+            intake.pending -= condition_ids
+            if not condition_ids:
+                continue
+            logger.info(f"Merging {len(condition_ids)} conditions notified by the trader")
+            try:
+                await self.merge_conditions(condition_ids)
+            except Exception as e:
+                # Keep the batch for the next round rather than waiting for
+                # the slow scan; IDs are validated on receipt, so this is the
+                # RPC failing, not a bad condition
+                logger.error(f"Notified merge failed, retrying: {str(e)}")
+                intake.pending |= condition_ids
+                intake.event.set()
+                await asyncio.sleep(MERGE_RETRY_SECONDS)
+
+    async def scan_positions(self, session):
+        """Slow safety net for unreported fills, plus redemption of resolved markets."""
+        while True:
+            try:
+                await self.do_it(session)
+            except Exception as e:
+                logger.error(f"Merge scan failed: {str(e)}")
+            try:
+                await self.redeem_resolved(session)
+            except Exception as e:
+                logger.error(f"Redeem scan failed: {str(e)}")
+            self.log_stats()
+            await asyncio.sleep(SCAN_INTERVAL_SECONDS)
+
+    def record_settled(self, chunk, submitted_at):
+        now = time.time()
+        self.settled += len(chunk)
+        SETTLED_CONDITIONS.inc(len(chunk))
+        self.submit_latencies.append(now - submitted_at)
+        CONFIRM_SECONDS.observe(now - submitted_at)
+        for condition_id, _, _, _ in chunk:
+            detected_at = self.detected_at.get(condition_id)
+            if detected_at is not None:
+                self.detect_latencies.append(now - detected_at)
+                DETECT_TO_CONFIRM_SECONDS.observe(now - detected_at)
+
+    def stats(self):
+        """Settled conditions, median latencies in seconds and RPC counts by method."""
+
+        def median(values):
+            return sorted(values)[len(values) // 2] if values else None
+
+        return {
+            "settled": self.settled,
+            "in_flight": len(self.in_flight),
+            "submit_to_confirm": median(self.submit_latencies),
+            "detect_to_confirm": median(self.detect_latencies),
+            "rpc_calls": sum(self.provider.rpc_counts.values()),
+            "rpc_by_method": dict(self.provider.rpc_counts),
+        }
+
+    def log_stats(self):
+        stats = self.stats()
+        settled = stats["settled"] - self._reported[0]
+        rpc_calls = stats["rpc_calls"] - self._reported[1]
+        self._reported = (stats["settled"], stats["rpc_calls"])
+        if not settled:
+            return
+        logger.info(
+            f"Merger: {settled} conditions settled with {rpc_calls} RPC calls "
+            f"({rpc_calls / settled:.1f} per condition), median submit->confirm "
+            f"{stats['submit_to_confirm']:.1f}s, detect->confirm "
+            f"{stats['detect_to_confirm'] or 0:.1f}s"
+        )
 
-async def main():
-    while True:
-        asyncio.create_task(do_it())
-        await asyncio.sleep(10)
+    async def run(self):
+        await self.check_wallet()
+        loop = asyncio.get_running_loop()
+        intake = MergeIntake()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: intake, local_addr=(MERGE_INTAKE_HOST, MERGE_INTAKE_PORT)
+        )
+        logger.info(
+            f"Listening for filled pairs on udp://{MERGE_INTAKE_HOST}:{MERGE_INTAKE_PORT}"
+        )
+        try:
+            async with aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as session:
+                await asyncio.gather(
+                    self.gas_oracle.run(),
+                    self.merge_notified(intake),
+                    self.scan_positions(session),
+                )
+        finally:
+            transport.close()
+
+    def start_background(self):
+        """Run the service on its own event loop in a daemon thread."""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="merger", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run_loop(self):
+        pin_current_thread("background")
+        asyncio.set_event_loop(self._loop)
+        self._task = self._loop.create_task(self.run())
+        try:
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Merger stopped: {str(e)}")
+        finally:
+            self._loop.close()
+
+    def stop(self):
+        if self._task is not None:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+
+
+def chunk_by_gas(items, gas_per_item, budget=MULTISEND_GAS_BUDGET):
+    """Split ``items`` into the fewest chunks whose gas estimate fits ``budget``."""
+    per_chunk = max(1, (budget - SAFE_TX_GAS_OVERHEAD) // gas_per_item)
+    return [items[i : i + per_chunk] for i in range(0, len(items), per_chunk)]
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    from utils.logger import setup_logging
+
+    setup_logging()
+    if MERGER_METRICS_PORT:
+        try:
+            start_metrics_server(METRICS_HOST, MERGER_METRICS_PORT)
+        except OSError as e:
+            logger.error(
+                f"Metrics disabled, cannot serve on {METRICS_HOST}:{MERGER_METRICS_PORT}: {e}"
+            )
+    asyncio.run(MergerService().run())
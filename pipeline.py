@@ -0,0 +1,335 @@
+import gc
+import os
+import time
+import struct
+import logging
+import argparse
+import multiprocessing as mp
+from utils.logger import setup_logging
+from utils.tokens import fetch_tokens
+from utils.slug import get_session_start
+from utils.events import EVENTS
+from utils.orderbook import OrderBook, SIGNALES
+from utils.shm_ring import ShmRing
+from utils.cpu_affinity import pin_process_to_core
+from utils.market_time import get_trading_window_end, is_in_trading_window
+from utils.clob_client import init_global_client, is_client_ready
+from utils.clob_orders import cache_token_trading_infos
+from utils.strategy import AnchorHedgeStrategy, DirectOrderGateway
+from utils.risk import RiskState
+from utils.live_config import LIVE_CONFIG
+from config import MARKET_SESSION_SECONDS, PIPELINE_RING_CAPACITY
+
+logger = logging.getLogger(__name__)
+
+BOOK_RING = "pm_hft_book"
+INTENT_RING = "pm_hft_intents"
+RESULT_RING = "pm_hft_results"
+
+# ts_ns, version, session_start, best_bid, best_bid_size, best_ask, best_ask_size,
+# micro_price, mid_price, micro_vs_mid_bps, signal, inventory
+BOOK_RECORD = struct.Struct("<QQQdddddddbi")
+# ts_ns, book_ts_ns, session_start, anchor side (1 UP / -1 DOWN), price, hedge price
+INTENT_RECORD = struct.Struct("<QQQbdd")
+# intent ts_ns, session_start, price, hedge price, legs placed, legs failed
+RESULT_RECORD = struct.Struct("<QQddbb")
+
+SIGNAL_CODES = {SIGNALES.NEUTRAL: 0, SIGNALES.UP: 1, SIGNALES.DOWN: -1}
+SIGNALS_BY_CODE = {code: signal for signal, code in SIGNAL_CODES.items()}
+
+# Consumers spin this many empty polls before backing off with a short sleep
+SPIN_ITERATIONS = 1000
+IDLE_SLEEP_SECONDS = 0.0001
+
+
+class SnapshotBook:
+    """Read-only stand-in for OrderBook, fed from BOOK_RECORD snapshots."""
+
+    def __init__(self, session_start):
+        self.session_start = session_start
+        self.up_token_id = None
+        self.down_token_id = None
+        self.signed_orders_cache = None
+        self.last_signal = SIGNALES.NEUTRAL
+        self.inventory = 0
+        self.risk = RiskState(f"session-{session_start}")
+        self.version = 0
+        self.ts_ns = 0
+        self.orderbook = {"last_update": None}
+        self._market_data = None
+
+    def apply(self, record):
+        (
+            ts_ns,
+            version,
+            _session_start,
+            best_bid,
+            best_bid_volume,
+            best_ask,
+            best_ask_volume,
+            micro_price,
+            mid_price,
+            micro_vs_mid_bps,
+            signal,
+            inventory,
+        ) = record
+        self.ts_ns = ts_ns
+        self.version = version
+        self.orderbook["last_update"] = ts_ns / 1e9
+        self.last_signal = SIGNALS_BY_CODE[signal]
+        self.inventory = inventory
+        self._market_data = {
+            "best_bid_price": best_bid,
+            "best_ask_price": best_ask,
+            "best_bid_volume": best_bid_volume,
+            "best_ask_volume": best_ask_volume,
+            "micro_price": micro_price,
+            "mid_price": mid_price,
+            "micro_vs_mid_bps": micro_vs_mid_bps,
+        }
+
+    def get_current_market_data(self):
+        return self._market_data
+
+
+class RingOrderGateway:
+    """Hands order intents to the gateway process instead of posting them.
+
+    ``submit`` returns [] for a queued intent, so its risk reservation stays
+    until the gateway's result comes back through ``settle_results``.
+    """
+
+    def __init__(self, intents, results):
+        self.intents = intents
+        self.results = results
+
+    def submit(self, book, anchor_side, price, hedge_price):
+        side = 1 if anchor_side == "UP" else -1
+        if not self.intents.push(
+            time.time_ns(), book.ts_ns, book.session_start, side, price, hedge_price
+        ):
+            logger.error("Order intent ring full, dropping intent")
+            return [None, None]
+        return []
+
+    def settle_results(self, book):
+        """Apply every gateway result for ``book``'s session to its risk state."""
+        while True:
+            result = self.results.pop()
+            if result is None:
+                return
+            _, session_start, price, hedge_price, placed, failed = result
+            if book is None or session_start != book.session_start:
+                continue
+            # Same expression the strategy reserved with, so releases are exact
+            book.risk.settle_pair(
+                [True] * placed + [None] * failed, 5 * (price + hedge_price)
+            )
+
+
+def feed_process(core):
+    """Owns the WebSocket, book, signal monitor and inventory updater."""
+    pin_process_to_core(core)
+    setup_logging()
+    LIVE_CONFIG.start()
+    ring = ShmRing.attach(BOOK_RING, BOOK_RECORD)
+
+    while True:
+        up_token, down_token, market_slug = fetch_tokens()
+        session_start = get_session_start(market_slug)
+        book = OrderBook(
+            up_token, down_token, market_slug, presign_orders=False, publish=True
+        )
+        book.start()
+
+        session_end = get_trading_window_end()
+        while True:
+            timeout = session_end - time.time()
+            if timeout <= 0:
+                break
+            book.events.wait(timeout)
+            market_data = book.get_current_market_data()
+            if not market_data:
+                continue
+            ring.push(
+                time.time_ns(),
+                book.version,
+                session_start,
+                market_data["best_bid_price"],
+                market_data["best_bid_volume"],
+                market_data["best_ask_price"],
+                market_data["best_ask_volume"],
+                market_data["micro_price"],
+                market_data["mid_price"],
+                market_data["micro_vs_mid_bps"],
+                SIGNAL_CODES[book.last_signal],
+                book.inventory,
+            )
+
+        book.stop()
+        logger.info(
+            f"Trading session ended. Dropped {ring.dropped} snapshots. Starting new session."
+        )
+        gc.collect()
+        time.sleep(10)
+
+
+def strategy_process(core):
+    """Runs AnchorHedgeStrategy on the newest snapshot and emits order intents."""
+    pin_process_to_core(core)
+    setup_logging()
+    LIVE_CONFIG.start()
+    books = ShmRing.attach(BOOK_RING, BOOK_RECORD)
+    gateway = RingOrderGateway(
+        ShmRing.attach(INTENT_RING, INTENT_RECORD),
+        ShmRing.attach(RESULT_RING, RESULT_RECORD),
+    )
+    strategy = AnchorHedgeStrategy(gateway=gateway)
+
+    book = None
+    deadline = None
+    idle = 0
+    while True:
+        gateway.settle_results(book)
+        record = books.pop_latest()
+        if record is None:
+            if deadline is not None and time.time() >= deadline:
+                try:
+                    deadline = strategy.on_event(EVENTS.TIMER, book)
+                except Exception as e:
+                    logger.error(f"Error in strategy: {e}")
+                    deadline = None
+                continue
+            idle += 1
+            if idle > SPIN_ITERATIONS:
+                time.sleep(IDLE_SLEEP_SECONDS)
+            continue
+
+        idle = 0
+        if book is None or record[2] != book.session_start:
+            if book is not None:
+                strategy.on_session_end(book)
+                book.risk.close()
+            book = SnapshotBook(record[2])
+            strategy.on_session_start(book)
+        book.apply(record)
+        try:
+            deadline = strategy.on_event(EVENTS.BOOK, book)
+        except Exception as e:
+            logger.error(f"Error in strategy: {e}")
+            deadline = None
+
+
+def gateway_process(core):
+    """Signs and posts orders for intents coming from the strategy process."""
+    pin_process_to_core(core)
+    setup_logging()
+    LIVE_CONFIG.start()
+    init_global_client()
+    if not is_client_ready():
+        logger.error("ClobClient is not ready. Exiting.")
+        return
+    intents = ShmRing.attach(INTENT_RING, INTENT_RECORD)
+    results = ShmRing.attach(RESULT_RING, RESULT_RECORD)
+    gateway = DirectOrderGateway()
+
+    book = None
+    session = None
+    next_prepare = 0.0
+    idle = 0
+    while True:
+        intent = intents.pop()
+        if intent is None:
+            now = time.time()
+            current = (int(now) // MARKET_SESSION_SECONDS) * MARKET_SESSION_SECONDS
+            if current != session and now >= next_prepare and is_in_trading_window():
+                # Presign the order cache for the new session while idle
+                next_prepare = now + 1
+                up_token, down_token, market_slug = fetch_tokens()
+                if market_slug and get_session_start(market_slug) == current:
+                    book = OrderBook(up_token, down_token, market_slug)
+                    book.create_signed_orders_cache()
+                    cache_token_trading_infos(book)
+                    session = current
+            idle += 1
+            if idle > SPIN_ITERATIONS:
+                time.sleep(IDLE_SLEEP_SECONDS)
+            continue
+
+        idle = 0
+        ts_ns, book_ts_ns, session_start, side, price, hedge_price = intent
+        order_ids = [None, None]
+        if session_start != session:
+            logger.error(
+                f"Dropping intent for session {session_start}: gateway is on session {session}"
+            )
+        else:
+            received_ns = time.time_ns()
+            try:
+                order_ids = gateway.submit(
+                    book, "UP" if side > 0 else "DOWN", price, hedge_price
+                )
+            except Exception as e:
+                logger.error(f"Error posting intent: {e}")
+            logger.info(
+                f"Posted intent {order_ids}: book->intent {(ts_ns - book_ts_ns) / 1e6:.3f}ms, "
+                f"intent->gateway {(received_ns - ts_ns) / 1e6:.3f}ms, "
+                f"post {(time.time_ns() - received_ns) / 1e6:.3f}ms"
+            )
+
+        # Report back so the strategy releases or keeps the risk reservation
+        placed = sum(1 for order_id in order_ids if order_id)
+        if not results.push(
+            ts_ns, session_start, price, hedge_price, placed, len(order_ids) - placed
+        ):
+            logger.error("Order result ring full, dropping result")
+
+
+def default_cores():
+    cpu_count = os.cpu_count()
+    return [(cpu_count - offset) % cpu_count for offset in (1, 2, 3)]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run feed, strategy and order gateway as separate pinned processes"
+    )
+    parser.add_argument(
+        "--cores",
+        default=None,
+        help="Comma-separated cores for feed,strategy,gateway (default: last three)",
+    )
+    args = parser.parse_args()
+    cores = [int(c) for c in args.cores.split(",")] if args.cores else default_cores()
+
+    logger = setup_logging()
+    book_ring = ShmRing.create(BOOK_RING, BOOK_RECORD, PIPELINE_RING_CAPACITY)
+    intent_ring = ShmRing.create(INTENT_RING, INTENT_RECORD, PIPELINE_RING_CAPACITY)
+    result_ring = ShmRing.create(RESULT_RING, RESULT_RECORD, PIPELINE_RING_CAPACITY)
+    processes = [
+        mp.Process(target=feed_process, args=(cores[0],), name="feed"),
+        mp.Process(target=strategy_process, args=(cores[1],), name="strategy"),
+        mp.Process(target=gateway_process, args=(cores[2],), name="gateway"),
+    ]
+    logger.info(
+        f"Starting pipeline: feed@{cores[0]} strategy@{cores[1]} gateway@{cores[2]}"
+    )
+    try:
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        book_ring.close()
+        intent_ring.close()
+        result_ring.close()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nPipeline stopped by user")
@@ -0,0 +1,144 @@
+"""Vectorized versions of the live signal and entry rules.
+
+Every function takes the column dict returned by
+``utils.market_store.load_range`` (one row per book update, with "session"
+and "segment" columns) and works on whole arrays at once, so thousands of
+sessions are processed without a Python loop per tick.
+"""
+
+import numpy as np
+from config import (
+    TRADING_BPS_THRESHOLD,
+    MAX_TRADING_BPS_THRESHOLD,
+    ENTRY_ASK_BAND,
+    ENTRY_BID_BAND,
+    MAX_ENTRY_ELAPSED_SECONDS,
+    MIN_DELAY_BETWEEN_TRADES_SECONDS,
+)
+
+# Same codes as the journal and the market store: 1 UP, -1 DOWN, 0 NEUTRAL
+UP, DOWN, NEUTRAL = 1, -1, 0
+SIGNAL_NAMES = {UP: "UP", DOWN: "DOWN", NEUTRAL: "NEUTRAL"}
+
+# Relative timestamps within a session fit well below this, so
+# segment * _SEGMENT_SPAN + offset orders rows by (segment, time)
+_SEGMENT_SPAN = 1 << 42  # ns, about 73 minutes
+
+
+def signals(micro_vs_mid_bps, threshold=TRADING_BPS_THRESHOLD):
+    """Signal the monitor publishes for each row, as in _continuous_trading_monitor."""
+    bps = np.asarray(micro_vs_mid_bps)
+    return (np.sign(bps) * (np.abs(bps) > threshold)).astype(np.int8)
+
+
+def entry_mask(
+    data,
+    signal,
+    max_bps=MAX_TRADING_BPS_THRESHOLD,
+    ask_band=ENTRY_ASK_BAND,
+    bid_band=ENTRY_BID_BAND,
+    max_elapsed=MAX_ENTRY_ELAPSED_SECONDS,
+):
+    """Rows where AnchorHedgeStrategy would enter, ignoring cooldown and risk limits.
+
+    Uses the signal of the same row; live, the strategy sees the monitor's
+    signal a wake-up later.
+    """
+    bid, ask = data["best_bid"], data["best_ask"]
+    elapsed = data["ts_ns"] / 1e9 - data["session"]
+    in_band = ((ask > ask_band[0]) & (ask < ask_band[1])) | (
+        (bid > bid_band[0]) & (bid < bid_band[1])
+    )
+    return (
+        in_band
+        & (np.abs(data["micro_vs_mid_bps"]) <= max_bps)
+        & (elapsed < max_elapsed)
+        & (signal != NEUTRAL)
+    )
+
+
+def entry_prices(data, signal):
+    """Anchor limit price per row: the UP bid for UP, 1 - UP ask for DOWN."""
+    return np.where(
+        signal > 0, np.round(data["best_bid"], 2), np.round(1 - data["best_ask"], 2)
+    )
+
+
+def throttle(mask, data, min_delay=MIN_DELAY_BETWEEN_TRADES_SECONDS):
+    """Keep the first entry per ``min_delay`` bucket of each session.
+
+    A vectorized stand-in for the strategy's rolling cooldown: entries
+    closer than ``min_delay`` can survive when they straddle a bucket edge.
+    """
+    rows = np.flatnonzero(mask)
+    if not len(rows) or not min_delay:
+        return mask
+    buckets = (data["ts_ns"][rows] // int(min_delay * 1e9)).astype(np.int64)
+    keys = np.stack([data["segment"][rows].astype(np.int64), buckets])
+    _, first = np.unique(keys, axis=1, return_index=True)
+    throttled = np.zeros_like(mask)
+    throttled[rows[first]] = True
+    return throttled
+
+
+def _row_keys(data):
+    segment = data["segment"].astype(np.int64)
+    offset = data["ts_ns"] - data["session"] * 1_000_000_000
+    # Rows before the session start (pre-open book) clamp to its start
+    return segment * _SEGMENT_SPAN + np.clip(offset, 0, _SEGMENT_SPAN - 1)
+
+
+def forward_moves(data, horizons, price=None):
+    """Change in mid-price ``horizon`` seconds after each row, per horizon.
+
+    Looks up the first row at or after ts + horizon in the same session
+    with one ``searchsorted`` per horizon; rows whose horizon runs past the
+    end of their session get NaN. ``price`` defaults to the mid-price.
+    """
+    if price is None:
+        price = (data["best_bid"] + data["best_ask"]) / 2
+    keys = _row_keys(data)
+    segment = data["segment"]
+    moves = {}
+    for horizon in horizons:
+        target = np.searchsorted(keys, keys + int(horizon * 1e9), side="left")
+        valid = target < len(keys)
+        target = np.minimum(target, len(keys) - 1)
+        valid &= segment[target] == segment
+        moves[horizon] = np.where(valid, price[target] - price, np.nan)
+    return moves
+
+
+def signal_flips(signal, segment):
+    """Number of signal changes within sessions (what SIGNAL_FLIPS counts live)."""
+    return int(np.count_nonzero((signal[1:] != signal[:-1]) & (segment[1:] == segment[:-1])))
+
+
+def conditional_moves(signal, moves, mask=None):
+    """Forward move statistics per signal, signed so positive favours the signal.
+
+    Returns ``{signal name: {horizon: {count, mean_cents, median_cents,
+    hit_rate}}}``; NEUTRAL moves are reported unsigned (UP direction).
+    """
+    report = {}
+    for code, name in SIGNAL_NAMES.items():
+        selected = signal == code
+        if mask is not None:
+            selected &= mask
+        report[name] = {}
+        for horizon, move in moves.items():
+            values = move[selected]
+            values = values[~np.isnan(values)] * (code or 1)
+            report[name][horizon] = summarize(values)
+    return report
+
+
+def summarize(values):
+    if not len(values):
+        return {"count": 0, "mean_cents": np.nan, "median_cents": np.nan, "hit_rate": np.nan}
+    return {
+        "count": len(values),
+        "mean_cents": float(values.mean() * 100),
+        "median_cents": float(np.median(values) * 100),
+        "hit_rate": float(np.count_nonzero(values > 0) / len(values)),
+    }
@@ -0,0 +1,152 @@
+"""Parameter sweep of the micro/mid signal over recorded sessions.
+
+Loads the top-of-book columns written by ``utils.market_store`` once,
+computes forward mid-price moves once per horizon, then evaluates every
+(threshold, max bps) pair with whole-array operations: entries per
+setting, and the forward move and hit rate of those entries in the
+direction of their signal.
+
+Usage:
+    python -m research.sweep --root data/market --prefix btc-updown-15m
+    python -m research.sweep --thresholds 25,50,75 --max-bps 100,150 --horizons 5,30,120
+"""
+
+import time
+import argparse
+from datetime import datetime, timezone
+import numpy as np
+from config import (
+    MARKET_STORE_PATH,
+    TRADING_BPS_THRESHOLD,
+    MAX_TRADING_BPS_THRESHOLD,
+    MIN_DELAY_BETWEEN_TRADES_SECONDS,
+)
+from utils.market_store import load_range
+from research.signals import (
+    signals,
+    entry_mask,
+    throttle,
+    forward_moves,
+    signal_flips,
+    conditional_moves,
+    summarize,
+)
+
+COLUMNS = ("ts_ns", "best_bid", "best_ask", "micro_vs_mid_bps")
+
+
+def load(root=MARKET_STORE_PATH, prefix=None, start=None, end=None):
+    return load_range(root, prefix, start, end, columns=COLUMNS)
+
+
+def sweep(
+    data,
+    thresholds,
+    max_bps_values,
+    horizons,
+    min_delay=MIN_DELAY_BETWEEN_TRADES_SECONDS,
+):
+    """One result dict per (threshold, max_bps) setting that can produce entries."""
+    moves = forward_moves(data, horizons)
+    segment = data["segment"]
+    results = []
+    for threshold in thresholds:
+        signal = signals(data["micro_vs_mid_bps"], threshold)
+        flips = signal_flips(signal, segment)
+        for max_bps in max_bps_values:
+            # Entries need threshold < |bps| <= max_bps
+            if max_bps <= threshold:
+                continue
+            mask = throttle(entry_mask(data, signal, max_bps), data, min_delay)
+            row = {
+                "threshold": threshold,
+                "max_bps": max_bps,
+                "flips": flips,
+                "entries": int(np.count_nonzero(mask)),
+                "sessions": len(np.unique(segment[mask])),
+            }
+            direction = signal[mask]
+            for horizon in horizons:
+                values = moves[horizon][mask] * direction
+                row[horizon] = summarize(values[~np.isnan(values)])
+            results.append(row)
+    return results
+
+
+def format_results(results, horizons, sort_horizon=None):
+    sort_horizon = horizons[-1] if sort_horizon is None else sort_horizon
+    results = sorted(
+        results,
+        key=lambda row: -np.nan_to_num(row[sort_horizon]["mean_cents"], nan=-np.inf),
+    )
+    header = f"{'thresh':>7} {'max':>6} {'flips':>8} {'entries':>8} {'sess':>6}" + "".join(
+        f" {f'{h:g}s mean/hit':>16}" for h in horizons
+    )
+    lines = [header]
+    for row in results:
+        line = (
+            f"{row['threshold']:>7g} {row['max_bps']:>6g} {row['flips']:>8} "
+            f"{row['entries']:>8} {row['sessions']:>6}"
+        )
+        for horizon in horizons:
+            stats = row[horizon]
+            line += f" {stats['mean_cents']:>8.3f}c/{stats['hit_rate']:>5.1%}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _timestamp(value):
+    if value is None:
+        return None
+    if value.isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--root", default=MARKET_STORE_PATH)
+    parser.add_argument("--prefix", help="Slug prefix, e.g. btc-updown-15m")
+    parser.add_argument("--start", help="First session start (Unix time or UTC ISO date)")
+    parser.add_argument("--end", help="Sessions starting before this (Unix time or UTC ISO date)")
+    parser.add_argument("--thresholds", default="10,25,50,75,100,150")
+    parser.add_argument("--max-bps", default="100,150,200,300")
+    parser.add_argument("--horizons", default="1,5,30,120", help="Seconds")
+    parser.add_argument("--min-delay", type=float, default=MIN_DELAY_BETWEEN_TRADES_SECONDS)
+    args = parser.parse_args()
+    if args.root is None:
+        parser.error("--root is required when MARKET_STORE_PATH is not set")
+
+    thresholds = [float(v) for v in args.thresholds.split(",")]
+    max_bps_values = [float(v) for v in args.max_bps.split(",")]
+    horizons = [float(v) for v in args.horizons.split(",")]
+
+    start = time.perf_counter()
+    data = load(args.root, args.prefix, _timestamp(args.start), _timestamp(args.end))
+    loaded = time.perf_counter()
+    sessions = len(np.unique(data["segment"]))
+    print(f"Loaded {len(data['ts_ns'])} rows from {sessions} sessions in {loaded - start:.2f}s")
+    if not len(data["ts_ns"]):
+        return
+
+    results = sweep(data, thresholds, max_bps_values, horizons, args.min_delay)
+    print(f"Swept {len(results)} settings in {time.perf_counter() - loaded:.2f}s\n")
+    print(format_results(results, horizons))
+
+    # Forward moves by signal at the live thresholds, before entry filters
+    signal = signals(data["micro_vs_mid_bps"], TRADING_BPS_THRESHOLD)
+    report = conditional_moves(signal, forward_moves(data, horizons))
+    print(
+        f"\nAll rows at TRADING_BPS_THRESHOLD={TRADING_BPS_THRESHOLD} "
+        f"(live MAX_TRADING_BPS_THRESHOLD={MAX_TRADING_BPS_THRESHOLD}):"
+    )
+    for name, by_horizon in report.items():
+        cells = " ".join(
+            f"{h:g}s {s['mean_cents']:.3f}c/{s['hit_rate']:.1%} (n={s['count']})"
+            for h, s in by_horizon.items()
+        )
+        print(f"  {name:>7}: {cells}")
+
+
+if __name__ == "__main__":
+    main()
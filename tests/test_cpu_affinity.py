@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from utils import cpu_affinity
+from utils.cpu_affinity import apply_thread_layout, plan_thread_layout
+
+
+def topology(cores, threads_per_core=1):
+    """Synthetic get_cpu_topology() result: one NUMA node, siblings numbered
+    like Linux does (CPU n and n + cores share a physical core)."""
+    cpus = cores * threads_per_core
+    return {
+        cpu: (0, frozenset(range(cpu % cores, cpus, cores)))
+        for cpu in range(cpus)
+    }
+
+
+def test_layout_keeps_background_off_reserved_cores():
+    layout = plan_thread_layout(topology(4))
+    assert layout == {"feed": {3}, "strategy": {2}, "background": {0, 1}}
+
+
+def test_small_machine_puts_background_on_siblings():
+    # Two physical cores, both reserved: background gets their hyperthreads
+    layout = plan_thread_layout(topology(2, threads_per_core=2))
+    assert layout["feed"] == {1}
+    assert layout["strategy"] == {0}
+    assert layout["background"] == {2, 3}
+
+
+def test_single_cpu_shares_strategy_core():
+    layout = plan_thread_layout(topology(1))
+    assert layout == {"feed": {0}, "strategy": {0}, "background": {0}}
+
+
+def test_layout_rejects_cores_outside_affinity():
+    outside = max(os.sched_getaffinity(0)) + 1
+    with pytest.raises(ValueError):
+        apply_thread_layout({"feed": [outside]})
+    with pytest.raises(ValueError):
+        apply_thread_layout({"monitor": [0]})
+
+
+def test_fifo_refused_where_background_shares_a_core(monkeypatch):
+    cpu = min(os.sched_getaffinity(0))
+    monkeypatch.setattr(cpu_affinity, "THREAD_SCHED_FIFO", True)
+    monkeypatch.setattr(cpu_affinity, "_pin", lambda tid, name, role: None)
+    monkeypatch.setattr(cpu_affinity, "_layout", None)
+    monkeypatch.setattr(cpu_affinity, "_fifo_roles", set())
+    apply_thread_layout({"feed": [cpu], "strategy": [cpu], "background": [cpu]})
+    assert cpu_affinity._fifo_roles == set()
@@ -0,0 +1,65 @@
+from utils.ctf import (
+    ALT_BN128_B,
+    ALT_BN128_P,
+    USDC_ADDRESS,
+    get_collection_id,
+    get_position_id,
+    get_position_ids,
+)
+
+# Recorded from Polygon: "Will Donald Trump win the 2024 US Presidential
+# Election?" is a neg-risk market, so its positions are backed by the
+# NegRiskAdapter's wrapped collateral. The position IDs are the contract's
+# getPositionId results, published by Polymarket as the market's CLOB token IDs.
+CONDITION_ID = "0xdd22472e552920b8438158ea7238bfadfa4f736aa4cee91a6b86c39ead110917"
+WRAPPED_COLLATERAL = "0x3A3BD7bb9528E159577F7C2e685CC81A765002E2"
+COLLECTION_IDS = {
+    1: "13c5bd8e1449325256f875332875131b41b7ff90b7ec816a38259785663eb2d8",
+    2: "679fe1f869287ffd909cce0e21e144a5801ccc3a6934d482ce01f8bacf9ed144",
+}
+POSITION_IDS = {
+    1: 21742633143463906290569050155826241533067272736897614950488156847949938836455,
+    2: 48331043336612883890938759509493159234755048973500640148014422747788308965732,
+}
+COMPRESSION_FLAG = 1 << 254
+
+
+def test_collection_ids_match_contract():
+    for index_set, expected in COLLECTION_IDS.items():
+        assert get_collection_id(CONDITION_ID, index_set).hex() == expected
+
+
+def test_position_ids_match_contract():
+    for index_set, expected in POSITION_IDS.items():
+        collection_id = get_collection_id(CONDITION_ID, index_set)
+        assert get_position_id(WRAPPED_COLLATERAL, collection_id) == expected
+    assert get_position_ids(CONDITION_ID, WRAPPED_COLLATERAL) == (
+        POSITION_IDS[1],
+        POSITION_IDS[2],
+    )
+
+
+def test_compressed_point_is_on_curve():
+    # Index set 2 takes the odd-y branch, which sets bit 254 of the x
+    # coordinate; with the flag cleared it must be a point on alt_bn128
+    for index_set, expected_flag in ((1, 0), (2, COMPRESSION_FLAG)):
+        x = int.from_bytes(get_collection_id(CONDITION_ID, index_set), "big")
+        assert x & COMPRESSION_FLAG == expected_flag
+        x &= ~COMPRESSION_FLAG
+        assert x < ALT_BN128_P
+        yy = (x * x * x + ALT_BN128_B) % ALT_BN128_P
+        assert pow(yy, (ALT_BN128_P - 1) // 2, ALT_BN128_P) == 1
+
+
+def test_condition_id_forms_agree():
+    raw = bytes.fromhex(CONDITION_ID[2:])
+    assert get_collection_id(raw, 1) == get_collection_id(CONDITION_ID, 1)
+    assert get_collection_id(CONDITION_ID[2:], 2) == get_collection_id(CONDITION_ID, 2)
+
+
+def test_collateral_changes_position_not_collection():
+    usdc = get_position_ids(CONDITION_ID, USDC_ADDRESS)
+    assert usdc != get_position_ids(CONDITION_ID, WRAPPED_COLLATERAL)
+    assert usdc[0] == get_position_id(
+        USDC_ADDRESS, bytes.fromhex(COLLECTION_IDS[1])
+    )
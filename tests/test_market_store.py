@@ -0,0 +1,53 @@
+import threading
+
+from utils.market_store import list_sessions, load_range, open_session_writer
+
+SLUG = "btc-updown-15m-1700000000"
+TOP = {
+    "best_bid_price": 0.5,
+    "best_ask_price": 0.51,
+    "best_bid_volume": 100.0,
+    "best_ask_volume": 80.0,
+    "micro_price": 0.5056,
+    "micro_vs_mid_bps": 11.0,
+}
+
+
+def test_rows_stay_ordered_under_concurrent_flush(tmp_path):
+    writer = open_session_writer(SLUG, tmp_path)
+    done = threading.Event()
+
+    def flush_until_done():
+        while not done.is_set():
+            writer.flush()
+
+    flusher = threading.Thread(target=flush_until_done)
+    flusher.start()
+    for i in range(50_000):
+        writer.append(i, i, TOP, 1)
+    writer.close()
+    done.set()
+    flusher.join()
+
+    columns = load_range(tmp_path, columns=["ts_ns", "best_ask"])
+    assert (columns["ts_ns"] == range(50_000)).all()
+    assert (columns["best_ask"] == 0.51).all()
+
+
+def test_append_after_close_is_ignored(tmp_path):
+    writer = open_session_writer(SLUG, tmp_path)
+    writer.append(1, 1, TOP, 1)
+    writer.close()
+    writer.append(2, 2, TOP, 1)
+    writer.flush()
+    writer.close()
+    assert writer.rows == 1
+    assert len(load_range(tmp_path)["ts_ns"]) == 1
+
+
+def test_list_sessions_skips_foreign_directories(tmp_path):
+    open_session_writer(SLUG, tmp_path).close()
+    for name in ("notes", "btc-updown-15m-latest"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "meta.json").write_text("{}")
+    assert list_sessions(tmp_path) == [SLUG]
@@ -0,0 +1,184 @@
+import pytest
+
+from utils import position_index
+from utils.position_index import (
+    CONDITIONAL_TOKENS_FRAMEWORK_ADDRESS,
+    GAMMA_API_URL,
+    POSITIONS_URL,
+    TRANSFER_BATCH_TOPIC,
+    TRANSFER_SINGLE_TOPIC,
+    PositionIndex,
+    address_topic,
+    balance_deltas,
+    decode_transfer_log,
+)
+
+# Position IDs of the recorded market in test_ctf.py
+CONDITION_ID = "0xdd22472e552920b8438158ea7238bfadfa4f736aa4cee91a6b86c39ead110917"
+YES = 21742633143463906290569050155826241533067272736897614950488156847949938836455
+NO = 48331043336612883890938759509493159234755048973500640148014422747788308965732
+
+SAFE = "0x5afe0000000000000000000000000000000000a1"
+EXCHANGE = "0x4bfb41d5b3570defd03c39a9a4d8de6bd8b8982e"
+NEG_RISK_ADAPTER = "0xd91e80cf2e7be2e162c6513ced06f1dd0da35296"
+MAKER = "0x00000000000000000000000000000000000000b2"
+
+# eth_getLogs entries as the node returns them. A fill buys 25 YES from a
+# maker, then a merge sends 10 YES and 10 NO to the adapter in one batch.
+BUY_YES = {
+    "blockNumber": 105,
+    "logIndex": 7,
+    "transactionHash": "0x" + "a1" * 32,
+    "topics": [
+        TRANSFER_SINGLE_TOPIC,
+        address_topic(EXCHANGE),
+        address_topic(MAKER),
+        address_topic(SAFE),
+    ],
+    "data": "0x"
+    "3011e4ede0f6befa0ad3f571001d3e1ffeef3d4af78c3112aaac90416e3a43e7"
+    "00000000000000000000000000000000000000000000000000000000017d7840",
+}
+MERGE = {
+    "blockNumber": 108,
+    "logIndex": 2,
+    "transactionHash": "0x" + "b2" * 32,
+    "topics": [
+        TRANSFER_BATCH_TOPIC,
+        address_topic(NEG_RISK_ADAPTER),
+        address_topic(SAFE),
+        address_topic(NEG_RISK_ADAPTER),
+    ],
+    "data": "0x"
+    "0000000000000000000000000000000000000000000000000000000000000040"
+    "00000000000000000000000000000000000000000000000000000000000000a0"
+    "0000000000000000000000000000000000000000000000000000000000000002"
+    "3011e4ede0f6befa0ad3f571001d3e1ffeef3d4af78c3112aaac90416e3a43e7"
+    "6ada66b0220f72b49d81cb8dfeec380b656e4f5fa8a179b371e7628463b4e964"
+    "0000000000000000000000000000000000000000000000000000000000000002"
+    "0000000000000000000000000000000000000000000000000000000000989680"
+    "0000000000000000000000000000000000000000000000000000000000989680",
+}
+
+
+def as_bytes(log):
+    """The same log with HexBytes-style topics and data, as web3 returns it."""
+    return {
+        **log,
+        "topics": [bytes.fromhex(topic[2:]) for topic in log["topics"]],
+        "data": bytes.fromhex(log["data"][2:]),
+    }
+
+
+def test_decode_transfer_single():
+    assert decode_transfer_log(BUY_YES) == (MAKER, SAFE, [(YES, 25_000_000)])
+
+
+def test_decode_transfer_batch():
+    expected = (SAFE, NEG_RISK_ADAPTER, [(YES, 10_000_000), (NO, 10_000_000)])
+    assert decode_transfer_log(MERGE) == expected
+    assert decode_transfer_log(as_bytes(MERGE)) == expected
+
+
+def test_decode_ignores_other_events():
+    approval = {**BUY_YES, "topics": ["0x" + "17" * 32] + BUY_YES["topics"][1:]}
+    assert decode_transfer_log(approval) is None
+
+
+def test_balance_deltas():
+    assert balance_deltas([BUY_YES, MERGE], SAFE) == {YES: 15_000_000, NO: -10_000_000}
+    assert balance_deltas([BUY_YES, MERGE], MAKER) == {YES: -25_000_000}
+
+
+class FakeChain:
+    """Just enough of web3.eth for PositionIndex: logs and balances per block."""
+
+    def __init__(self, head, logs, balances):
+        self.block_number = head
+        self.logs = logs
+        self.balances = balances  # block -> {token_id: balance}
+        self.eth = self
+
+    def get_logs(self, params):
+        _, _, sender, receiver = (params["topics"] + [None])[:4]
+        assert params["address"] == CONDITIONAL_TOKENS_FRAMEWORK_ADDRESS
+        return [
+            log
+            for log in self.logs
+            if params["fromBlock"] <= log["blockNumber"] <= params["toBlock"]
+            and sender in (None, log["topics"][2])
+            and receiver in (None, log["topics"][3])
+        ]
+
+    def contract(self, address, abi):
+        return self
+
+    @property
+    def functions(self):
+        return self
+
+    def balanceOfBatch(self, owners, ids):
+        chain = self
+
+        class Call:
+            def call(self, block_identifier):
+                held = chain.balances[block_identifier]
+                return [held.get(token_id, 0) for token_id in ids]
+
+        return Call()
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    def fake_get(url, params=None, timeout=None):
+        if url == POSITIONS_URL:
+            # data-api lags: it still shows the YES size from before block 100
+            # and has not seen the NO tokens yet
+            return FakeResponse(
+                [{"asset": str(YES), "size": 40.0, "conditionId": CONDITION_ID, "outcomeIndex": 0}]
+            )
+        assert url == f"{GAMMA_API_URL}/markets"
+        return FakeResponse([{"conditionId": CONDITION_ID, "clobTokenIds": [str(YES), str(NO)]}])
+
+    monkeypatch.setattr(position_index.requests, "get", fake_get)
+    monkeypatch.setattr(position_index, "POSITION_INDEX_START_BLOCK", None)
+    monkeypatch.setattr(position_index, "POSITION_INDEX_CONFIRMATIONS", 0)
+    index = PositionIndex(SAFE, rpc_url="http://127.0.0.1:8545", path=str(tmp_path / "positions.sqlite"))
+    # The NO tokens arrived at block 95, inside the bootstrap lookback
+    receive_no = {
+        **BUY_YES,
+        "blockNumber": 95,
+        "transactionHash": "0x" + "c3" * 32,
+        "topics": BUY_YES["topics"][:2] + [address_topic(MAKER), address_topic(SAFE)],
+        "data": "0x" + NO.to_bytes(32, "big").hex() + (10_000_000).to_bytes(32, "big").hex(),
+    }
+    index.w3 = FakeChain(100, [receive_no, BUY_YES, MERGE], {100: {YES: 5_000_000, NO: 10_000_000}})
+    return index
+
+
+def test_bootstrap_reads_balances_at_cursor(index):
+    assert index.sync() == 0
+    assert index._cursor(index._db()) == 100
+    # On-chain balances at block 100, not the stale data-api size
+    assert index.balance(YES) == 5_000_000
+    assert index.balance(NO) == 10_000_000
+    assert index.condition_balances(CONDITION_ID) == [5_000_000, 10_000_000]
+
+
+def test_logs_after_bootstrap_are_applied_once(index):
+    index.sync()
+    index.w3.block_number = 110
+    assert index.sync() == 2
+    assert index.balance(YES) == 20_000_000
+    assert index.balance(NO) == 0
+    assert index.sync() == 0
+    assert index.balance(YES) == 20_000_000
+    assert index.mergeable_conditions() == {}
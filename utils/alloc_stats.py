@@ -0,0 +1,116 @@
+import sys
+import logging
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+
+class AllocationMeter:
+    """Accounts memory blocks (and optionally bytes) kept alive by a code path.
+
+    ``start()``/``stop()`` bracket one operation. Blocks come from
+    ``sys.getallocatedblocks()`` and bytes from tracemalloc when byte tracing is
+    on, so both are net figures: what the operation left allocated, which is
+    what grows the heap and the rollover ``gc.collect()`` while GC is disabled.
+    Each meter must only be used from one thread at a time, and allocations
+    made concurrently by other threads are attributed to whichever meter is
+    open, so treat the numbers as a budget check, not exact attribution.
+
+    A meter with a ``parent`` runs nested inside it on the same thread (an
+    order inside a decision). The child's net change is subtracted from the
+    parent's operation, so each block counts against one budget only and the
+    parent keeps what it allocates around the child (journal records, log
+    records, risk bookkeeping). Objects the child leaves for the parent to
+    free make that parent operation negative, which is why budgets are
+    checked on the average.
+    """
+
+    def __init__(self, name, budget_blocks=None, parent=None):
+        self.name = name
+        self.budget_blocks = budget_blocks
+        self.parent = parent
+        self.active = False
+        self.enabled = False
+        self.trace_bytes = False
+        self.reset()
+
+    def reset(self):
+        self.operations = 0
+        self.blocks = 0
+        self.bytes = 0
+        self._start_blocks = 0
+        self._start_bytes = 0
+        self._nested_blocks = 0
+        self._nested_bytes = 0
+
+    def start(self):
+        # State lives on the meter rather than in a returned token so that
+        # measuring does not itself keep blocks alive; one thread per meter
+        self.active = True
+        self._nested_blocks = 0
+        self._nested_bytes = 0
+        if self.trace_bytes:
+            self._start_bytes = tracemalloc.get_traced_memory()[0]
+        self._start_blocks = sys.getallocatedblocks()
+
+    def stop(self):
+        blocks = sys.getallocatedblocks() - self._start_blocks
+        nbytes = (
+            tracemalloc.get_traced_memory()[0] - self._start_bytes if self.trace_bytes else 0
+        )
+        self.active = False
+        self.operations += 1
+        self.blocks += blocks - self._nested_blocks
+        self.bytes += nbytes - self._nested_bytes
+        parent = self.parent
+        if parent is not None and parent.active:
+            parent._nested_blocks += blocks
+            parent._nested_bytes += nbytes
+
+    def report(self):
+        operations = self.operations or 1
+        return {
+            "name": self.name,
+            "operations": self.operations,
+            "blocks_per_op": self.blocks / operations,
+            "bytes_per_op": self.bytes / operations if self.trace_bytes else None,
+            "over_budget": (
+                self.budget_blocks is not None
+                and self.blocks / operations > self.budget_blocks
+            ),
+        }
+
+
+# Budgets are net blocks per operation in steady state
+MESSAGE_ALLOCS = AllocationMeter("message", budget_blocks=2)
+DECISION_ALLOCS = AllocationMeter("decision", budget_blocks=2)
+ORDER_ALLOCS = AllocationMeter("order", budget_blocks=64, parent=DECISION_ALLOCS)
+
+METERS = (MESSAGE_ALLOCS, DECISION_ALLOCS, ORDER_ALLOCS)
+
+
+def enable_allocation_tracking(trace_bytes=False):
+    if trace_bytes and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    for meter in METERS:
+        meter.reset()
+        meter.trace_bytes = trace_bytes
+        meter.enabled = True
+
+
+def log_allocation_report(reset=True):
+    for meter in METERS:
+        if not meter.enabled:
+            continue
+        stats = meter.report()
+        bytes_per_op = stats["bytes_per_op"]
+        logger.info(
+            "Net allocations per %s: %.2f blocks%s over %d ops%s",
+            stats["name"],
+            stats["blocks_per_op"],
+            "" if bytes_per_op is None else f", {bytes_per_op:.0f} bytes",
+            stats["operations"],
+            " (OVER BUDGET)" if stats["over_budget"] else "",
+        )
+        if reset:
+            meter.reset()
@@ -1,7 +1,7 @@
 import os
 import logging
+import threading
 from dotenv import load_dotenv
-from py_clob_client.client import ClobClient
 from config import POLYMARKET_HOST, CHAIN_ID
 
 load_dotenv()
@@ -15,10 +15,17 @@ logger = logging.getLogger(__name__)
 
 _client = None
 _client_creds = None
+_client_lock = threading.Lock()
+# Set once an initialisation attempt has finished, successful or not
+_client_attempted = threading.Event()
 
 
-def init_clob_client() -> ClobClient:
+def init_clob_client():
     try:
+        # py_clob_client pulls in the web3/eth-account stack; import it only
+        # when a client is actually built (off the main thread at startup)
+        from py_clob_client.client import ClobClient
+
         client = ClobClient(
             POLYMARKET_HOST,
             key=PRIVATE_KEY,
@@ -37,7 +44,23 @@ def init_clob_client() -> ClobClient:
 
 def init_global_client():
     global _client, _client_creds
-    _client, _client_creds = init_clob_client()
+    with _client_lock:
+        if _client is None:
+            _client, _client_creds = init_clob_client()
+        _client_attempted.set()
+
+
+def init_global_client_async():
+    """Derive client credentials in the background; see wait_for_client()."""
+    thread = threading.Thread(target=init_global_client, name="clob-init", daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_for_client(timeout=None):
+    """Wait for the initialisation attempt to finish; True if the client is usable."""
+    _client_attempted.wait(timeout)
+    return is_client_ready()
 
 
 def is_client_ready():
@@ -2,15 +2,34 @@ import asyncio
 import logging
 import time
 from concurrent.futures import ThreadPoolExecutor
-from py_clob_client.clob_types import OrderArgs, OrderType
-from py_clob_client.order_builder.constants import BUY
-from config import PROFIT_MARGIN, PLACE_OPPOSITE_ORDER
+from config import PLACE_OPPOSITE_ORDER
+from utils.live_config import LIVE_CONFIG
 from utils.clob_client import get_client
-from utils.trade_counter import decrement_trades
+from utils.cpu_affinity import pin_current_thread
+from utils.metrics import counter, histogram
+from utils.journal import RECORD, record_event, next_order_seq, token_key, order_key
 
 
 logger = logging.getLogger(__name__)
 
+# Long-lived workers so placing a pair does not spawn two threads per trade
+ORDERS_SENT = counter("pm_orders_sent_total", "Limit orders posted")
+ORDER_ERRORS = counter("pm_order_errors_total", "Limit orders that failed to post")
+ORDER_RTT_SECONDS = histogram("pm_order_rtt_seconds", "post_order round-trip time")
+SIGNED_CACHE_HITS = counter(
+    "pm_signed_order_cache_hits_total", "Orders sent from the presigned cache"
+)
+SIGNED_CACHE_MISSES = counter(
+    "pm_signed_order_cache_misses_total", "Orders signed on demand"
+)
+
+_order_executor = ThreadPoolExecutor(
+    max_workers=2,
+    thread_name_prefix="order",
+    initializer=pin_current_thread,
+    initargs=("strategy",),
+)
+
 
 def cache_token_trading_infos(
     order_book,
@@ -27,8 +46,16 @@ def cache_token_trading_infos(
 
 
 def place_anchor_and_hedge(
-    up_token_id, down_token_id, anchor_side, price, size=5, signed_orders_cache=None
+    up_token_id,
+    down_token_id,
+    anchor_side,
+    price,
+    size=5,
+    signed_orders_cache=None,
+    hedge_price=None,
 ):
+    if hedge_price is None:
+        hedge_price = round(1 - price - LIVE_CONFIG.params.profit_margin, 2)
     if anchor_side == "UP":
         anchor_token_id = up_token_id
         hedge_token_id = down_token_id
@@ -36,27 +63,30 @@ def place_anchor_and_hedge(
         anchor_token_id = down_token_id
         hedge_token_id = up_token_id
 
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        future1 = executor.submit(
-            place_limit_order_sync,
-            anchor_token_id,
-            price,
-            size,
-            signed_orders_cache,
-        )
-        future2 = executor.submit(
-            place_limit_order_sync,
-            hedge_token_id,
-            round(1 - price - PROFIT_MARGIN, 2),
-            size,
-            signed_orders_cache,
-        )
-        
-        # Wait for both to complete
-        order_ids = [future1.result(), future2.result()]
+    future1 = _order_executor.submit(
+        place_limit_order_sync,
+        anchor_token_id,
+        price,
+        size,
+        signed_orders_cache,
+    )
+    future2 = _order_executor.submit(
+        place_limit_order_sync,
+        hedge_token_id,
+        hedge_price,
+        size,
+        signed_orders_cache,
+    )
 
+    # Wait for both to complete
+    order_ids = [future1.result(), future2.result()]
+
+    # Hot path: let the logging machinery format only if the record is emitted
     logger.info(
-        f"Placed anchor and hedge orders: Anchor Token ID={anchor_token_id}, Hedge Token ID={hedge_token_id}, Order IDs={order_ids}"
+        "Placed anchor and hedge orders: Anchor Token ID=%s, Hedge Token ID=%s, Order IDs=%s",
+        anchor_token_id,
+        hedge_token_id,
+        order_ids,
     )
     return order_ids
 
@@ -66,14 +96,23 @@ def place_limit_order_sync(
 ) -> str:
     """Synchronous version of place_limit_order for use with ThreadPoolExecutor"""
     client = get_client()
+    order_seq = next_order_seq()
+    presigned = bool(signed_orders_cache) and (token_id, price) in signed_orders_cache
+    sent_ns = time.time_ns()
+    record_event(RECORD.ORDER_SENT, order_seq, token_key(token_id), price, size, presigned)
 
     try:
-        if signed_orders_cache and (token_id, price) in signed_orders_cache:
+        if presigned:
+            SIGNED_CACHE_HITS.inc()
             signed_order = signed_orders_cache[(token_id, price)]
             logger.info(
-                f"Using cached signed order for Token ID={token_id}, Price={price}"
+                "Using cached signed order for Token ID=%s, Price=%s", token_id, price
             )
         else:
+            SIGNED_CACHE_MISSES.inc()
+            from py_clob_client.clob_types import OrderArgs
+            from py_clob_client.order_builder.constants import BUY
+
             order_args = OrderArgs(
                 token_id=token_id,
                 price=price,
@@ -81,14 +120,30 @@ def place_limit_order_sync(
                 side=BUY,
             )
             signed_order = client.create_order(order_args)
+        post_start = time.perf_counter()
         response = client.post_order(signed_order)
+        ORDER_RTT_SECONDS.observe(time.perf_counter() - post_start)
+        # Read before anything is recorded, so a response without an ID only
+        # takes the error path and the journal gets one ACK per order
+        order_id = response["orderID"]
+        record_event(
+            RECORD.ORDER_ACK,
+            order_seq,
+            time.time_ns() - sent_ns,
+            order_key(order_id),
+            bool(response.get("success", True)),
+        )
+        ORDERS_SENT.inc()
         logger.info(
-            f"Placed limit order: Token ID={token_id}, Price={price}, Size={size}, ID={response['orderID']}"
+            "Placed limit order: Token ID=%s, Price=%s, Size=%s, ID=%s",
+            token_id,
+            price,
+            size,
+            order_id,
         )
-        return response["orderID"]
+        return order_id
     except Exception as e:
+        ORDER_ERRORS.inc()
+        record_event(RECORD.ORDER_ACK, order_seq, time.time_ns() - sent_ns, 0, False)
         logger.error(f"Error placing order for token {token_id}: {e}")
         return None
-
-
-
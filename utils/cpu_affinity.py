@@ -1,12 +1,15 @@
 import os
-import psutil
 import logging
+import threading
+from config import THREAD_SCHED_FIFO, THREAD_FIFO_PRIORITIES
 
 logger = logging.getLogger(__name__)
 
 
 def set_cpu_affinity():
     try:
+        import psutil
+
         process = psutil.Process()
         cpu_count = os.cpu_count()
         logger.info(f"System has {cpu_count} CPU cores")
@@ -29,3 +32,169 @@ def set_cpu_affinity():
 
     except Exception as e:
         logger.warning(f"Failed to set CPU affinity: {e}")
+
+
+def pin_process_to_core(core):
+    """Pin the calling process to a single core (Linux only)."""
+    try:
+        core = core % os.cpu_count()
+        os.sched_setaffinity(0, {core})
+        logger.info(f"Process {os.getpid()} pinned to core {core}")
+    except (AttributeError, OSError) as e:
+        logger.warning(f"Failed to pin process to core {core}: {e}")
+
+
+# Thread-level placement (THREAD_PINNING). Roles map to disjoint core sets:
+# "feed" runs the WebSocket handler, "strategy" the signal monitor, main loop
+# and order workers, "background" everything else (inventory, presigning,
+# indexer, journal/log writers, merger).
+ROLES = ("feed", "strategy", "background")
+
+_layout = None
+_fifo_roles = set()  # roles whose threads may run SCHED_FIFO under _layout
+_pinned = {}  # native thread ID -> (thread name, role)
+
+
+def _parse_cpu_list(text):
+    cpus = set()
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def get_cpu_topology(cpus=None):
+    """Map each usable CPU to (NUMA node, hyperthread siblings) from sysfs.
+
+    Falls back to node 0 and no siblings where sysfs is unavailable.
+    """
+    cpus = sorted(os.sched_getaffinity(0) if cpus is None else cpus)
+    topology = {}
+    for cpu in cpus:
+        base = f"/sys/devices/system/cpu/cpu{cpu}"
+        try:
+            with open(f"{base}/topology/thread_siblings_list") as f:
+                siblings = frozenset(_parse_cpu_list(f.read()))
+        except OSError:
+            siblings = frozenset((cpu,))
+        node = 0
+        try:
+            for entry in os.listdir(base):
+                if entry.startswith("node") and entry[4:].isdigit():
+                    node = int(entry[4:])
+                    break
+        except OSError:
+            pass
+        topology[cpu] = (node, siblings)
+    return topology
+
+
+def plan_thread_layout(topology):
+    """Pick cores for each role from ``topology`` (see get_cpu_topology()).
+
+    The feed and strategy each get a whole physical core from the end of the
+    CPU list, on the same NUMA node so book data stays in local memory;
+    their hyperthread siblings are left idle. Background threads get the
+    remaining CPUs; on small machines they fall back to those siblings, and
+    only share the strategy core when there is nothing else.
+    """
+    cpus = sorted(topology)
+    # One entry per physical core, highest CPU numbers first
+    cores = []
+    for cpu in reversed(cpus):
+        siblings = topology[cpu][1] & set(cpus)
+        if siblings not in cores:
+            cores.append(siblings)
+    node = topology[cpus[-1]][0]
+    local = [core for core in cores if topology[min(core)][0] == node]
+
+    feed = {min(local[0])}
+    strategy = {min(local[1])} if len(local) > 1 else set(feed)
+    reserved = set(local[0]) | (set(local[1]) if len(local) > 1 else set())
+    background = set(cpus) - reserved or set(cpus) - feed - strategy or set(strategy)
+    return {"feed": feed, "strategy": strategy, "background": background}
+
+
+def apply_thread_layout(layout=None):
+    """Enable per-thread pinning and move already-running threads to background.
+
+    ``layout`` maps roles to core lists (THREAD_LAYOUT); roles it leaves out
+    are planned from the CPU topology. Threads pick up their placement by
+    calling pin_current_thread() with their role. Raises ValueError if
+    ``layout`` names an unknown role or a core this process may not use.
+    """
+    global _layout, _fifo_roles
+    allowed = os.sched_getaffinity(0)
+    for role, cores in (layout or {}).items():
+        if role not in ROLES:
+            raise ValueError(f"THREAD_LAYOUT has unknown role {role!r}, expected one of {ROLES}")
+        if not set(cores) <= allowed:
+            raise ValueError(
+                f"THREAD_LAYOUT {role} cores {sorted(set(cores) - allowed)} are not in "
+                f"this process's CPU set {sorted(allowed)}"
+            )
+    topology = get_cpu_topology(allowed)
+    planned = plan_thread_layout(topology)
+    _layout = {
+        role: set((layout or {}).get(role) or planned[role]) for role in ROLES
+    }
+    # A SCHED_FIFO thread that spins never yields its core to SCHED_OTHER
+    # threads, so FIFO is only granted where no background thread can land
+    _fifo_roles = set()
+    for role in THREAD_FIFO_PRIORITIES if THREAD_SCHED_FIFO else ():
+        shared = set() if role == "background" else _layout.get(role, set()) & _layout["background"]
+        if shared:
+            logger.warning(
+                f"Not running {role} threads SCHED_FIFO: cores {sorted(shared)} "
+                "are shared with background threads"
+            )
+        else:
+            _fifo_roles.add(role)
+    for role, cores in _layout.items():
+        nodes = ",".join(str(n) for n in sorted({topology[c][0] for c in cores if c in topology}))
+        logger.info(f"Thread layout: {role} -> cores {sorted(cores)} (NUMA node {nodes})")
+    # Startup work on the calling thread, and any thread it spawns before
+    # pinning itself to its own role, runs on the background cores
+    for thread in threading.enumerate():
+        if thread.native_id:
+            _pin(thread.native_id, thread.name, "background")
+    return _layout
+
+
+def pin_current_thread(role):
+    """Move the calling thread onto its role's cores; a no-op unless pinning is on."""
+    if _layout is None:
+        return
+    _pin(threading.get_native_id(), threading.current_thread().name, role)
+
+
+def _pin(tid, name, role):
+    try:
+        os.sched_setaffinity(tid, _layout[role])
+    except (AttributeError, OSError) as e:
+        logger.warning(f"Failed to pin thread {name} to {sorted(_layout[role])}: {e}")
+        return
+    priority = THREAD_FIFO_PRIORITIES.get(role) if role in _fifo_roles else None
+    if priority:
+        try:
+            os.sched_setscheduler(tid, os.SCHED_FIFO, os.sched_param(priority))
+        except (AttributeError, OSError) as e:
+            logger.warning(f"Failed to set SCHED_FIFO {priority} on thread {name}: {e}")
+    _pinned[tid] = (name, role)
+
+
+def log_thread_layout():
+    """Log the cores and scheduling policy each pinned thread actually has."""
+    alive = {thread.native_id for thread in threading.enumerate()}
+    for tid, (name, role) in sorted(_pinned.items(), key=lambda item: item[1][1]):
+        if tid not in alive:
+            continue
+        try:
+            cores = sorted(os.sched_getaffinity(tid))
+            fifo = os.sched_getscheduler(tid) == os.SCHED_FIFO
+        except OSError:
+            continue
+        policy = f"SCHED_FIFO {os.sched_getparam(tid).sched_priority}" if fifo else "SCHED_OTHER"
+        logger.info(f"Thread {name} ({tid}): {role} on cores {cores}, {policy}")
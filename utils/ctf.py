@@ -0,0 +1,95 @@
+import sys
+from functools import lru_cache
+from eth_utils import keccak, to_canonical_address
+
+# Offline equivalents of ConditionalTokens.getCollectionId/getPositionId
+# (CTHelpers, alt_bn128 variant deployed on Polygon)
+
+# alt_bn128 field modulus; the curve is y^2 = x^3 + 3
+ALT_BN128_P = 0x30644E72E131A029B85045B68181585D97816A916871CA8D3C208C16D87CFD47
+ALT_BN128_B = 3
+
+USDC_ADDRESS = "0x2791bca1f2de4661ed88a30c99a7a9449aa84174"
+PARENT_COLLECTION_ID = bytes(32)
+BINARY_PARTITION = (1, 2)
+
+
+def _condition_bytes(condition_id):
+    if isinstance(condition_id, str):
+        condition_id = bytes.fromhex(condition_id[2:] if condition_id.startswith("0x") else condition_id)
+    if len(condition_id) != 32:
+        raise ValueError(f"Condition ID must be 32 bytes, got {len(condition_id)}")
+    return condition_id
+
+
+def get_collection_id(condition_id, index_set, parent_collection_id=PARENT_COLLECTION_ID):
+    """Collection ID for ``index_set`` of a condition as bytes32.
+
+    Hashes the condition and index set onto an x coordinate, walks to the next
+    point on the curve and encodes the parity of its y coordinate in bit 254,
+    exactly as the contract does. Only top-level collections (zero parent) are
+    supported, which is all the binary markets we trade need.
+    """
+    if bytes(parent_collection_id) != PARENT_COLLECTION_ID:
+        raise ValueError("Nested collections are not supported")
+    P = ALT_BN128_P
+    x = int.from_bytes(
+        keccak(_condition_bytes(condition_id) + index_set.to_bytes(32, "big")), "big"
+    )
+    odd = x >> 255 != 0
+    while True:
+        x = (x + 1) % P
+        yy = (x * x * x + ALT_BN128_B) % P
+        y = pow(yy, (P + 1) // 4, P)
+        if y * y % P == yy:
+            break
+    # The contract picks the root whose parity matches the top hash bit, so the
+    # flag only depends on that bit
+    if odd:
+        x ^= 1 << 254
+    return x.to_bytes(32, "big")
+
+
+def get_position_id(collateral_token, collection_id):
+    """ERC-1155 position (token) ID for a collection backed by ``collateral_token``."""
+    return int.from_bytes(
+        keccak(to_canonical_address(collateral_token) + bytes(collection_id)), "big"
+    )
+
+
+@lru_cache(maxsize=1024)
+def get_position_ids(condition_id, collateral_token=USDC_ADDRESS):
+    """Position IDs of the outcomes of a binary condition, in partition order."""
+    return tuple(
+        get_position_id(collateral_token, get_collection_id(condition_id, index_set))
+        for index_set in BINARY_PARTITION
+    )
+
+
+if __name__ == "__main__":
+    # python -m utils.ctf <condition id>: compare against the deployed contract
+    import os
+    from web3 import Web3
+    from dotenv import load_dotenv
+    from abi.ctfAbi import ctf_abi
+
+    load_dotenv()
+    condition_id = sys.argv[1]
+    w3 = Web3(Web3.HTTPProvider(os.getenv("RPC_URL")))
+    ctf = w3.eth.contract(
+        address=Web3.to_checksum_address("0x4D97DCd97eC945f40cF65F87097ACe5EA0476045"),
+        abi=ctf_abi,
+    )
+    mismatches = 0
+    for index_set, position_id in zip(BINARY_PARTITION, get_position_ids(condition_id)):
+        collection_id = get_collection_id(condition_id, index_set)
+        onchain_collection = ctf.functions.getCollectionId(
+            PARENT_COLLECTION_ID, _condition_bytes(condition_id), index_set
+        ).call()
+        onchain_position = ctf.functions.getPositionId(
+            Web3.to_checksum_address(USDC_ADDRESS), onchain_collection
+        ).call()
+        ok = collection_id == bytes(onchain_collection) and position_id == onchain_position
+        mismatches += not ok
+        print(f"index set {index_set}: {position_id} {'OK' if ok else f'MISMATCH (contract {onchain_position})'}")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,59 @@
+import time
+import threading
+from enum import Flag, auto
+from utils.wait_strategy import ConditionWait, WakeLatency
+
+
+class EVENTS(Flag):
+    NONE = 0
+    BOOK = auto()
+    SIGNAL = auto()
+    FILL = auto()
+    TIMER = auto()
+
+
+class EventNotifier:
+    """Coalescing wake-up channel between the book threads and one consumer.
+
+    Producers OR their event into a pending set and wake the consumer; the
+    consumer takes the whole set at once, so bursts of book updates cost one
+    wake-up instead of one per message. How the consumer waits (spinning,
+    blocking or sleeping) is set by ``wait_strategy``; the delay between the
+    first event of a batch being received and the consumer taking it is kept
+    in ``wake_latency``.
+    """
+
+    def __init__(self, wait_strategy=None):
+        self.cond = threading.Condition(threading.Lock())
+        self.pending = EVENTS.NONE
+        self.wait_strategy = wait_strategy or ConditionWait()
+        self.wake_latency = WakeLatency()
+        self._notified_ns = 0
+
+    def notify(self, event, received_ns=None):
+        """Add ``event`` to the pending set and wake the consumer.
+
+        ``received_ns`` is the perf_counter_ns() at which the message behind
+        the event arrived; it defaults to now. Passing it keeps the time the
+        producer spent parsing, and waiting for the GIL, in the wake latency.
+        """
+        with self.cond:
+            if not self.pending:
+                self._notified_ns = received_ns or time.perf_counter_ns()
+            self.pending |= event
+            self.cond.notify()
+
+    def wait(self, timeout=None):
+        """Block until an event is pending or ``timeout`` expires.
+
+        Returns the pending events, or ``EVENTS.TIMER`` on timeout.
+        """
+        if not self.pending:
+            self.wait_strategy.wait(self, timeout)
+        with self.cond:
+            pending = self.pending
+            self.pending = EVENTS.NONE
+            notified_ns = self._notified_ns
+        if pending:
+            self.wake_latency.add(time.perf_counter_ns() - notified_ns)
+        return pending or EVENTS.TIMER
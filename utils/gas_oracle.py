@@ -0,0 +1,72 @@
+import time
+import asyncio
+import logging
+from config import (
+    GAS_HISTORY_BLOCKS,
+    GAS_PRIORITY_PERCENTILE,
+    GAS_REFRESH_SECONDS,
+    GAS_MAX_AGE_SECONDS,
+    GAS_MIN_PRIORITY_FEE_GWEI,
+    GAS_BASE_FEE_MULTIPLIER,
+    GAS_SPEED_UP_MULTIPLIER,
+)
+
+logger = logging.getLogger(__name__)
+
+GWEI = 10**9
+
+
+class GasOracle:
+    """EIP-1559 fees from eth_feeHistory, cached and refreshed in the background.
+
+    ``fees()`` is served from the cache, so sending a transaction costs no
+    extra round trip; only when the cache is older than GAS_MAX_AGE_SECONDS
+    (e.g. the refresher is failing) is it refreshed inline.
+    """
+
+    def __init__(self, w3):
+        self.w3 = w3
+        self.base_fee = None
+        self.priority_fee = None
+        self.updated_at = 0.0
+
+    async def refresh(self):
+        history = await self.w3.eth.fee_history(
+            GAS_HISTORY_BLOCKS, "latest", [GAS_PRIORITY_PERCENTILE]
+        )
+        # The last entry is the base fee of the next (pending) block
+        self.base_fee = history["baseFeePerGas"][-1]
+        rewards = sorted(reward[0] for reward in history["reward"] if reward)
+        tip = rewards[len(rewards) // 2] if rewards else 0
+        self.priority_fee = max(tip, GAS_MIN_PRIORITY_FEE_GWEI * GWEI)
+        self.updated_at = time.time()
+
+    async def run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing gas fees: {e}")
+            await asyncio.sleep(GAS_REFRESH_SECONDS)
+
+    def is_stale(self):
+        return time.time() - self.updated_at > GAS_MAX_AGE_SECONDS
+
+    async def fees(self):
+        """maxFeePerGas/maxPriorityFeePerGas fields for a new transaction."""
+        if self.base_fee is None or self.is_stale():
+            await self.refresh()
+        return {
+            # Headroom for the base fee to keep rising while the tx is pending
+            "maxFeePerGas": int(self.base_fee * GAS_BASE_FEE_MULTIPLIER) + self.priority_fee,
+            "maxPriorityFeePerGas": self.priority_fee,
+        }
+
+    async def speed_up_fees(self, tx):
+        """Fees for a replacement of ``tx``: current fees, but at least the
+        node's minimum bump (GAS_SPEED_UP_MULTIPLIER) over what it paid."""
+        fees = await self.fees()
+        return {
+            field: max(fees[field], int(tx[field] * GAS_SPEED_UP_MULTIPLIER) + 1)
+            for field in ("maxFeePerGas", "maxPriorityFeePerGas")
+        }
@@ -2,13 +2,32 @@ import requests
 import os
 
 
-def get_inventory(slug=None):
+def get_positions():
 
     url = f"https://data-api.polymarket.com/positions?sizeThreshold=1&user={os.getenv('POLYMARKET_PROXY_ADDRESS')}&mergeable=false"
 
-    response = requests.get(url).json()
+    return requests.get(url).json()
+
+
+def get_inventory(slug=None, positions=None):
+
+    if positions is None:
+        positions = get_positions()
     size = 0
-    for pos in response:
+    for pos in positions:
         if pos and pos.get("slug") == slug:
             size += pos.get("size")
     return round(size / 5)
+
+
+def get_paired_sizes(positions, slug=None):
+    """Size held on both outcomes (i.e. mergeable) per condition ID."""
+    sizes = {}
+    for pos in positions:
+        if pos and (slug is None or pos.get("slug") == slug):
+            sizes.setdefault(pos.get("conditionId"), []).append(pos.get("size") or 0)
+    return {
+        condition_id: min(legs)
+        for condition_id, legs in sizes.items()
+        if condition_id and len(legs) >= 2
+    }
@@ -0,0 +1,281 @@
+import os
+import time
+import atexit
+import struct
+import logging
+import itertools
+import threading
+from enum import IntEnum
+from pathlib import Path
+from utils.cpu_affinity import pin_current_thread
+from config import JOURNAL_PATH, JOURNAL_BUFFER_RECORDS, JOURNAL_FLUSH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# File layout: an 8-byte header, then fixed-size records. Every record starts
+# with its type and time_ns; the payload layout depends on the type.
+FILE_HEADER = struct.Struct("<4sHH")  # magic, version, record size
+MAGIC = b"PMJ1"
+VERSION = 1
+RECORD_SIZE = 64
+_RECORD_HEADER = "<BxxxxxxxQ"  # type, padding, time_ns
+
+
+class RECORD(IntEnum):
+    SIGNAL = 1
+    ENTRY = 2
+    ORDER_SENT = 3
+    ORDER_ACK = 4
+    FILL = 5
+    CANCEL = 6
+    ROLLOVER = 7
+
+
+# Payload fields per record type, packed after the header without padding;
+# header and payload must fit in RECORD_SIZE
+SCHEMAS = {
+    RECORD.SIGNAL: (
+        ("session_start", "Q"),
+        ("book_version", "Q"),
+        ("micro_vs_mid_bps", "d"),
+        ("signal", "b"),  # 1 UP, -1 DOWN, 0 NEUTRAL
+    ),
+    RECORD.ENTRY: (
+        ("session_start", "Q"),
+        ("book_version", "Q"),
+        ("price", "d"),
+        ("best_bid", "d"),
+        ("best_ask", "d"),
+        ("inventory", "i"),
+        ("side", "b"),  # anchor side: 1 UP, -1 DOWN
+    ),
+    RECORD.ORDER_SENT: (
+        ("order_seq", "Q"),  # links the ack to this record
+        ("token", "Q"),  # low 64 bits of the token ID
+        ("price", "d"),
+        ("size", "d"),
+        ("presigned", "?"),
+    ),
+    RECORD.ORDER_ACK: (
+        ("order_seq", "Q"),
+        ("latency_ns", "Q"),
+        ("order_id", "Q"),  # first 8 bytes of the order hash, 0 if rejected
+        ("ok", "?"),
+    ),
+    RECORD.FILL: (
+        ("session_start", "Q"),
+        ("inventory", "i"),
+        ("previous_inventory", "i"),
+    ),
+    RECORD.CANCEL: (
+        ("order_id", "Q"),
+    ),
+    RECORD.ROLLOVER: (
+        ("session_start", "Q"),
+        ("trades", "I"),
+        ("inventory", "i"),
+    ),
+}
+
+STRUCTS = {
+    kind: struct.Struct(_RECORD_HEADER + "".join(fmt for _, fmt in fields))
+    for kind, fields in SCHEMAS.items()
+}
+
+SIDE_CODES = {"UP": 1, "DOWN": -1, "NEUTRAL": 0}
+
+_order_seq = itertools.count(1)
+
+
+class Journal:
+    """Append-only binary journal of trading decisions and order lifecycle.
+
+    ``record()`` packs into one of two preallocated buffers under a lock and
+    returns; a background thread swaps the buffers and writes the full one
+    to disk every JOURNAL_FLUSH_SECONDS, or sooner once the active buffer is
+    half full. If the writer falls behind and the active buffer fills up,
+    records are dropped and counted rather than blocking the caller.
+    """
+
+    def __init__(self, path, capacity=JOURNAL_BUFFER_RECORDS, flush_seconds=JOURNAL_FLUSH_SECONDS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(FILE_HEADER.pack(MAGIC, VERSION, RECORD_SIZE))
+        self.capacity = capacity
+        self.flush_seconds = flush_seconds
+        self._buffers = [bytearray(capacity * RECORD_SIZE) for _ in range(2)]
+        self._active = self._buffers[0]
+        self._count = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self.dropped = 0
+        self.written = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._writer, name="journal", daemon=True)
+        self.thread.start()
+
+    def record(self, kind, *fields):
+        with self._lock:
+            if self._count == self.capacity:
+                self.dropped += 1
+                return False
+            STRUCTS[kind].pack_into(
+                self._active, self._count * RECORD_SIZE, kind, time.time_ns(), *fields
+            )
+            self._count += 1
+            if self._count == self.capacity // 2:
+                self._wake.set()
+        return True
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                buffer, pending = self._active, self._count
+                if not pending:
+                    return
+                self._active = self._buffers[buffer is self._buffers[0]]
+                self._count = 0
+            # Slots past the record size may hold stale bytes from an earlier
+            # swap; readers only look at each record's own struct
+            self.file.write(memoryview(buffer)[: pending * RECORD_SIZE])
+            self.file.flush()
+            self.written += pending
+
+    def _writer(self):
+        pin_current_thread("background")
+        while self.running:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing journal: {e}")
+
+    def close(self):
+        self.running = False
+        self._wake.set()
+        self.thread.join()
+        self.flush()
+        self.file.close()
+        if self.dropped:
+            logger.warning(f"Journal dropped {self.dropped} records")
+
+
+_journal = None
+_journal_pid = None
+
+
+def get_journal():
+    """Process-wide journal at JOURNAL_PATH, or None when journaling is off."""
+    global _journal, _journal_pid
+    if JOURNAL_PATH is None:
+        return None
+    # A forked child (pipeline.py) inherits the object but not its writer thread
+    if _journal_pid != os.getpid():
+        _journal = Journal(JOURNAL_PATH)
+        _journal_pid = os.getpid()
+        atexit.register(_journal.close)
+    return _journal
+
+
+def record_event(kind, *fields):
+    """Journal one event; a no-op when JOURNAL_PATH is not set."""
+    journal = _journal if _journal_pid == os.getpid() else get_journal()
+    if journal is not None:
+        journal.record(kind, *fields)
+
+
+def next_order_seq():
+    return next(_order_seq)
+
+
+def token_key(token_id):
+    return int(token_id) & 0xFFFFFFFFFFFFFFFF
+
+
+def order_key(order_id):
+    return int(order_id[2:18], 16) if order_id else 0
+
+
+def read_journal(path):
+    """Decode a journal file into a list of (record type, fields dict) tuples."""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, record_size = FILE_HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} journal")
+    records = []
+    for offset in range(FILE_HEADER.size, len(data) - record_size + 1, record_size):
+        kind = RECORD(data[offset])
+        values = STRUCTS[kind].unpack_from(data, offset)
+        names = ("time_ns",) + tuple(name for name, _ in SCHEMAS[kind])
+        records.append((kind, dict(zip(names, values[1:]))))
+    return records
+
+
+def to_arrays(path):
+    """Decode a journal into one NumPy structured array per record type."""
+    import numpy as np
+
+    raw = np.fromfile(path, dtype=np.uint8, offset=FILE_HEADER.size)
+    raw = raw[: len(raw) // RECORD_SIZE * RECORD_SIZE].reshape(-1, RECORD_SIZE)
+    arrays = {}
+    for kind, fields in SCHEMAS.items():
+        rows = raw[raw[:, 0] == kind]
+        names, formats, offsets = ["time_ns"], ["<u8"], [8]
+        offset = 16
+        for name, fmt in fields:
+            dtype = np.dtype("<" + fmt)
+            names.append(name)
+            formats.append(dtype)
+            offsets.append(offset)
+            offset += dtype.itemsize
+        dtype = np.dtype(
+            {"names": names, "formats": formats, "offsets": offsets, "itemsize": RECORD_SIZE}
+        )
+        arrays[kind.name.lower()] = np.ascontiguousarray(rows).view(dtype).ravel()
+    return arrays
+
+
+def export_csv(path, out_dir):
+    """Write one CSV per record type (e.g. ``entry.csv``) into ``out_dir``."""
+    import csv
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    by_kind = {}
+    for kind, fields in read_journal(path):
+        by_kind.setdefault(kind, []).append(fields)
+    for kind, rows in by_kind.items():
+        with open(out_dir / f"{kind.name.lower()}.csv", "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    return {kind.name.lower(): len(rows) for kind, rows in by_kind.items()}
+
+
+if __name__ == "__main__":
+    # python -m utils.journal <journal> [--csv DIR] [--npz FILE]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Decode a binary trading journal")
+    parser.add_argument("path")
+    parser.add_argument("--csv", help="Directory to write one CSV per record type into")
+    parser.add_argument("--npz", help="File to save one structured array per record type to")
+    args = parser.parse_args()
+
+    if args.csv:
+        counts = export_csv(args.path, args.csv)
+    else:
+        counts = {}
+        for kind, _ in read_journal(args.path):
+            counts[kind.name.lower()] = counts.get(kind.name.lower(), 0) + 1
+    if args.npz:
+        import numpy as np
+
+        np.savez(args.npz, **to_arrays(args.path))
+    for name, n in counts.items():
+        print(f"{name}: {n}")
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import logging
+import threading
+from typing import NamedTuple, Optional
+from utils.cpu_affinity import pin_current_thread
+import config
+from config import LIVE_CONFIG_PATH, LIVE_CONFIG_POLL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class TradingParams(NamedTuple):
+    """Immutable snapshot of the trading parameters that can change at runtime.
+
+    Field names are the lower-cased config.py constants; the live config
+    file uses the upper-case names, e.g. ``{"PROFIT_MARGIN": 0.05}``.
+    """
+
+    profit_margin: float
+    trading_bps_threshold: float
+    max_trading_bps_threshold: float
+    max_trades: int
+    max_inventory: int
+    min_delay_between_trades_seconds: float
+    max_session_notional: Optional[float]
+    max_one_legged: Optional[int]
+
+    @classmethod
+    def from_config(cls):
+        return cls(*(getattr(config, name.upper()) for name in cls._fields))
+
+    def validate(self):
+        if not 0 <= self.profit_margin < 0.5:
+            raise ValueError(f"PROFIT_MARGIN must be in [0, 0.5), got {self.profit_margin}")
+        if not 0 <= self.trading_bps_threshold <= self.max_trading_bps_threshold:
+            raise ValueError(
+                "Need 0 <= TRADING_BPS_THRESHOLD <= MAX_TRADING_BPS_THRESHOLD, got "
+                f"{self.trading_bps_threshold} and {self.max_trading_bps_threshold}"
+            )
+        for name in ("max_trades", "max_inventory", "max_one_legged"):
+            value = getattr(self, name)
+            if value is not None and (not isinstance(value, int) or value < 0):
+                raise ValueError(f"{name.upper()} must be a non-negative int, got {value!r}")
+        if self.max_session_notional is not None and self.max_session_notional < 0:
+            raise ValueError(f"MAX_SESSION_NOTIONAL must be >= 0, got {self.max_session_notional}")
+        if self.min_delay_between_trades_seconds < 0:
+            raise ValueError(
+                "MIN_DELAY_BETWEEN_TRADES_SECONDS must be >= 0, got "
+                f"{self.min_delay_between_trades_seconds}"
+            )
+        return self
+
+
+class LiveConfig:
+    """Trading parameters that follow a JSON file without a restart.
+
+    Hot paths read ``LIVE_CONFIG.params`` once per decision and use that
+    snapshot throughout, so a reload never mixes old and new values within
+    one decision. The watcher thread polls the file's mtime, overlays its
+    keys on the config.py defaults, validates the result and swaps
+    ``params`` with a single attribute store; an invalid file is logged and
+    ignored. Subscribers are called with (old, new) on the watcher thread
+    after each swap, to refresh state derived from the old values.
+    """
+
+    def __init__(self, path=LIVE_CONFIG_PATH, poll_seconds=LIVE_CONFIG_POLL_SECONDS):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.params = TradingParams.from_config().validate()
+        self.listeners = []
+        self.mtime = None
+        self.running = False
+        self.thread = None
+        self._pid = None
+
+    def subscribe(self, callback):
+        self.listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def load(self):
+        """Read and validate the file; returns the new snapshot without applying it."""
+        with open(self.path) as f:
+            overrides = json.load(f)
+        fields = {}
+        for key, value in overrides.items():
+            name = key.lower()
+            if name not in TradingParams._fields:
+                raise ValueError(f"Unknown live config key {key}")
+            fields[name] = value
+        return TradingParams.from_config()._replace(**fields).validate()
+
+    def reload(self):
+        """Apply the file if it changed since the last check; True if params were swapped."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self.mtime:
+            return False
+        self.mtime = mtime
+        try:
+            params = self.load()
+        except Exception as e:
+            logger.error(f"Ignoring live config {self.path}: {e}")
+            return False
+        old, self.params = self.params, params
+        if params == old:
+            return False
+        changes = ", ".join(
+            f"{name.upper()} {getattr(old, name)} -> {getattr(params, name)}"
+            for name in params._fields
+            if getattr(old, name) != getattr(params, name)
+        )
+        logger.info(f"Live config reloaded: {changes}")
+        for callback in list(self.listeners):
+            try:
+                callback(old, params)
+            except Exception as e:
+                logger.error(f"Error applying live config change: {e}")
+        return True
+
+    def start(self):
+        """Watch LIVE_CONFIG_PATH from a daemon thread; a no-op when it is not set."""
+        if self.path is None:
+            return
+        # A forked child (pipeline.py) inherits the flag but not the thread
+        if self.running and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self.running = True
+        self.reload()
+        self.thread = threading.Thread(target=self._watch, name="live-config", daemon=True)
+        self.thread.start()
+        logger.info(f"Watching {self.path} for trading parameter changes")
+
+    def _watch(self):
+        pin_current_thread("background")
+        while self.running:
+            time.sleep(self.poll_seconds)
+            self.reload()
+
+    def stop(self):
+        self.running = False
+
+
+LIVE_CONFIG = LiveConfig()
@@ -1,27 +1,91 @@
+import os
+import queue
+import atexit
 import logging
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from datetime import datetime
-from config import LOG_FOLDER
+from config import LOG_FOLDER, LOG_QUEUE, LOG_QUEUE_SIZE
 
+_log_filename = None
+_queue_handler = None
+_listener = None
+_listener_pid = None
 
-def setup_logging():
-    logs_dir = Path(LOG_FOLDER)
-    logs_dir.mkdir(exist_ok=True)
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
-    log_filename = logs_dir / f"polymarket_hft_{timestamp}.log"
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the caller and leaves formatting to the listener.
+
+    The stock handler formats the message on the logging thread before
+    enqueueing; here the record goes onto the queue as is and the listener
+    thread does all formatting. Records are dropped (and counted) when the
+    queue is full instead of stalling the trading thread.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Hot-path calls pass immutable args (%-style), so formatting later
+        # in the listener renders the same message
+        return record
 
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _build_handlers():
     log_format = "%(asctime)s.%(msecs)03d - %(name)s - %(levelname)s - %(message)s"
     date_format = "%Y-%m-%d %H:%M:%S"
+    formatter = logging.Formatter(log_format, date_format)
+    handlers = [
+        logging.FileHandler(_log_filename, encoding="utf-8"),
+        logging.StreamHandler(),
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format=log_format,
-        datefmt=date_format,
-        handlers=[
-            logging.FileHandler(log_filename, encoding="utf-8"),
-            logging.StreamHandler(),
-        ],
-    )
+
+def setup_logging():
+    global _log_filename, _queue_handler, _listener, _listener_pid
+
+    if _log_filename is None:
+        logs_dir = Path(LOG_FOLDER)
+        logs_dir.mkdir(exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        _log_filename = logs_dir / f"polymarket_hft_{timestamp}.log"
+
+    if not LOG_QUEUE:
+        logging.basicConfig(level=logging.INFO, handlers=_build_handlers())
+        return logging.getLogger(__name__)
+
+    # A forked child (pipeline.py) inherits the handler but not the listener
+    # thread, so it starts its own writer on the same log file
+    if _listener_pid != os.getpid():
+        _queue_handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        _listener = QueueListener(
+            _queue_handler.queue, *_build_handlers(), respect_handler_level=True
+        )
+        _listener.start()
+        _listener._thread.name = "log-writer"
+        _listener_pid = os.getpid()
+        atexit.register(_listener.stop)
+        logging.basicConfig(level=logging.INFO, handlers=[_queue_handler], force=True)
 
     return logging.getLogger(__name__)
+
+
+def get_logging_stats():
+    """Depth, capacity and dropped-record count of the log queue (None if not queued)."""
+    if _queue_handler is None:
+        return None
+    return {
+        "depth": _queue_handler.queue.qsize(),
+        "capacity": LOG_QUEUE_SIZE,
+        "dropped": _queue_handler.dropped,
+    }
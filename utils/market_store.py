@@ -0,0 +1,263 @@
+import sys
+import json
+import time
+import atexit
+import logging
+import threading
+from array import array
+from pathlib import Path
+from utils.cpu_affinity import pin_current_thread
+from utils.slug import get_session_start
+from config import MARKET_STORE_PATH, MARKET_STORE_FLUSH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# One raw file per column under <root>/<slug>/, all with one row per book
+# update. Columns are appended from array.array buffers, so the trader does
+# not need NumPy; readers memory-map them with the dtypes from meta.json.
+COLUMNS = (
+    ("ts_ns", "q", "i8"),
+    ("version", "q", "i8"),
+    ("best_bid", "d", "f8"),
+    ("best_ask", "d", "f8"),
+    ("best_bid_size", "d", "f8"),
+    ("best_ask_size", "d", "f8"),
+    ("micro_price", "d", "f8"),
+    ("micro_vs_mid_bps", "d", "f8"),
+    ("signal", "b", "i1"),  # 1 UP, -1 DOWN, 0 NEUTRAL
+)
+STORE_VERSION = 1
+_BYTE_ORDER = "<" if sys.byteorder == "little" else ">"
+
+
+class SessionWriter:
+    """Appends top-of-book rows for one session to its column files.
+
+    ``append`` adds one value to each in-memory column under a lock; the
+    shared "market-store" thread swaps the buffers out and writes them
+    every MARKET_STORE_FLUSH_SECONDS, so the feed thread never touches disk.
+    Once closed, the writer ignores further appends.
+    """
+
+    def __init__(self, root, slug):
+        self.dir = Path(root) / slug
+        self.dir.mkdir(parents=True, exist_ok=True)
+        meta = self.dir / "meta.json"
+        if not meta.exists():
+            meta.write_text(
+                json.dumps(
+                    {
+                        "version": STORE_VERSION,
+                        "slug": slug,
+                        "columns": {
+                            name: _BYTE_ORDER + dtype for name, _, dtype in COLUMNS
+                        },
+                    }
+                )
+            )
+        self.files = [open(self.dir / f"{name}.bin", "ab") for name, _, _ in COLUMNS]
+        self.lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._new_buffers()
+        self.rows = 0
+        self.closed = False
+
+    def _new_buffers(self):
+        self.buffers = [array(typecode) for _, typecode, _ in COLUMNS]
+        (
+            self._ts,
+            self._version,
+            self._bid,
+            self._ask,
+            self._bid_size,
+            self._ask_size,
+            self._micro,
+            self._bps,
+            self._signal,
+        ) = (buffer.append for buffer in self.buffers)
+
+    def append(self, ts_ns, version, market_data, signal):
+        with self.lock:
+            if self.closed:
+                return
+            self._ts(ts_ns)
+            self._version(version)
+            self._bid(market_data["best_bid_price"])
+            self._ask(market_data["best_ask_price"])
+            self._bid_size(market_data["best_bid_volume"])
+            self._ask_size(market_data["best_ask_volume"])
+            self._micro(market_data["micro_price"])
+            self._bps(market_data["micro_vs_mid_bps"])
+            self._signal(signal)
+
+    def flush(self):
+        # _flush_lock serialises whole flushes (flusher thread, atexit and
+        # close), so batches are written in order and never to closed files
+        with self._flush_lock:
+            with self.lock:
+                buffers = self.buffers
+                if not buffers[0]:
+                    return
+                self._new_buffers()
+            # Write every column before flushing any, then flush together, so
+            # readers trimming to the shortest column only lose whole rows
+            for buffer, f in zip(buffers, self.files):
+                buffer.tofile(f)
+            for f in self.files:
+                f.flush()
+            self.rows += len(buffers[0])
+
+    def close(self):
+        _unregister(self)
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        self.flush()
+        with self._flush_lock:
+            for f in self.files:
+                f.close()
+
+
+_writers = []
+_writers_lock = threading.Lock()
+_flusher = None
+
+
+def _flush_loop():
+    pin_current_thread("background")
+    while True:
+        time.sleep(MARKET_STORE_FLUSH_SECONDS)
+        flush_all()
+
+
+def flush_all():
+    with _writers_lock:
+        writers = list(_writers)
+    for writer in writers:
+        try:
+            writer.flush()
+        except Exception as e:
+            logger.error(f"Error flushing market store {writer.dir}: {e}")
+
+
+def _unregister(writer):
+    with _writers_lock:
+        if writer in _writers:
+            _writers.remove(writer)
+
+
+def open_session_writer(slug, root=MARKET_STORE_PATH):
+    """Writer for ``slug`` under MARKET_STORE_PATH, or None when the store is off."""
+    global _flusher
+    if root is None:
+        return None
+    writer = SessionWriter(root, slug)
+    with _writers_lock:
+        _writers.append(writer)
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_flush_loop, name="market-store", daemon=True)
+            _flusher.start()
+    return writer
+
+
+atexit.register(flush_all)
+
+
+def list_sessions(root=MARKET_STORE_PATH, prefix=None, start=None, end=None):
+    """Session slugs under ``root``, oldest first, optionally filtered.
+
+    ``prefix`` matches the slug (e.g. "btc-updown-15m"); ``start``/``end``
+    are Unix timestamps bounding the session start encoded in the slug.
+    Directories whose name does not end in a timestamp are skipped.
+    """
+    sessions = []
+    for path in Path(root).iterdir():
+        if not (path / "meta.json").exists():
+            continue
+        slug = path.name
+        if prefix and not slug.startswith(prefix):
+            continue
+        try:
+            session_start = get_session_start(slug)
+        except (IndexError, ValueError):
+            continue
+        if (start is not None and session_start < start) or (
+            end is not None and session_start >= end
+        ):
+            continue
+        sessions.append((session_start, slug))
+    return [slug for _, slug in sorted(sessions)]
+
+
+def open_session(slug, root=MARKET_STORE_PATH, columns=None):
+    """Memory-map a session's columns as read-only NumPy arrays.
+
+    All arrays have the length of the shortest column, so a row being
+    written while we read is left out rather than misaligned.
+    """
+    import numpy as np
+
+    directory = Path(root) / slug
+    meta = json.loads((directory / "meta.json").read_text())
+    names = columns or list(meta["columns"])
+    dtypes = {name: np.dtype(meta["columns"][name]) for name in names}
+    rows = min(
+        (directory / f"{name}.bin").stat().st_size // dtype.itemsize
+        for name, dtype in dtypes.items()
+    )
+    arrays = {}
+    for name, dtype in dtypes.items():
+        if rows:
+            arrays[name] = np.memmap(
+                directory / f"{name}.bin", dtype=dtype, mode="r", shape=(rows,)
+            )
+        else:
+            arrays[name] = np.empty(0, dtype=dtype)
+    return arrays
+
+
+def load_range(root=MARKET_STORE_PATH, prefix=None, start=None, end=None, columns=None):
+    """Concatenate ``columns`` over every matching session.
+
+    Adds a "session" column (session start from the slug) and a "segment"
+    column indexing into ``list_sessions`` with the same filters, which
+    tells apart markets whose sessions start at the same time. Only the
+    requested columns are read, straight from the page cache via the
+    memory maps.
+    """
+    import numpy as np
+
+    names = list(columns or [name for name, _, _ in COLUMNS])
+    parts = {name: [] for name in names}
+    sessions, segments = [], []
+    for segment, slug in enumerate(list_sessions(root, prefix, start, end)):
+        arrays = open_session(slug, root, names)
+        rows = len(arrays[names[0]])
+        for name in names:
+            parts[name].append(arrays[name])
+        sessions.append(np.full(rows, get_session_start(slug), dtype=np.int64))
+        segments.append(np.full(rows, segment, dtype=np.int32))
+    result = {
+        name: np.concatenate(chunks) if chunks else np.empty(0)
+        for name, chunks in parts.items()
+    }
+    result["session"] = np.concatenate(sessions) if sessions else np.empty(0, dtype=np.int64)
+    result["segment"] = np.concatenate(segments) if segments else np.empty(0, dtype=np.int32)
+    return result
+
+
+if __name__ == "__main__":
+    # python -m utils.market_store [root] [--prefix btc-updown-15m]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarise the columnar market data store")
+    parser.add_argument("root", nargs="?", default=MARKET_STORE_PATH)
+    parser.add_argument("--prefix")
+    args = parser.parse_args()
+
+    for slug in list_sessions(args.root, args.prefix):
+        arrays = open_session(slug, args.root, ["ts_ns", "micro_vs_mid_bps"])
+        rows = len(arrays["ts_ns"])
+        span = (arrays["ts_ns"][-1] - arrays["ts_ns"][0]) / 1e9 if rows else 0
+        print(f"{slug}: {rows} rows over {span:.0f}s")
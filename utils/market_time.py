@@ -1,6 +1,8 @@
 import time
 from config import MARKET_SESSION_SECONDS
 
+SESSION_END_BUFFER_SECONDS = 5
+
 
 def get_period_elapsed_seconds():
     ts = int(time.time())
@@ -10,4 +12,10 @@ def get_period_elapsed_seconds():
 
 def is_in_trading_window():
     elapsed_seconds = get_period_elapsed_seconds()
-    return elapsed_seconds < (MARKET_SESSION_SECONDS - 5)
+    return elapsed_seconds < (MARKET_SESSION_SECONDS - SESSION_END_BUFFER_SECONDS)
+
+
+def get_trading_window_end():
+    """Wall-clock time at which is_in_trading_window() turns False."""
+    period_start = (int(time.time()) // MARKET_SESSION_SECONDS) * MARKET_SESSION_SECONDS
+    return period_start + MARKET_SESSION_SECONDS - SESSION_END_BUFFER_SECONDS
@@ -0,0 +1,38 @@
+import socket
+import logging
+from config import MERGE_INTAKE_HOST, MERGE_INTAKE_PORT
+
+logger = logging.getLogger(__name__)
+
+_socket = None
+
+
+def notify_mergeable(condition_id):
+    """Tell a local merger that ``condition_id`` has both legs filled.
+
+    Fire-and-forget UDP datagram carrying the condition ID; if no merger is
+    listening the message is simply lost and its periodic scan catches up.
+    """
+    global _socket
+    try:
+        if _socket is None:
+            _socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            _socket.setblocking(False)
+        _socket.sendto(condition_id.encode(), (MERGE_INTAKE_HOST, MERGE_INTAKE_PORT))
+    except OSError as e:
+        logger.warning(f"Could not notify merger for {condition_id}: {e}")
+
+
+def parse_merge_request(datagram):
+    """Condition ID from a notify_mergeable() datagram, or None if malformed."""
+    try:
+        condition_id = datagram.decode().strip()
+    except UnicodeDecodeError:
+        return None
+    if len(condition_id) != 66 or not condition_id.startswith("0x"):
+        return None
+    try:
+        bytes.fromhex(condition_id[2:])
+    except ValueError:
+        return None
+    return condition_id
@@ -4,16 +4,58 @@ import time
 import json
 import logging
 import threading
-import websocket
 from enum import Enum
-from config import POLYMARKET_WS_MARKET_URL, TRADING_BPS_THRESHOLD
-from py_clob_client import OrderArgs
-from py_clob_client.order_builder.constants import BUY
+from operator import itemgetter
+from config import (
+    POLYMARKET_WS_MARKET_URL,
+    BOOK_SHM_NAME,
+    BOOK_SHM_DEPTH,
+    MERGE_NOTIFY,
+    POSITION_INDEX,
+    STRATEGY_WAIT_MODE,
+    MONITOR_WAIT_MODE,
+)
 from utils.clob_client import get_client
-from utils.inventory import get_inventory
+from utils.inventory import get_positions, get_inventory, get_paired_sizes
+from utils.merge_intake import notify_mergeable
+from utils.position_index import SHARE_UNITS, get_position_index
+from utils.events import EVENTS, EventNotifier
+from utils.wait_strategy import get_wait_strategy
+from utils.shm_book import get_book_publisher
+from utils.slug import get_session_start
+from utils.alloc_stats import MESSAGE_ALLOCS
+from utils.journal import RECORD, SIDE_CODES, record_event
+from utils.risk import RiskState
+from utils.live_config import LIVE_CONFIG
+from utils.market_store import open_session_writer
+from utils.cpu_affinity import pin_current_thread
+from utils.metrics import counter, gauge, histogram
 
 logger = logging.getLogger(__name__)
 
+_PRICE = itemgetter(0)
+
+# The monitor blocks on book updates; this only bounds how long stop() can take
+MONITOR_WAIT_TIMEOUT_SECONDS = 0.5
+
+WS_MESSAGES = counter("pm_ws_messages_total", "Market WebSocket messages received")
+WS_ERRORS = counter("pm_ws_errors_total", "Market WebSocket errors")
+WS_RECONNECTS = counter("pm_ws_reconnects_total", "Market WebSocket reconnect attempts")
+BOOK_UPDATE_SECONDS = histogram(
+    "pm_book_update_seconds", "Time to decode and apply one market message"
+)
+BOOK_EXCHANGE_LAG_SECONDS = histogram(
+    "pm_book_exchange_lag_seconds", "Local receive time minus exchange message timestamp"
+)
+SIGNAL_FLIPS = counter("pm_signal_flips_total", "Signal changes seen by the monitor")
+INVENTORY = gauge("pm_inventory", "Inventory of the current market")
+INVENTORY_POLL_SECONDS = histogram(
+    "pm_inventory_poll_seconds", "Time to refresh positions in the inventory updater"
+)
+INVENTORY_UPDATED = gauge(
+    "pm_inventory_last_update_timestamp_seconds", "When positions were last refreshed"
+)
+
 
 class SIGNALES(Enum):
     UP = "UP"
@@ -22,12 +64,20 @@ class SIGNALES(Enum):
 
 
 class OrderBook:
-    def __init__(self, up_token_id: str, down_token_id: str, slug: str):
+    def __init__(
+        self,
+        up_token_id: str,
+        down_token_id: str,
+        slug: str,
+        presign_orders: bool = True,
+        publish: bool = False,
+    ):
         self.up_token_id = up_token_id
         self.down_token_id = down_token_id
         self.slug = slug
         self.ws_url = POLYMARKET_WS_MARKET_URL
-        self.client = get_client()
+        # Feed-only books (see pipeline.py) never sign orders
+        self.presign_orders = presign_orders
 
         self.orderbook = {
             "best_bid": 0.0,
@@ -38,6 +88,23 @@ class OrderBook:
 
         self.signed_orders_cache = {}
 
+        # Bumped on every applied update; consumers wait on ``events``
+        self.version = 0
+        self.events = EventNotifier(get_wait_strategy(STRATEGY_WAIT_MODE))
+        # Book updates for the signal monitor, which waits separately
+        self.book_updates = EventNotifier(get_wait_strategy(MONITOR_WAIT_MODE))
+        self._market_data_cache = (-1, None)
+        # Only the book that owns the feed publishes (main.py, the pipeline feed
+        # process); other books, e.g. the gateway's presign book, must not
+        self.publisher = (
+            get_book_publisher(BOOK_SHM_NAME, BOOK_SHM_DEPTH)
+            if publish and BOOK_SHM_NAME
+            else None
+        )
+        self.session_start = get_session_start(slug)
+        # Opened in start(), so books that never stream do not create files
+        self.market_store = None
+
         self.ws = None
         self.running = False
         self.thread = None
@@ -48,31 +115,54 @@ class OrderBook:
 
         self.last_signal = SIGNALES.NEUTRAL
         self.inventory = 0
+        self.risk = RiskState(slug)
         self.inventory_thread = None
         self.inventory_running = False
-        self.create_signed_orders_cache()
+        # Paired (mergeable) size per condition already reported to the merger
+        self.merge_notified = {}
+        self.presign_thread = None
+
+        # Set once the first book snapshot has been applied
+        self.ready = threading.Event()
 
     def _on_message(self, ws, message):
+        # Stamped on entry so the consumers' wake latency runs from here
+        received_ns = time.perf_counter_ns()
+        WS_MESSAGES.inc()
+        if MESSAGE_ALLOCS.enabled:
+            # Measured around the whole handler so the decoded message is freed
+            MESSAGE_ALLOCS.start()
+            self._handle_message(message, received_ns)
+            MESSAGE_ALLOCS.stop()
+        else:
+            self._handle_message(message, received_ns)
+        BOOK_UPDATE_SECONDS.observe((time.perf_counter_ns() - received_ns) / 1e9)
 
+    def _handle_message(self, message, received_ns=None):
         try:
             data = json.loads(message)
             event_type = data.get("event_type")
+            timestamp = data.get("timestamp")
+            if timestamp:
+                BOOK_EXCHANGE_LAG_SECONDS.observe(time.time() - int(timestamp) / 1000)
 
             if event_type == "book":
-                self._update_order_book_snapshot(data)
+                self._update_order_book_snapshot(data, received_ns)
             elif event_type == "price_change":
-                self._process_price_change(data)
+                self._process_price_change(data, received_ns)
 
         except Exception as e:
             logger.error(f"⚠️  Error processing WebSocket message: {e}")
 
     def _on_error(self, ws, error):
+        WS_ERRORS.inc()
         logger.error(f"⚠️  WebSocket error: {error}")
 
     def _on_close(self, ws, close_status_code, close_msg):
         logger.info("🔌 WebSocket disconnected")
 
         if self.running:
+            WS_RECONNECTS.inc()
             logger.info("🔄 Attempting reconnect...")
             threading.Timer(0.1, self._connect).start()
 
@@ -84,6 +174,10 @@ class OrderBook:
     def _connect(self):
         if not self.running:
             return
+        # Also runs on the Timer threads that reconnect the socket
+        pin_current_thread("feed")
+
+        import websocket  # imported on first connect to keep startup fast
 
         try:
             self.ws = websocket.WebSocketApp(
@@ -109,20 +203,30 @@ class OrderBook:
         self.running = True
         self.monitoring_running = True
         self.inventory_running = True
+        if self.market_store is None:
+            self.market_store = open_session_writer(self.slug)
 
-        self.thread = threading.Thread(target=self._connect, daemon=True)
+        self.thread = threading.Thread(target=self._connect, name="feed", daemon=True)
         self.thread.start()
 
         self.monitoring_thread = threading.Thread(
-            target=self._continuous_trading_monitor, daemon=True
+            target=self._continuous_trading_monitor, name="monitor", daemon=True
         )
         self.monitoring_thread.start()
 
         self.inventory_thread = threading.Thread(
-            target=self._inventory_updater, daemon=True
+            target=self._inventory_updater, name="inventory", daemon=True
         )
         self.inventory_thread.start()
 
+        if self.presign_orders and self.presign_thread is None:
+            self.presign_thread = threading.Thread(
+                target=self._presign_orders, name="presign", daemon=True
+            )
+            self.presign_thread.start()
+        if self.presign_orders:
+            LIVE_CONFIG.subscribe(self._on_params_change)
+
         logger.info(
             "WebSocket price stream, trading monitor, and inventory updater started"
         )
@@ -131,58 +235,93 @@ class OrderBook:
         self.running = False
         self.monitoring_running = False
         self.inventory_running = False
+        self.book_updates.notify(EVENTS.TIMER)
+        LIVE_CONFIG.unsubscribe(self._on_params_change)
 
         if self.ws:
             self.ws.close()
+        if self.market_store is not None:
+            self.market_store.close()
+            self.market_store = None
 
         logger.info(
             "🛑 WebSocket price stream, trading monitor, and inventory updater stopped"
         )
 
     def _inventory_updater(self):
+        pin_current_thread("background")
         logger.info("Started inventory updater thread")
         while self.inventory_running:
             try:
-                self.inventory = get_inventory(self.slug)
+                poll_start = time.perf_counter()
+                if POSITION_INDEX:
+                    inventory, paired = self._positions_from_index()
+                else:
+                    positions = get_positions()
+                    inventory = get_inventory(self.slug, positions)
+                    paired = get_paired_sizes(positions, self.slug)
+                INVENTORY_POLL_SECONDS.observe(time.perf_counter() - poll_start)
+                INVENTORY_UPDATED.set(time.time())
+                INVENTORY.set(inventory)
+                if inventory != self.inventory:
+                    record_event(RECORD.FILL, self.session_start, inventory, self.inventory)
+                    self.risk.on_fill(inventory - self.inventory)
+                    self.inventory = inventory
+                    self.events.notify(EVENTS.FILL)
+                if MERGE_NOTIFY:
+                    self._notify_completed_pairs(paired)
             except Exception as e:
                 logger.error(f"Error updating inventory: {e}")
             time.sleep(1)
         logger.info("Stopped inventory updater thread")
 
+    def _positions_from_index(self):
+        index = get_position_index()
+        up = index.balance(self.up_token_id)
+        down = index.balance(self.down_token_id)
+        paired = {}
+        if up and down:
+            condition_id = index.condition_of(self.up_token_id)
+            if condition_id:
+                paired[condition_id] = min(up, down) / SHARE_UNITS
+        return round((up + down) / SHARE_UNITS / 5), paired
+
+    def _notify_completed_pairs(self, paired):
+        # Only report a condition when its paired size grows, so the merger
+        # gets one message per newly completed anchor/hedge pair
+        for condition_id, size in paired.items():
+            if size > self.merge_notified.get(condition_id, 0):
+                logger.info(f"Both legs filled on {condition_id}, notifying merger")
+                notify_mergeable(condition_id)
+        self.merge_notified = paired
+
     def is_connected(self):
         with self.lock:
             return self.orderbook["last_update"] is not None
 
     def get_current_market_data(self):
-        if self.orderbook["last_update"] is None:
-            return None
-
-        orderbook = self.orderbook["order_book"]
-        bids = []
-        asks = []
+        """Top-of-book prices and micro-price imbalance for the current book.
 
-        for bid in orderbook.get("bids", []):
-            if isinstance(bid, dict):
-                bids.append([float(bid["price"]), float(bid["size"])])
-            else:
-                bids.append([float(bid[0]), float(bid[1])])
-
-        for ask in orderbook.get("asks", []):
-            if isinstance(ask, dict):
-                asks.append([float(ask["price"]), float(ask["size"])])
-            else:
-                asks.append([float(ask[0]), float(ask[1])])
+        Computed once per book version; the returned dict is shared by all
+        callers until the book changes and must not be mutated.
+        """
+        cached_version, cached = self._market_data_cache
+        if cached_version == self.version:
+            return cached
 
-        bids.sort(key=lambda x: x[0], reverse=True)
-        asks.sort(key=lambda x: x[0])
-
-        if not bids or not asks:
-            return None
-
-        best_bid_price = bids[0][0]
-        best_bid_volume = bids[0][1]
-        best_ask_price = asks[0][0]
-        best_ask_volume = asks[0][1]
+        with self.lock:
+            version = self.version
+            if self.orderbook["last_update"] is None:
+                return None
+            orderbook = self.orderbook["order_book"]
+            bids = orderbook["bids"]
+            asks = orderbook["asks"]
+            if not bids or not asks:
+                self._market_data_cache = (version, None)
+                return None
+            # Both sides are kept sorted by ascending price
+            best_bid_price, best_bid_volume = bids[-1]
+            best_ask_price, best_ask_volume = asks[0]
 
         # Calculate micro-price
         total_volume = best_bid_volume + best_ask_volume
@@ -196,52 +335,90 @@ class OrderBook:
         mid_price = (best_bid_price + best_ask_price) / 2
         micro_vs_mid_bps = (micro_price - mid_price) * 10000
 
-        return {
+        market_data = {
             "best_bid_price": best_bid_price,
             "best_ask_price": best_ask_price,
+            "best_bid_volume": best_bid_volume,
+            "best_ask_volume": best_ask_volume,
             "micro_price": micro_price,
             "mid_price": mid_price,
             "micro_vs_mid_bps": micro_vs_mid_bps,
-            "bids": bids,
-            "asks": asks,
         }
+        self._market_data_cache = (version, market_data)
+        return market_data
 
     def _continuous_trading_monitor(self):
+        pin_current_thread("strategy")
         logger.info("Started continuous trading monitor")
 
+        last_version = -1
         while self.monitoring_running:
             try:
+                self.book_updates.wait(MONITOR_WAIT_TIMEOUT_SECONDS)
+                version = self.version
+                if version == last_version:
+                    continue
+
                 market_data = self.get_current_market_data()
                 if not market_data:
-                    time.sleep(0.1)
                     continue
+                last_version = version
 
                 micro_vs_mid_bps = market_data["micro_vs_mid_bps"]
 
+                threshold = LIVE_CONFIG.params.trading_bps_threshold
                 current_signal = None
-                if micro_vs_mid_bps > TRADING_BPS_THRESHOLD:
+                if micro_vs_mid_bps > threshold:
                     current_signal = SIGNALES.UP
-                elif micro_vs_mid_bps < -TRADING_BPS_THRESHOLD:
+                elif micro_vs_mid_bps < -threshold:
                     current_signal = SIGNALES.DOWN
                 else:
                     current_signal = SIGNALES.NEUTRAL
 
                 if current_signal and current_signal != self.last_signal:
                     self.last_signal = current_signal
-
-                time.sleep(0.005)
+                    self.events.notify(EVENTS.SIGNAL)
+                    SIGNAL_FLIPS.inc()
+                    record_event(
+                        RECORD.SIGNAL,
+                        self.session_start,
+                        version,
+                        micro_vs_mid_bps,
+                        SIDE_CODES[current_signal.value],
+                    )
+                    self._publish_snapshot()
 
             except Exception as e:
                 logger.error(f"Error in continuous trading monitor: {e}")
                 time.sleep(1)
 
+        self.book_updates.wake_latency.log("Signal monitor")
         logger.info("Stopped continuous trading monitor")
 
-    def create_signed_orders_cache(self):
+    def wait_until_ready(self, timeout=None):
+        """Block until the first book snapshot arrives; False on timeout."""
+        return self.ready.wait(timeout)
+
+    def _presign_orders(self):
+        pin_current_thread("background")
+        # Trading can start before this finishes: uncached prices are signed
+        # on demand, so sign the prices nearest the current book first
+        self.ready.wait(timeout=2)
+        try:
+            market_data = self.get_current_market_data()
+            self.create_signed_orders_cache(market_data["mid_price"] if market_data else 0.5)
+        except Exception as e:
+            logger.error(f"Error pre-signing orders, signing on demand instead: {e}")
+
+    def create_signed_orders_cache(self, mid_price=0.5):
+        from py_clob_client.clob_types import OrderArgs
+        from py_clob_client.order_builder.constants import BUY
+
         start = time.time()
         prices = [0.01]
         while prices[-1] < 0.99:
             prices.append(round(prices[-1] + 0.01, 2))
+        prices.sort(key=lambda p: min(abs(p - mid_price), abs(p - (1 - mid_price))))
 
         client = get_client()
         for price in prices:
@@ -260,6 +437,9 @@ class OrderBook:
         )
 
     def update_signed_orders_cache(self, prices):
+        from py_clob_client.clob_types import OrderArgs
+        from py_clob_client.order_builder.constants import BUY
+
         client = get_client()
         for price in prices:
             for token_id in [self.up_token_id, self.down_token_id]:
@@ -273,27 +453,63 @@ class OrderBook:
                 self.signed_orders_cache[(token_id, price)] = signed_order
         logger.info(f"Updated signed orders cache for new prices: {prices}")
 
+    def _on_params_change(self, old, new):
+        # The cache covers every price, so a new margin only changes which
+        # hedge keys get used; re-sign the ones the current book maps to so
+        # the next pair's hedge is fresh and never signed on demand
+        if new.profit_margin == old.profit_margin:
+            return
+        market_data = self.get_current_market_data()
+        if not market_data:
+            return
+        anchors = (
+            round(market_data["best_bid_price"], 2),
+            round(1 - market_data["best_ask_price"], 2),
+        )
+        hedges = sorted(
+            {
+                hedge
+                for hedge in (round(1 - anchor - new.profit_margin, 2) for anchor in anchors)
+                if 0.01 <= hedge <= 0.99
+            }
+        )
+        if hedges:
+            self.update_signed_orders_cache(hedges)
+
     def clear_screen(self):
         os.system("cls" if os.name == "nt" else "clear")
 
-    def _update_order_book_snapshot(self, new_orderbook):
+    def _update_order_book_snapshot(self, new_orderbook, received_ns=None):
         asset_id = new_orderbook.get("asset_id")
 
         # Only process UP token as down token is just the opposite side
         if asset_id != self.up_token_id:
             return
 
+        # Normalise once to [price, size] floats sorted by ascending price so
+        # incremental updates can bisect and update levels in place
+        bids = sorted(
+            [float(level["price"]), float(level["size"])]
+            for level in new_orderbook.get("bids", [])
+        )
+        asks = sorted(
+            [float(level["price"]), float(level["size"])]
+            for level in new_orderbook.get("asks", [])
+        )
+
         with self.lock:
-            self.orderbook["best_bid"] = (
-                new_orderbook["bids"][-1]["price"] if new_orderbook["bids"] else 0.0
-            )
-            self.orderbook["best_ask"] = (
-                new_orderbook["asks"][-1]["price"] if new_orderbook["asks"] else 0.0
-            )
+            self.orderbook["best_bid"] = bids[-1][0] if bids else 0.0
+            self.orderbook["best_ask"] = asks[0][0] if asks else 0.0
 
-            self.orderbook["order_book"]["bids"] = new_orderbook.get("bids", [])
-            self.orderbook["order_book"]["asks"] = new_orderbook.get("asks", [])
+            self.orderbook["order_book"]["bids"] = bids
+            self.orderbook["order_book"]["asks"] = asks
             self.orderbook["last_update"] = time.time()
+            self.version += 1
+        self.ready.set()
+        self.events.notify(EVENTS.BOOK, received_ns)
+        self.book_updates.notify(EVENTS.BOOK, received_ns)
+        self._publish_snapshot()
+        self._store_top_of_book()
 
     def _update_orderbook_incremental(self, asset_id, update):
         if asset_id != self.up_token_id:
@@ -309,16 +525,7 @@ class OrderBook:
         orderbook = self.orderbook["order_book"]
         book_side = orderbook["bids"] if side == "BUY" else orderbook["asks"]
 
-        if book_side and isinstance(book_side[0], dict):
-            book_side = [
-                [float(item["price"]), float(item["size"])] for item in book_side
-            ]
-            if side == "BUY":
-                orderbook["bids"] = book_side
-            else:
-                orderbook["asks"] = book_side
-
-        idx = bisect.bisect_left(book_side, [price, 0])
+        idx = bisect.bisect_left(book_side, price, key=_PRICE)
 
         if idx < len(book_side) and book_side[idx][0] == price:
             if size == 0:
@@ -328,28 +535,18 @@ class OrderBook:
         elif size > 0:
             book_side.insert(idx, [price, size])
 
+        # A resting level at this price crosses out the other side
         if size > 0:
             if side == "BUY":
                 asks = orderbook["asks"]
-                if asks and isinstance(asks[0], dict):
-                    asks = [
-                        [float(item["price"]), float(item["size"])] for item in asks
-                    ]
-                    orderbook["asks"] = asks
-                cull_idx = bisect.bisect_right(asks, [price, float("inf")])
-                orderbook["asks"] = asks[cull_idx:]
+                del asks[: bisect.bisect_right(asks, price, key=_PRICE)]
             else:  # side == "SELL"
                 bids = orderbook["bids"]
-                if bids and isinstance(bids[0], dict):
-                    bids = [
-                        [float(item["price"]), float(item["size"])] for item in bids
-                    ]
-                    orderbook["bids"] = bids
-                cull_idx = bisect.bisect_left(bids, [price, 0])
-                orderbook["bids"] = bids[:cull_idx]
-
-    def _process_price_change(self, data):
+                del bids[bisect.bisect_left(bids, price, key=_PRICE) :]
+
+    def _process_price_change(self, data, received_ns=None):
         price_changes = data.get("price_changes", [])
+        updated = False
 
         for change in price_changes:
             asset_id = change.get("asset_id")
@@ -359,3 +556,42 @@ class OrderBook:
             with self.lock:
                 self._update_orderbook_incremental(asset_id, change)
                 self.orderbook["last_update"] = time.time()
+                self.version += 1
+            updated = True
+
+        if updated:
+            self.events.notify(EVENTS.BOOK, received_ns)
+            self.book_updates.notify(EVENTS.BOOK, received_ns)
+            self._publish_snapshot()
+            self._store_top_of_book()
+
+    def _store_top_of_book(self):
+        store = self.market_store
+        if store is None:
+            return
+        # Computed once per version, so the strategy reuses this dict
+        market_data = self.get_current_market_data()
+        if market_data:
+            store.append(
+                time.time_ns(),
+                self.version,
+                market_data,
+                SIDE_CODES[self.last_signal.value],
+            )
+
+    def _publish_snapshot(self):
+        if self.publisher is None:
+            return
+        market_data = self.get_current_market_data()
+        if not market_data:
+            return
+        with self.lock:
+            self.publisher.publish(
+                market_data,
+                self.orderbook["order_book"]["bids"],
+                self.orderbook["order_book"]["asks"],
+                self.version,
+                self.session_start,
+                self.last_signal,
+                self.inventory,
+            )
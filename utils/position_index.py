@@ -0,0 +1,381 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+import requests
+from abi.ctfAbi import ctf_abi
+from utils.cpu_affinity import pin_current_thread
+from config import (
+    GAMMA_API_URL,
+    REQUEST_TIMEOUT,
+    POSITION_INDEX_PATH,
+    POSITION_INDEX_POLL_SECONDS,
+    POSITION_INDEX_CONFIRMATIONS,
+    POSITION_INDEX_BLOCK_CHUNK,
+    POSITION_INDEX_START_BLOCK,
+    POSITION_INDEX_BOOTSTRAP_BLOCKS,
+)
+
+logger = logging.getLogger(__name__)
+
+CONDITIONAL_TOKENS_FRAMEWORK_ADDRESS = "0x4D97DCd97eC945f40cF65F87097ACe5EA0476045"
+# keccak256 of the ERC-1155 event signatures
+TRANSFER_SINGLE_TOPIC = "0xc3d58168c5ae7397731d063d5bbf3d657854427343f4c083240f7aacaa2d0f62"
+TRANSFER_BATCH_TOPIC = "0x4a39dc06d4c0dbc64b70af90fd698a233a518aa5d07e595d983b8c0526c8f7fb"
+POSITIONS_URL = "https://data-api.polymarket.com/positions"
+SHARE_UNITS = 10**6  # CTF balances are in USDC base units (6 decimals)
+BALANCE_BATCH_SIZE = 200  # Token IDs per balanceOfBatch call
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cursor (id INTEGER PRIMARY KEY CHECK (id = 0), block INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS balances (token_id TEXT PRIMARY KEY, balance INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS tokens (
+    token_id TEXT PRIMARY KEY,
+    condition_id TEXT NOT NULL,
+    outcome_index INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tokens_by_condition ON tokens (condition_id);
+"""
+
+
+def _hex(value):
+    return value if isinstance(value, str) else "0x" + bytes(value).hex()
+
+
+def _word(data, index):
+    return int.from_bytes(data[32 * index : 32 * (index + 1)], "big")
+
+
+def _topic_address(topic):
+    return "0x" + _hex(topic)[-40:].lower()
+
+
+def address_topic(address):
+    return "0x" + "0" * 24 + address.lower()[2:]
+
+
+def decode_transfer_log(log):
+    """Decode a TransferSingle/TransferBatch log into (from, to, [(token_id, value)]).
+
+    ``log`` is an eth_getLogs entry (hex strings or bytes both work).
+    Returns None for other events.
+    """
+    topics = [_hex(topic) for topic in log["topics"]]
+    data = log["data"]
+    data = bytes.fromhex(data[2:]) if isinstance(data, str) else bytes(data)
+    sender, receiver = _topic_address(topics[2]), _topic_address(topics[3])
+    if topics[0] == TRANSFER_SINGLE_TOPIC:
+        return sender, receiver, [(_word(data, 0), _word(data, 1))]
+    if topics[0] == TRANSFER_BATCH_TOPIC:
+        # abi.encode(uint256[] ids, uint256[] values): two offsets, then
+        # each array as length followed by its items
+        ids_at = _word(data, 0) // 32
+        values_at = _word(data, 1) // 32
+        count = _word(data, ids_at)
+        return sender, receiver, [
+            (_word(data, ids_at + 1 + i), _word(data, values_at + 1 + i))
+            for i in range(count)
+        ]
+    return None
+
+
+def balance_deltas(logs, owner):
+    """Net balance change per token ID for ``owner`` over ``logs``."""
+    owner = owner.lower()
+    deltas = {}
+    for log in logs:
+        transfer = decode_transfer_log(log)
+        if transfer is None:
+            continue
+        sender, receiver, amounts = transfer
+        for token_id, value in amounts:
+            if receiver == owner:
+                deltas[token_id] = deltas.get(token_id, 0) + value
+            if sender == owner:
+                deltas[token_id] = deltas.get(token_id, 0) - value
+    return deltas
+
+
+class PositionIndex:
+    """Safe's CTF balances, maintained from TransferSingle/TransferBatch logs.
+
+    Logs are fetched from a persisted block cursor up to the chain head minus
+    POSITION_INDEX_CONFIRMATIONS and applied to a SQLite table in the same
+    transaction that advances the cursor, so several processes can share one
+    database file. Token IDs are mapped to their condition (via Gamma, once
+    per token) so merge discovery can be answered locally.
+    """
+
+    def __init__(self, owner, rpc_url=None, path=POSITION_INDEX_PATH):
+        from web3 import Web3
+
+        self.owner = Web3.to_checksum_address(owner)
+        self.w3 = Web3(Web3.HTTPProvider(rpc_url or os.getenv("RPC_URL")))
+        self.path = path
+        self.running = False
+        self.thread = None
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db().executescript(_SCHEMA)
+
+    def _db(self):
+        # One connection per thread; sqlite3 connections are not shareable
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    # --- indexing ---
+
+    def sync(self):
+        """Apply new logs up to the confirmed head; returns the number of logs applied."""
+        head = self.w3.eth.block_number - POSITION_INDEX_CONFIRMATIONS
+        applied = 0
+        db = self._db()
+        cursor = self._cursor(db)
+        if cursor is None:
+            self._bootstrap(db, head)
+            return 0
+        while cursor < head:
+            to_block = min(head, cursor + POSITION_INDEX_BLOCK_CHUNK)
+            logs = self._fetch_logs(cursor + 1, to_block)
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                # Another process may have indexed this range meanwhile
+                if self._cursor(db) != cursor:
+                    db.execute("ROLLBACK")
+                    cursor = self._cursor(db)
+                    continue
+                self._apply(db, logs)
+                db.execute("UPDATE cursor SET block = ? WHERE id = 0", (to_block,))
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+            applied += len(logs)
+            cursor = to_block
+        return applied
+
+    def _cursor(self, db):
+        row = db.execute("SELECT block FROM cursor WHERE id = 0").fetchone()
+        return row[0] if row else None
+
+    def _fetch_logs(self, from_block, to_block):
+        owner_topic = address_topic(self.owner)
+        events = [TRANSFER_SINGLE_TOPIC, TRANSFER_BATCH_TOPIC]
+        logs = []
+        # Logs where the Safe is the sender, then the receiver, at most
+        # POSITION_INDEX_BLOCK_CHUNK blocks per request
+        for chunk_start in range(from_block, to_block + 1, POSITION_INDEX_BLOCK_CHUNK):
+            chunk_end = min(to_block, chunk_start + POSITION_INDEX_BLOCK_CHUNK - 1)
+            for topics in ([events, None, owner_topic], [events, None, None, owner_topic]):
+                logs.extend(
+                    self.w3.eth.get_logs(
+                        {
+                            "address": CONDITIONAL_TOKENS_FRAMEWORK_ADDRESS,
+                            "fromBlock": chunk_start,
+                            "toBlock": chunk_end,
+                            "topics": topics,
+                        }
+                    )
+                )
+        # Self-transfers match both queries
+        unique = {(log["transactionHash"], log["logIndex"]): log for log in logs}
+        return sorted(unique.values(), key=lambda log: (log["blockNumber"], log["logIndex"]))
+
+    def _apply(self, db, logs):
+        for token_id, delta in balance_deltas(logs, self.owner).items():
+            db.execute(
+                "INSERT INTO balances (token_id, balance) VALUES (?, ?) "
+                "ON CONFLICT(token_id) DO UPDATE SET balance = balance + excluded.balance",
+                (str(token_id), delta),
+            )
+
+    def _bootstrap(self, db, head):
+        """Seed balances as of block ``head`` and follow logs after it.
+
+        With POSITION_INDEX_START_BLOCK set, balances start empty and every
+        log from that block on is replayed. Otherwise data-api only names the
+        held tokens: it lags the chain by an unknown amount, so its sizes do
+        not match any block the cursor could start from. Tokens it has not
+        caught up with are added from the last POSITION_INDEX_BOOTSTRAP_BLOCKS
+        of logs, and every balance is read with balanceOfBatch at ``head``.
+        """
+        conditions, balances = {}, {}
+        if POSITION_INDEX_START_BLOCK is not None:
+            start = POSITION_INDEX_START_BLOCK - 1
+        else:
+            start = head
+            params = {"sizeThreshold": 0, "limit": 500, "user": self.owner}
+            positions = requests.get(POSITIONS_URL, params=params, timeout=REQUEST_TIMEOUT).json()
+            for position in positions or ():
+                conditions[int(position["asset"])] = (
+                    position["conditionId"],
+                    int(position.get("outcomeIndex", 0)),
+                )
+            recent = self._fetch_logs(max(0, head - POSITION_INDEX_BOOTSTRAP_BLOCKS) + 1, head)
+            token_ids = sorted(set(conditions) | set(balance_deltas(recent, self.owner)))
+            balances = dict(zip(token_ids, self._balances_at(token_ids, head)))
+        db.execute("BEGIN IMMEDIATE")
+        if self._cursor(db) is not None:
+            db.execute("ROLLBACK")
+            return
+        for token_id, balance in balances.items():
+            if balance:
+                db.execute(
+                    "INSERT OR REPLACE INTO balances (token_id, balance) VALUES (?, ?)",
+                    (str(token_id), balance),
+                )
+        for token_id, (condition_id, outcome_index) in conditions.items():
+            db.execute(
+                "INSERT OR IGNORE INTO tokens (token_id, condition_id, outcome_index) VALUES (?, ?, ?)",
+                (str(token_id), condition_id, outcome_index),
+            )
+        db.execute("INSERT INTO cursor (id, block) VALUES (0, ?)", (start,))
+        db.execute("COMMIT")
+        self._resolve_tokens(db)
+        held = sum(1 for balance in balances.values() if balance)
+        logger.info(f"Position index initialised after block {start} with {held} positions")
+
+    def _balances_at(self, token_ids, block):
+        """The owner's balance of each of ``token_ids`` as of ``block``."""
+        ctf = self.w3.eth.contract(address=CONDITIONAL_TOKENS_FRAMEWORK_ADDRESS, abi=ctf_abi)
+        balances = []
+        for start in range(0, len(token_ids), BALANCE_BATCH_SIZE):
+            chunk = token_ids[start : start + BALANCE_BATCH_SIZE]
+            balances.extend(
+                ctf.functions.balanceOfBatch([self.owner] * len(chunk), chunk).call(
+                    block_identifier=block
+                )
+            )
+        return balances
+
+    def _resolve_tokens(self, db):
+        """Look up the condition of held tokens not seen before (one Gamma call per token)."""
+        unknown = [
+            row[0]
+            for row in db.execute(
+                "SELECT b.token_id FROM balances b LEFT JOIN tokens t USING (token_id) "
+                "WHERE t.token_id IS NULL AND b.balance > 0"
+            )
+        ]
+        for token_id in unknown:
+            try:
+                response = requests.get(
+                    f"{GAMMA_API_URL}/markets",
+                    params={"clob_token_ids": token_id},
+                    timeout=REQUEST_TIMEOUT,
+                )
+                markets = response.json()
+            except Exception as e:
+                logger.warning(f"Could not resolve token {token_id}: {e}")
+                continue
+            for market in markets or ():
+                token_ids = market.get("clobTokenIds")
+                token_ids = token_ids if isinstance(token_ids, list) else json.loads(token_ids or "[]")
+                for outcome_index, market_token in enumerate(token_ids):
+                    db.execute(
+                        "INSERT OR IGNORE INTO tokens (token_id, condition_id, outcome_index) VALUES (?, ?, ?)",
+                        (str(market_token), market["conditionId"], outcome_index),
+                    )
+
+    def start(self, interval=POSITION_INDEX_POLL_SECONDS):
+        self.running = True
+        self.thread = threading.Thread(
+            target=self._run, args=(interval,), name="position-index", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _run(self, interval):
+        pin_current_thread("background")
+        logger.info("Started position indexer thread")
+        while self.running:
+            try:
+                if self.sync():
+                    self._resolve_tokens(self._db())
+            except Exception as e:
+                logger.error(f"Error indexing positions: {e}")
+            time.sleep(interval)
+        logger.info("Stopped position indexer thread")
+
+    # --- queries ---
+
+    def balance(self, token_id):
+        db = self._db()
+        row = db.execute(
+            "SELECT balance FROM balances WHERE token_id = ?", (str(token_id),)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def condition_of(self, token_id):
+        db = self._db()
+        row = db.execute(
+            "SELECT condition_id FROM tokens WHERE token_id = ?", (str(token_id),)
+        ).fetchone()
+        if row is None:
+            self._resolve_tokens(db)
+            row = db.execute(
+                "SELECT condition_id FROM tokens WHERE token_id = ?", (str(token_id),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def condition_balances(self, condition_id):
+        """Balances of a condition's outcomes, indexed by outcome."""
+        db = self._db()
+        rows = db.execute(
+            "SELECT t.outcome_index, COALESCE(b.balance, 0) FROM tokens t "
+            "LEFT JOIN balances b USING (token_id) WHERE t.condition_id = ? "
+            "ORDER BY t.outcome_index",
+            (condition_id,),
+        ).fetchall()
+        return [balance for _, balance in rows]
+
+    def mergeable_conditions(self):
+        """Condition ID -> mergeable amount (smaller outcome balance) where both legs are held."""
+        db = self._db()
+        rows = db.execute(
+            "SELECT t.condition_id, MIN(b.balance), COUNT(*) FROM tokens t "
+            "JOIN balances b USING (token_id) WHERE b.balance > 0 "
+            "GROUP BY t.condition_id"
+        ).fetchall()
+        return {condition_id: amount for condition_id, amount, legs in rows if legs >= 2}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_position_index():
+    """Process-wide PositionIndex for the Safe, started on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = PositionIndex(os.getenv("POLYMARKET_PROXY_ADDRESS"))
+            _index.start()
+    return _index
+
+
+if __name__ == "__main__":
+    # python -m utils.position_index: sync once and print held positions
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    index = PositionIndex(os.getenv("POLYMARKET_PROXY_ADDRESS"))
+    print(f"Applied {index.sync()} logs")
+    db = index._db()
+    index._resolve_tokens(db)
+    for token_id, balance, condition_id in db.execute(
+        "SELECT b.token_id, b.balance, t.condition_id FROM balances b "
+        "LEFT JOIN tokens t USING (token_id) WHERE b.balance > 0"
+    ):
+        print(f"{condition_id} {token_id} {balance / SHARE_UNITS:.2f}")
+    print(f"Mergeable: {index.mergeable_conditions()}")
@@ -0,0 +1,175 @@
+import sys
+import time
+import signal
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+from urllib.parse import parse_qs
+from utils.cpu_affinity import pin_current_thread
+from utils.metrics import register_route
+from config import (
+    LOG_FOLDER,
+    PROFILER_INTERVAL_SECONDS,
+    PROFILER_MAX_OVERHEAD,
+    PROFILER_MAX_DEPTH,
+    PROFILER_MAX_STACKS,
+)
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_STACK = "[other stacks]"
+
+
+class SamplingProfiler:
+    """Samples every thread's Python stack from a helper thread.
+
+    Each sample walks ``sys._current_frames()`` and counts the stack under
+    the thread's name (feed, monitor, inventory, MainThread, ...), giving
+    collapsed-stack output for flamegraph.pl or speedscope. The sampler
+    holds the GIL while it walks the stacks, so it stretches its sleep to
+    keep its own time under PROFILER_MAX_OVERHEAD of wall time, and stops
+    adding new distinct stacks after PROFILER_MAX_STACKS.
+    """
+
+    def __init__(
+        self,
+        interval=PROFILER_INTERVAL_SECONDS,
+        max_overhead=PROFILER_MAX_OVERHEAD,
+        max_depth=PROFILER_MAX_DEPTH,
+        max_stacks=PROFILER_MAX_STACKS,
+    ):
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+        self.running = False
+        self.thread = None
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.counts = {}
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.started_at = None
+        self.stopped_at = None
+
+    def start(self):
+        with self.lock:
+            # Also refuse while the previous run is still writing its output
+            if self.running or (self.thread is not None and self.thread.is_alive()):
+                return False
+            self.reset()
+            self.running = True
+            self.started_at = time.time()
+            self.thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+            self.thread.start()
+        logger.info(f"Profiler started, sampling every {self.interval * 1000:.1f} ms")
+        return True
+
+    def stop(self, wait=True):
+        """Stop sampling; with ``wait`` block until the sampler thread has exited."""
+        with self.lock:
+            if not self.running:
+                return False
+            self.running = False
+            thread = self.thread
+        if wait:
+            thread.join()
+        return True
+
+    def _run(self):
+        pin_current_thread("background")
+        own_id = threading.get_ident()
+        while self.running:
+            start = time.perf_counter()
+            self._sample(own_id)
+            cost = time.perf_counter() - start
+            self.sampling_seconds += cost
+            self.samples += 1
+            # Bound the duty cycle: a slow walk (many threads, deep stacks)
+            # lengthens the gap instead of eating into the trading threads
+            time.sleep(max(self.interval, cost / self.max_overhead - cost))
+        self.stopped_at = time.time()
+        self._report()
+
+    def _sample(self, own_id):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        counts = self.counts
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            frames = []
+            while frame is not None and len(frames) < self.max_depth:
+                code = frame.f_code
+                frames.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+                frame = frame.f_back
+            frames.append(names.get(thread_id, str(thread_id)))
+            stack = ";".join(reversed(frames))
+            if stack in counts:
+                counts[stack] += 1
+            elif len(counts) < self.max_stacks:
+                counts[stack] = 1
+            else:
+                key = f"{frames[-1]};{OVERFLOW_STACK}"
+                counts[key] = counts.get(key, 0) + 1
+
+    def collapsed(self):
+        """Samples as ``thread;frame;...;frame count`` lines, root first."""
+        return "".join(
+            f"{stack} {count}\n"
+            for stack, count in sorted(self.counts.items(), key=lambda item: -item[1])
+        )
+
+    def write(self, path=None):
+        if path is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            path = Path(LOG_FOLDER) / f"profile_{timestamp}.collapsed"
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            f.write(self.collapsed())
+        return path
+
+    def _report(self):
+        elapsed = (self.stopped_at or time.time()) - self.started_at
+        path = self.write()
+        logger.info(
+            f"Profiler stopped: {self.samples} samples over {elapsed:.1f}s "
+            f"({self.sampling_seconds / max(elapsed, 1e-9) * 100:.2f}% sampling time), "
+            f"written to {path}"
+        )
+
+
+PROFILER = SamplingProfiler()
+
+
+def toggle_profiler(*_):
+    """Start the profiler, or stop it and write the collapsed stacks."""
+    if PROFILER.running:
+        # Called from a signal handler: the sampler thread writes the output
+        PROFILER.stop(wait=False)
+    else:
+        PROFILER.start()
+
+
+def install_profiler_signal(signum=signal.SIGUSR2):
+    """``kill -USR2 <pid>`` toggles the profiler (see toggle_profiler)."""
+    signal.signal(signum, toggle_profiler)
+
+
+def _profile_route(query):
+    # GET /profile?seconds=10 profiles for that long and returns the stacks
+    seconds = float(parse_qs(query).get("seconds", ["10"])[0])
+    if not 0 < seconds <= 300:
+        return 400, "seconds must be in (0, 300]\n"
+    if not PROFILER.start():
+        return 409, "Profiler already running\n"
+    try:
+        time.sleep(seconds)
+    finally:
+        PROFILER.stop()
+    return 200, PROFILER.collapsed()
+
+
+register_route("/profile", _profile_route)
@@ -0,0 +1,125 @@
+import time
+import logging
+import threading
+from collections import deque
+from config import RISK_SESSION_HISTORY
+from utils.live_config import LIVE_CONFIG
+from utils.metrics import counter
+
+logger = logging.getLogger(__name__)
+
+RISK_REJECTS = counter("pm_risk_rejects_total", "Entries refused by the pre-trade risk check")
+FAILED_LEGS = counter("pm_failed_legs_total", "Anchor or hedge orders that were not placed")
+ONE_LEGGED = counter("pm_one_legged_total", "Pairs where only one of the two legs was placed")
+
+# Finished sessions, newest last (see RiskState.close)
+SESSION_HISTORY = deque(maxlen=RISK_SESSION_HISTORY)
+
+
+class RiskState:
+    """Pre-trade risk counters for one market session.
+
+    Every update takes ``lock`` so compound changes (reserve a trade, then
+    settle both legs) are atomic across the strategy, executor and inventory
+    threads. The counters are plain ints, so readers such as ``snapshot``
+    and the metrics thread never need the lock. ``reserve_pair`` is the O(1)
+    check-and-increment the strategy calls before sending an order pair.
+    Limits come from ``limits`` (a TradingParams) or, when None, from the
+    live config snapshot at the time of the check.
+    """
+
+    def __init__(self, market, limits=None):
+        self.market = market
+        self.limits = limits
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.trades = 0
+            self.notional = 0.0
+            self.open_orders = 0
+            self.one_legged = 0
+            self.failed_legs = 0
+            self.rejects = 0
+            self.started_at = time.time()
+
+    def reserve_pair(self, notional, inventory):
+        """Count a pair about to be sent; False (nothing counted) if a limit is hit."""
+        limits = self.limits or LIVE_CONFIG.params
+        with self.lock:
+            if (
+                self.trades >= limits.max_trades
+                or inventory >= limits.max_inventory
+                or (
+                    limits.max_session_notional is not None
+                    and self.notional + notional > limits.max_session_notional
+                )
+                or (
+                    limits.max_one_legged is not None
+                    and self.one_legged >= limits.max_one_legged
+                )
+            ):
+                self.rejects += 1
+                RISK_REJECTS.inc()
+                return False
+            self.trades += 1
+            self.notional += notional
+            return True
+
+    def settle_pair(self, order_ids, notional):
+        """Account for the result of a reserved pair.
+
+        ``order_ids`` holds one ID (or None on failure) per leg. If no leg
+        was placed the reservation is released so it does not count against
+        MAX_TRADES; if only one was, the pair is one-legged exposure. An
+        empty result (orders handed to another process) keeps the reservation.
+        """
+        if not order_ids:
+            return
+        placed = sum(1 for order_id in order_ids if order_id)
+        failed = len(order_ids) - placed
+        with self.lock:
+            self.open_orders += placed
+            self.failed_legs += failed
+            if not placed:
+                self.trades -= 1
+                self.notional -= notional
+            elif failed:
+                self.one_legged += 1
+        if failed:
+            FAILED_LEGS.inc(failed)
+            if placed:
+                ONE_LEGGED.inc()
+
+    def on_fill(self, filled):
+        """``filled`` legs (inventory units) were filled; they are no longer open."""
+        if filled <= 0:
+            return
+        with self.lock:
+            self.open_orders = max(0, self.open_orders - filled)
+
+    def snapshot(self):
+        return {
+            "market": self.market,
+            "started_at": self.started_at,
+            "trades": self.trades,
+            "notional": round(self.notional, 4),
+            "open_orders": self.open_orders,
+            "one_legged": self.one_legged,
+            "failed_legs": self.failed_legs,
+            "rejects": self.rejects,
+        }
+
+    def close(self):
+        """Snapshot the finished session into SESSION_HISTORY and log it."""
+        stats = self.snapshot()
+        stats["ended_at"] = time.time()
+        SESSION_HISTORY.append(stats)
+        logger.info(
+            f"Session {stats['market']}: {stats['trades']} trades, "
+            f"notional {stats['notional']:.2f}, {stats['open_orders']} orders open, "
+            f"{stats['one_legged']} one-legged, {stats['failed_legs']} failed legs, "
+            f"{stats['rejects']} risk rejects"
+        )
+        return stats
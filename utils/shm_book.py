@@ -0,0 +1,240 @@
+import os
+import sys
+import time
+import struct
+import threading
+from multiprocessing import resource_tracker, shared_memory
+
+# Layout: seq (even = stable, odd = write in progress), depth, publisher PID,
+# then the fields and top-N levels. Bids and asks are stored best level first.
+_SEQ = struct.Struct("<Q")
+_DEPTH = struct.Struct("<I")
+_DEPTH_OFFSET = 8
+_PID = struct.Struct("<I")
+_PID_OFFSET = 12
+_FIELDS_OFFSET = 16
+# ts_ns, version, session_start, best_bid, best_ask, best_bid_volume,
+# best_ask_volume, micro_price, mid_price, micro_vs_mid_bps, signal, inventory,
+# n_bids, n_asks
+_FIELDS = struct.Struct("<QQQdddddddbiII")
+
+SIGNAL_NAMES = {0: "NEUTRAL", 1: "UP", -1: "DOWN"}
+SIGNAL_CODES = {name: code for code, name in SIGNAL_NAMES.items()}
+
+_publishers = {}
+
+
+def _levels_struct(depth):
+    return struct.Struct(f"<{4 * depth}d")
+
+
+def _segment_size(depth):
+    return _FIELDS_OFFSET + _FIELDS.size + _levels_struct(depth).size
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class BookPublisher:
+    """Publishes top-of-book snapshots to a named shared-memory segment.
+
+    Uses a seqlock: the sequence number is odd while a snapshot is being
+    written, so readers in other processes can copy without locks or syscalls
+    and retry if they raced with the writer.
+    """
+
+    def __init__(self, name, depth=10):
+        self.name = name
+        self.depth = depth
+        self._levels = _levels_struct(depth)
+        self._levels_offset = _FIELDS_OFFSET + _FIELDS.size
+        self._values = [0.0] * (4 * depth)
+        self._lock = threading.Lock()
+        try:
+            self.shm = shared_memory.SharedMemory(
+                name=name, create=True, size=_segment_size(depth)
+            )
+        except FileExistsError:
+            # Only take over a segment left behind by a run that did not shut
+            # down cleanly; never one another process is still publishing to
+            existing = shared_memory.SharedMemory(name=name)
+            pid = (
+                _PID.unpack_from(existing.buf, _PID_OFFSET)[0]
+                if existing.size >= _FIELDS_OFFSET
+                else 0
+            )
+            if pid and pid != os.getpid() and _pid_alive(pid):
+                existing.close()
+                resource_tracker.unregister(existing._name, "shared_memory")
+                raise FileExistsError(
+                    f"Shared-memory book {name} is being published by pid {pid}"
+                ) from None
+            existing.close()
+            existing.unlink()
+            self.shm = shared_memory.SharedMemory(
+                name=name, create=True, size=_segment_size(depth)
+            )
+        self.buf = self.shm.buf
+        _SEQ.pack_into(self.buf, 0, 0)
+        _DEPTH.pack_into(self.buf, _DEPTH_OFFSET, depth)
+        _PID.pack_into(self.buf, _PID_OFFSET, os.getpid())
+
+    def publish(self, market_data, bids, asks, version, session_start, signal, inventory):
+        """Write a snapshot of ``bids``/``asks`` as stored by OrderBook.
+
+        Both sides are [price, size] levels sorted by ascending price and are
+        written best level first. ``signal`` is a SIGNALES member.
+        """
+        depth = self.depth
+        levels = self._values
+        n_bids = min(depth, len(bids))
+        n_asks = min(depth, len(asks))
+        for i in range(depth):
+            if i < n_bids:
+                levels[2 * i], levels[2 * i + 1] = bids[-1 - i]
+            else:
+                levels[2 * i] = levels[2 * i + 1] = 0.0
+        offset = 2 * depth
+        for i in range(depth):
+            if i < n_asks:
+                levels[offset + 2 * i], levels[offset + 2 * i + 1] = asks[i]
+            else:
+                levels[offset + 2 * i] = levels[offset + 2 * i + 1] = 0.0
+
+        with self._lock:
+            seq = _SEQ.unpack_from(self.buf, 0)[0]
+            _SEQ.pack_into(self.buf, 0, seq + 1)
+            _FIELDS.pack_into(
+                self.buf,
+                _FIELDS_OFFSET,
+                time.time_ns(),
+                version,
+                session_start,
+                market_data["best_bid_price"],
+                market_data["best_ask_price"],
+                market_data["best_bid_volume"],
+                market_data["best_ask_volume"],
+                market_data["micro_price"],
+                market_data["mid_price"],
+                market_data["micro_vs_mid_bps"],
+                SIGNAL_CODES[signal.value],
+                inventory,
+                n_bids,
+                n_asks,
+            )
+            self._levels.pack_into(self.buf, self._levels_offset, *levels)
+            _SEQ.pack_into(self.buf, 0, seq + 2)
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+def get_book_publisher(name, depth=10):
+    """Process-wide publisher per segment name, reused across sessions."""
+    publisher = _publishers.get(name)
+    if publisher is None:
+        publisher = _publishers[name] = BookPublisher(name, depth)
+    return publisher
+
+
+class BookReader:
+    """Reads consistent snapshots written by a BookPublisher in another process."""
+
+    def __init__(self, name):
+        self.shm = shared_memory.SharedMemory(name=name)
+        if name not in _publishers:
+            # Readers must not unlink the publisher's segment when they exit
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        self.buf = self.shm.buf
+        self.depth = _DEPTH.unpack_from(self.buf, _DEPTH_OFFSET)[0]
+        self._levels = _levels_struct(self.depth)
+        self._levels_offset = _FIELDS_OFFSET + _FIELDS.size
+
+    def version(self):
+        """Sequence number of the latest complete snapshot (cheap change check)."""
+        return _SEQ.unpack_from(self.buf, 0)[0] & ~1
+
+    def read(self, retries=1000):
+        """Return the latest snapshot as a dict, or None if nothing was published yet."""
+        buf = self.buf
+        for _ in range(retries):
+            seq = _SEQ.unpack_from(buf, 0)[0]
+            if seq & 1:
+                continue
+            fields = _FIELDS.unpack_from(buf, _FIELDS_OFFSET)
+            levels = self._levels.unpack_from(buf, self._levels_offset)
+            if _SEQ.unpack_from(buf, 0)[0] != seq:
+                continue
+            if seq == 0:
+                return None
+            return self._to_dict(fields, levels)
+        return None
+
+    def _to_dict(self, fields, levels):
+        (
+            ts_ns,
+            version,
+            session_start,
+            best_bid,
+            best_ask,
+            best_bid_volume,
+            best_ask_volume,
+            micro_price,
+            mid_price,
+            micro_vs_mid_bps,
+            signal,
+            inventory,
+            n_bids,
+            n_asks,
+        ) = fields
+        offset = 2 * self.depth
+        return {
+            "ts_ns": ts_ns,
+            "version": version,
+            "session_start": session_start,
+            "best_bid_price": best_bid,
+            "best_ask_price": best_ask,
+            "best_bid_volume": best_bid_volume,
+            "best_ask_volume": best_ask_volume,
+            "micro_price": micro_price,
+            "mid_price": mid_price,
+            "micro_vs_mid_bps": micro_vs_mid_bps,
+            "signal": SIGNAL_NAMES[signal],
+            "inventory": inventory,
+            "bids": [(levels[2 * i], levels[2 * i + 1]) for i in range(n_bids)],
+            "asks": [
+                (levels[offset + 2 * i], levels[offset + 2 * i + 1]) for i in range(n_asks)
+            ],
+        }
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+
+if __name__ == "__main__":
+    # python -m utils.shm_book <segment name>: print snapshots as they change
+    reader = BookReader(sys.argv[1] if len(sys.argv) > 1 else "pm_hft_book_up")
+    last = None
+    while True:
+        version = reader.version()
+        if version != last:
+            last = version
+            snapshot = reader.read()
+            if snapshot:
+                print(
+                    f"{snapshot['best_bid_price']:.2f}/{snapshot['best_ask_price']:.2f} "
+                    f"micro-mid {snapshot['micro_vs_mid_bps']:+.1f}bps "
+                    f"signal {snapshot['signal']} inventory {snapshot['inventory']}",
+                    flush=True,
+                )
+        time.sleep(0.05)
@@ -0,0 +1,90 @@
+import struct
+from multiprocessing import shared_memory
+
+# Header layout: producer and consumer cursors live on separate cache lines
+_HEADER = struct.Struct("<QQQ")  # write_seq, capacity, record_size
+_READ_SEQ = struct.Struct("<Q")
+_READ_SEQ_OFFSET = 64
+_DATA_OFFSET = 128
+
+
+class ShmRing:
+    """Single-producer/single-consumer ring of fixed-size records.
+
+    Records are packed with a ``struct.Struct`` into a named
+    ``multiprocessing.shared_memory`` segment so the producer and consumer can
+    live in different processes. The producer publishes a record by bumping
+    ``write_seq`` after writing the slot; the consumer owns ``read_seq``.
+    """
+
+    def __init__(self, shm, record, owner):
+        self.shm = shm
+        self.record = record
+        self.owner = owner
+        self.buf = shm.buf
+        write_seq, capacity, record_size = _HEADER.unpack_from(self.buf, 0)
+        if record_size != record.size:
+            raise ValueError(
+                f"Ring {shm.name} holds {record_size}-byte records, expected {record.size}"
+            )
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.dropped = 0
+
+    @classmethod
+    def create(cls, name, record, capacity=1024):
+        if capacity & (capacity - 1):
+            raise ValueError("Ring capacity must be a power of two")
+        size = _DATA_OFFSET + capacity * record.size
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _HEADER.pack_into(shm.buf, 0, 0, capacity, record.size)
+        _READ_SEQ.pack_into(shm.buf, _READ_SEQ_OFFSET, 0)
+        return cls(shm, record, owner=True)
+
+    @classmethod
+    def attach(cls, name, record):
+        return cls(shared_memory.SharedMemory(name=name), record, owner=False)
+
+    def _write_seq(self):
+        return _HEADER.unpack_from(self.buf, 0)[0]
+
+    def _read_seq(self):
+        return _READ_SEQ.unpack_from(self.buf, _READ_SEQ_OFFSET)[0]
+
+    def push(self, *fields):
+        """Append a record; returns False (and counts a drop) when the ring is full."""
+        write_seq = self._write_seq()
+        if write_seq - self._read_seq() >= self.capacity:
+            self.dropped += 1
+            return False
+        offset = _DATA_OFFSET + (write_seq & self.mask) * self.record.size
+        self.record.pack_into(self.buf, offset, *fields)
+        struct.pack_into("<Q", self.buf, 0, write_seq + 1)
+        return True
+
+    def pop(self):
+        """Return the oldest unread record, or None when the ring is empty."""
+        read_seq = self._read_seq()
+        if read_seq == self._write_seq():
+            return None
+        offset = _DATA_OFFSET + (read_seq & self.mask) * self.record.size
+        fields = self.record.unpack_from(self.buf, offset)
+        _READ_SEQ.pack_into(self.buf, _READ_SEQ_OFFSET, read_seq + 1)
+        return fields
+
+    def pop_latest(self):
+        """Consume everything pending and return only the newest record."""
+        read_seq = self._read_seq()
+        write_seq = self._write_seq()
+        if read_seq == write_seq:
+            return None
+        offset = _DATA_OFFSET + ((write_seq - 1) & self.mask) * self.record.size
+        fields = self.record.unpack_from(self.buf, offset)
+        _READ_SEQ.pack_into(self.buf, _READ_SEQ_OFFSET, write_seq)
+        return fields
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -13,3 +13,8 @@ def get_market_slug(coin: str = "btc") -> str:
     ts = int(now.timestamp())
     start = (ts // MARKET_SESSION_SECONDS) * MARKET_SESSION_SECONDS
     return f"{coin.lower()}-updown-15m-{start}"
+
+
+def get_session_start(slug: str) -> int:
+    """Unix timestamp at which the session of a ``*-updown-15m-<ts>`` slug starts."""
+    return int(slug.rsplit("-", 1)[1])
@@ -0,0 +1,22 @@
+import time
+
+
+class StartupTimeline:
+    """Records named milestones relative to process start and logs them once."""
+
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.marks = []
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter()))
+
+    def log(self, logger):
+        previous = self.start
+        lines = []
+        for name, at in self.marks:
+            lines.append(
+                f"\t+{(at - self.start) * 1000:8.1f} ms ({(at - previous) * 1000:7.1f} ms) {name}"
+            )
+            previous = at
+        logger.info("Startup timeline:\n" + "\n".join(lines))
@@ -0,0 +1,182 @@
+import time
+import logging
+from config import ENTRY_ASK_BAND, ENTRY_BID_BAND, MAX_ENTRY_ELAPSED_SECONDS
+from utils.events import EVENTS
+from utils.live_config import LIVE_CONFIG
+from utils.orderbook import SIGNALES
+from utils.market_time import get_period_elapsed_seconds, get_trading_window_end
+from utils.clob_orders import place_anchor_and_hedge
+from utils.alloc_stats import DECISION_ALLOCS, ORDER_ALLOCS
+from utils.journal import RECORD, SIDE_CODES, record_event
+
+logger = logging.getLogger(__name__)
+
+
+class DirectOrderGateway:
+    """Sends anchor/hedge pairs straight to the CLOB from the calling thread."""
+
+    def submit(self, book, anchor_side, price, hedge_price=None):
+        if ORDER_ALLOCS.enabled:
+            ORDER_ALLOCS.start()
+        if hedge_price is None:
+            hedge_price = round(1 - price - LIVE_CONFIG.params.profit_margin, 2)
+        order_ids = place_anchor_and_hedge(
+            book.up_token_id,
+            book.down_token_id,
+            anchor_side,
+            price,
+            size=5,
+            signed_orders_cache=book.signed_orders_cache,
+            hedge_price=hedge_price,
+        )
+        book.update_signed_orders_cache([price, hedge_price])
+        if ORDER_ALLOCS.enabled:
+            ORDER_ALLOCS.stop()
+        return order_ids
+
+
+class Strategy:
+    """Interface for strategies driven by StrategyRuntime.
+
+    ``on_event`` receives the coalesced EVENTS flags that woke the runtime and
+    returns the wall-clock time it wants to be woken up at next, or None to
+    sleep until the next event.
+    """
+
+    def on_session_start(self, book):
+        pass
+
+    def on_event(self, events, book):
+        raise NotImplementedError
+
+    def on_session_end(self, book):
+        pass
+
+
+class AnchorHedgeStrategy(Strategy):
+    """Buys the signalled side at the bid and hedges the opposite side.
+
+    Entries are taken while the UP ask is inside ENTRY_ASK_BAND or the UP
+    bid is inside ENTRY_BID_BAND, the micro/mid imbalance is below
+    MAX_TRADING_BPS_THRESHOLD and we are within the first
+    MAX_ENTRY_ELAPSED_SECONDS of the session. Thresholds and the
+    delay between trades follow the live config unless ``min_delay`` is set.
+    """
+
+    def __init__(self, gateway=None, min_delay=None):
+        self.gateway = gateway or DirectOrderGateway()
+        self.min_delay = min_delay
+        self.cooldown_until = 0.0
+
+    def on_session_start(self, book):
+        self.cooldown_until = 0.0
+
+    def on_event(self, events, book):
+        now = time.time()
+        if now < self.cooldown_until:
+            return self.cooldown_until
+
+        market_data = book.get_current_market_data()
+        if not market_data:
+            return None
+        params = LIVE_CONFIG.params
+
+        up_bid_price = market_data["best_bid_price"]
+        up_ask_price = market_data["best_ask_price"]
+
+        if not (
+            (ENTRY_ASK_BAND[0] < up_ask_price < ENTRY_ASK_BAND[1])
+            or (ENTRY_BID_BAND[0] < up_bid_price < ENTRY_BID_BAND[1])
+        ) or (
+            abs(market_data["micro_vs_mid_bps"]) > params.max_trading_bps_threshold
+        ):
+            return None
+
+        if get_period_elapsed_seconds() >= MAX_ENTRY_ELAPSED_SECONDS:
+            return None
+
+        trading_side = book.last_signal
+        if trading_side == SIGNALES.UP:
+            price = round(up_bid_price, 2)
+        elif trading_side == SIGNALES.DOWN:
+            price = round(1 - up_ask_price, 2)
+        else:
+            return None
+
+        # Anchor and hedge, 5 shares each
+        hedge_price = round(1 - price - params.profit_margin, 2)
+        notional = 5 * (price + hedge_price)
+        if not book.risk.reserve_pair(notional, book.inventory):
+            return None
+
+        record_event(
+            RECORD.ENTRY,
+            book.session_start,
+            book.version,
+            price,
+            up_bid_price,
+            up_ask_price,
+            book.inventory,
+            SIDE_CODES[trading_side.value],
+        )
+        try:
+            order_ids = self.gateway.submit(book, trading_side.value, price, hedge_price)
+        except Exception:
+            book.risk.settle_pair([None, None], notional)
+            raise
+        book.risk.settle_pair(order_ids, notional)
+        logger.info(
+            "Placed %s anchor and hedge orders. Total trades: %s, Order IDs: %s",
+            trading_side.value,
+            book.risk.trades,
+            order_ids,
+        )
+        min_delay = (
+            params.min_delay_between_trades_seconds
+            if self.min_delay is None
+            else self.min_delay
+        )
+        self.cooldown_until = time.time() + min_delay
+        return self.cooldown_until
+
+
+class StrategyRuntime:
+    """Runs a strategy for one session, waking only on book events and timers."""
+
+    def __init__(self, book, strategy):
+        self.book = book
+        self.strategy = strategy
+        self.running = False
+
+    def run(self, until=None):
+        """Block until the trading window closes (or ``until``) or stop() is called."""
+        book, strategy = self.book, self.strategy
+        session_end = get_trading_window_end() if until is None else until
+        self.running = True
+        strategy.on_session_start(book)
+
+        events = EVENTS.TIMER
+        while self.running:
+            if DECISION_ALLOCS.enabled:
+                DECISION_ALLOCS.start()
+            try:
+                deadline = strategy.on_event(events, book)
+            except Exception as e:
+                logger.error(f"Error in strategy {type(strategy).__name__}: {e}")
+                deadline = None
+            if DECISION_ALLOCS.enabled:
+                DECISION_ALLOCS.stop()
+
+            wake_at = session_end if deadline is None else min(deadline, session_end)
+            timeout = wake_at - time.time()
+            if timeout <= 0 and wake_at >= session_end:
+                break
+            events = book.events.wait(timeout)
+
+        self.running = False
+        strategy.on_session_end(book)
+        book.events.wake_latency.log(f"Strategy ({book.events.wait_strategy.name})")
+
+    def stop(self):
+        self.running = False
+        self.book.events.notify(EVENTS.TIMER)
@@ -0,0 +1,139 @@
+import os
+import time
+import logging
+from collections import deque
+from config import WAIT_SPIN_ITERATIONS, WAIT_SLEEP_SECONDS, WAKE_LATENCY_SAMPLES
+
+logger = logging.getLogger(__name__)
+
+
+class WaitStrategy:
+    """How a consumer waits for an EventNotifier to have pending events.
+
+    ``wait`` returns once ``notifier.pending`` is set or ``timeout`` seconds
+    have passed (never, for None). Spinning modes trade a whole core for the
+    lowest wake-up latency; blocking modes give the core back to the OS.
+    """
+
+    name = None
+
+    def wait(self, notifier, timeout):
+        raise NotImplementedError
+
+
+class BusySpinWait(WaitStrategy):
+    """Poll without sleeping; pin the consumer to its own core.
+
+    Each poll is followed by sched_yield(), which releases the GIL: a bare
+    ``pass`` loop would hold it, and the producer thread that sets
+    ``pending`` could only run at the interpreter's forced switch interval.
+    """
+
+    name = "spin"
+
+    def wait(self, notifier, timeout):
+        if timeout is None:
+            while not notifier.pending:
+                os.sched_yield()
+            return
+        deadline = time.perf_counter() + timeout
+        while not notifier.pending and time.perf_counter() < deadline:
+            os.sched_yield()
+
+
+class SpinYieldWait(WaitStrategy):
+    """Spin for ``spins`` polls, then yield the core between polls."""
+
+    name = "spin_yield"
+
+    def __init__(self, spins=WAIT_SPIN_ITERATIONS):
+        self.spins = spins
+
+    def wait(self, notifier, timeout):
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        spins = self.spins
+        while not notifier.pending:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            if spins:
+                spins -= 1
+            else:
+                os.sched_yield()
+
+
+class ConditionWait(WaitStrategy):
+    """Block on the notifier's condition variable until notify() wakes us."""
+
+    name = "condition"
+
+    def wait(self, notifier, timeout):
+        with notifier.cond:
+            if not notifier.pending and (timeout is None or timeout > 0):
+                notifier.cond.wait(timeout)
+
+
+class SleepWait(WaitStrategy):
+    """Poll every ``interval`` seconds; wake-up latency is up to one interval."""
+
+    name = "sleep"
+
+    def __init__(self, interval=WAIT_SLEEP_SECONDS):
+        self.interval = interval
+
+    def wait(self, notifier, timeout):
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while not notifier.pending:
+            if deadline is None:
+                time.sleep(self.interval)
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return
+            time.sleep(min(self.interval, remaining))
+
+
+WAIT_STRATEGIES = {
+    cls.name: cls for cls in (BusySpinWait, SpinYieldWait, ConditionWait, SleepWait)
+}
+
+
+def get_wait_strategy(mode):
+    """Wait strategy for a mode name: spin, spin_yield, condition or sleep."""
+    try:
+        return WAIT_STRATEGIES[mode]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown wait mode {mode!r}, expected one of {sorted(WAIT_STRATEGIES)}"
+        ) from None
+
+
+class WakeLatency:
+    """Time from the first event of a batch being received to the consumer picking it up."""
+
+    def __init__(self, samples=WAKE_LATENCY_SAMPLES):
+        self.samples = deque(maxlen=samples)
+        self.count = 0
+
+    def add(self, ns):
+        self.samples.append(ns)
+        self.count += 1
+
+    def report(self):
+        samples = sorted(self.samples)
+        if not samples:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "p50_us": samples[len(samples) // 2] / 1000,
+            "p99_us": samples[min(len(samples) - 1, len(samples) * 99 // 100)] / 1000,
+            "max_us": samples[-1] / 1000,
+        }
+
+    def log(self, name):
+        report = self.report()
+        if report["count"]:
+            logger.info(
+                f"{name} wake-up latency over {report['count']} wakes: "
+                f"p50 {report['p50_us']:.1f}us, p99 {report['p99_us']:.1f}us, "
+                f"max {report['max_us']:.1f}us"
+            )